@@ -23,11 +23,10 @@ def install_dependencies():
 # install_dependencies()
 
 # --- IMPORTS ---
-from FinMind.data import DataLoader
+# FinMind, tqdm and matplotlib are imported where they are used so the model and
+# backtester classes can be imported (e.g. by benchmark_scanner.py) without them.
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-from tqdm import tqdm
 import os
 
 # Suppress pandas fragmentation warnings for clean output
@@ -39,6 +38,7 @@ warnings.simplefilter(action='ignore', category=pd.errors.PerformanceWarning)
 # ==============================================================================
 class DataEngine:
     def __init__(self, token=None):
+        from FinMind.data import DataLoader
         self.loader = DataLoader()
         if token:
             self.loader.login_by_token(api_token=token)
@@ -108,6 +108,8 @@ class DataEngine:
             mask = (df_pivot['date'] >= pd.to_datetime(start_date)) & (df_pivot['date'] <= pd.to_datetime(end_date))
             return df_pivot.loc[mask].sort_values(['stock_id', 'date'])
 
+        from tqdm import tqdm
+
         print(f"--> Fetching Raw Financial Statements (Accountant Mode)...")
         all_dfs = []
         
@@ -299,7 +301,7 @@ class Backtester:
         # We can resample the signal dataframe to Quarter Ends, then reindex back to Daily.
         
         # 1. Resample signals to Quarterly (taking the last signal of the quarter)
-        q_signals = signals.resample('Q').last()
+        q_signals = signals.resample('QE').last()
         
         # 2. Reindex back to daily (forward fill the quarterly decision)
         # This means if we decided to buy on Q1 (Mar 31), we hold until Q2 (Jun 30).
@@ -336,7 +338,7 @@ class Backtester:
         running_max = equity.cummax()
         drawdown = (equity - running_max) / running_max
         
-        return equity, drawdown, data['market_cheap_count'].groupby('date').first()
+        return equity, drawdown, data.groupby('date')['market_cheap_count'].first()
 
 # ==============================================================================
 # MAIN EXECUTION
@@ -394,6 +396,7 @@ if __name__ == "__main__":
 
     
     # 6. Visualization
+    import matplotlib.pyplot as plt
     plt.figure(figsize=(12, 10))
     
     # Equity Curve
@@ -0,0 +1,154 @@
+import datetime
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from ai_prompts import build_report_prompt, prompt_version
+from ai_report_store import get_report_store
+from ai_reports import ReportStream, generate_ai_report
+from symbol_metadata import get_symbol_metadata
+
+# Batch pre-generation of AI reports right after a scan, so reports for the actionable names are
+# ready before anyone clicks them.
+#   - bounded concurrency (max_workers reports at a time, default 2),
+#   - per-provider rate limits are enforced by ai_reports (shared with interactive requests),
+#   - one model at a time per report (hedge=1): nobody is waiting, so quota matters more than latency,
+#   - reports already in the store are skipped, and reports a user requests interactively meanwhile
+#     join the same job through the shared SingleFlight coordinator.
+# While a report is being generated (batch or on click) its partial text is available from
+# live_stream(key), whichever session started it.
+
+
+def report_key(ticker, as_of):
+    """(ticker, as_of, prompt_version): the store key without the model."""
+    return (ticker, str(as_of), prompt_version(ticker))
+
+
+def flight_key(key, prompt):
+    return ("ai",) + tuple(key) + (hashlib.sha1(prompt.encode("utf-8")).hexdigest(),)
+
+
+_streams = {}
+_streams_lock = threading.Lock()
+
+
+def live_stream(key):
+    """ReportStream of the report being generated for this report key, or None."""
+    with _streams_lock:
+        return _streams.get(tuple(key))
+
+
+def generate_and_store(key, prompt, gemini_api_key, perplexity_api_key, log=None, hedge=None):
+    """Generates (streams) a report and saves successful ones to the shared store. Returns (content, source)."""
+    stream = ReportStream()
+    with _streams_lock:
+        _streams[tuple(key)] = stream
+    try:
+        content, source = generate_ai_report(gemini_api_key, perplexity_api_key, prompt, logger=log, hedge=hedge, stream=stream)
+        if source != "Error":
+            get_report_store().put(*key, source, content)
+    finally:
+        with _streams_lock:
+            if _streams.get(tuple(key)) is stream:
+                _streams.pop(tuple(key))
+    return content, source
+
+
+def candidate_prompt(scanner, ticker, as_of):
+    """Prompt for one scan candidate, built the same way as the dashboard's on-click report."""
+    indicators = scanner.get_indicators(ticker)
+    if indicators is None or indicators.empty:
+        return None
+    history = indicators[indicators.index <= pd.to_datetime(as_of)]
+    if history.empty:
+        return None
+    symbols = get_symbol_metadata()
+    prompt, _ = build_report_prompt(ticker, symbols.display_name(ticker), symbols.sector_line(ticker),
+                                    as_of, history['Close'].iloc[-1])
+    return prompt
+
+
+def select_candidates(results, top_k=None, statuses=("ACTIONABLE (Buy)",)):
+    """Scan rows to pre-generate: the given statuses, most liquid first, optionally the top K."""
+    if results is None or results.empty:
+        return []
+    rows = results[results['Status'].isin(statuses)] if statuses else results
+    if 'Volume(M)' in rows.columns:
+        rows = rows.sort_values('Volume(M)', ascending=False)
+    tickers = rows['Ticker'].drop_duplicates().tolist()
+    return tickers[:top_k] if top_k else tickers
+
+
+class AIBatch:
+    def __init__(self, scanner, tickers, as_of, gemini_api_key, perplexity_api_key, coordinator, max_workers=2):
+        self.scanner = scanner
+        self.tickers = list(tickers)
+        self.as_of = as_of
+        self.gemini_api_key = gemini_api_key
+        self.perplexity_api_key = perplexity_api_key
+        self.coordinator = coordinator
+        self.max_workers = max_workers
+        self.started = datetime.datetime.now()
+        self.finished = None
+        # ticker -> "queued" | "running" | "cached" | "done" | "failed" | "skipped"
+        self.state = {t: "queued" for t in self.tickers}
+        self.messages = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def log(self, message):
+        self.messages.append(message)
+
+    def _set(self, ticker, value):
+        with self._lock:
+            self.state[ticker] = value
+
+    def _one(self, ticker):
+        key = report_key(ticker, self.as_of)
+        if get_report_store().get(*key) is not None:
+            self._set(ticker, "cached")
+            return
+        prompt = candidate_prompt(self.scanner, ticker, self.as_of)
+        if prompt is None:
+            self._set(ticker, "skipped")
+            return
+        self._set(ticker, "running")
+        try:
+            _, source = self.coordinator.run(
+                flight_key(key, prompt),
+                lambda log: generate_and_store(key, prompt, self.gemini_api_key, self.perplexity_api_key, log, hedge=1)
+            )
+            self._set(ticker, "failed" if source == "Error" else "done")
+            self.log(f"[AI batch] {ticker}: {source}")
+        except Exception as e:
+            self._set(ticker, "failed")
+            self.log(f"[AI batch] {ticker} failed: {e}")
+
+    def _run(self):
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ai-batch") as pool:
+                list(pool.map(self._one, self.tickers))
+        finally:
+            self.finished = datetime.datetime.now()
+
+    def start(self):
+        self.log(f"[AI batch] Pre-generating {len(self.tickers)} reports as of {self.as_of} ({self.max_workers} at a time)...")
+        self._thread = threading.Thread(target=self._run, name="ai-batch", daemon=True)
+        self._thread.start()
+        return self
+
+    @property
+    def done(self):
+        return self.finished is not None
+
+    def progress(self):
+        """Counts per state plus the overall fraction complete."""
+        with self._lock:
+            states = list(self.state.values())
+        counts = {s: states.count(s) for s in ("queued", "running", "cached", "done", "failed", "skipped")}
+        total = len(states)
+        counts["total"] = total
+        counts["fraction"] = (total - counts["queued"] - counts["running"]) / total if total else 1.0
+        return counts
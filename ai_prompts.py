@@ -0,0 +1,475 @@
+import hashlib
+
+import pandas as pd
+
+# Prompt templates of the AI valuation report (moved out of vix_fix_dashboard.py).
+# Templates are plain str.format() strings, so the report store can key reports by a hash of the
+# template text (prompt_version): editing a template invalidates old reports automatically.
+#
+#   prompt, version = build_report_prompt("2330.TW", "台積電 (TSMC)", "Semiconductors", "2024-08-05", 912.0)
+
+# Historical context shared by both frameworks (no future knowledge past the As-At date).
+# The indentation is the one the dashboard has always sent; changing it changes prompt_version.
+MARKET_CONTEXT_TEMPLATE = """
+                                            **HISTORICAL ANALYST TASK**:
+                                            Target: {selected_ticker} ({long_name})
+                                            Sector / Industry: {sector_line}
+                                            As-At Date: {scan_date_display}
+                                            Closing Price: ${hist_price:.2f}
+                                            Target Reporting Period: {target_q_str} or older
+                                            
+                                            **OBJECTIVE**:
+                                            You are an Intelligence Officer retrieving filed reports from the archives.
+                                            You must find the *latest* financial report visible before {scan_date_display}.
+                                            
+                                            **REQUIRED SEARCH OPERATIONS**:
+                                            1. Search: "{long_name} {selected_ticker} {target_q_str} financial report"
+                                            2. Search: "{long_name} {selected_ticker} investor presentation {scan_year}"
+                                            3. Search: "{long_name} {selected_ticker} {target_q_str} earnings news summary"
+                                            4. Search: "TWSE {selected_ticker} financial report site:twse.com.tw"
+                                            5. Search: "{long_name} {selected_ticker} analyst ratings history {scan_year}"
+                                            6. Search: "Taiwan Manufacturing PMI {scan_year} historical data"
+                                            
+                                            **DATA HANDLING RULES**:
+                                            - **RESILIENT EXTRACTION**: If the official PDF is not found, *YOU MUST* extract the key numbers (Revenue, EPS, Margins, Guidance) from news articles, financial news sites (CNBC, Bloomberg, Yahoo Finance), or summaries found in the search results.
+                                            - **SOURCES**: Prioritize TWSE, Investor Relations, and Yahoo Finance.
+                                            - **BEST AVAILABLE DATA**: If {scan_date_display} is in Q1, look for Q4 of previous year. If in Q4, look for Q3.
+                                            - **EXAMPLE**: If today is Feb 2026 and Q4 2025 report is not out, YOU MUST USE THE Q3 2025 REPORT found on the investor relations page.
+                                            - **NO FUTURE KNOWLEDGE**: Do not use data released *after* {scan_date_display}.
+                                            - **ESTIMATION**: If a specific number is not found from the exact quarter, estimate it based on the TTM (Trailing Twelve Months) trend.
+                                            - **CITATION**: Clearly state the source date (e.g., "Using Q3 2025 data as Q4 was not yet released...").
+                                            """
+
+# --- TAIWAN MARKET PROMPT ---
+TW_REPORT_TEMPLATE = """
+# 📌 Institutional Multi-Factor Stock Valuation Framework  
+## Part 1 (Reality-Based) + Part 2 (Expectation-Based)
+
+---
+
+## ROLE
+
+You are an **Institutional Quantitative Strategist**.
+Your goal is to provide a valuation report.
+
+**Override**: If exact financial data is missing, use TTM (Trailing Twelve Months) data found via search.
+
+
+Your task is to perform a **two-part equity valuation** of a specified US-listed stock using **only information that was publicly available _as at a specified date_**.
+
+You must behave as if you are operating **on that date**, with **no knowledge of future events**.
+
+---
+
+## GLOBAL CONSTRAINTS (MANDATORY)
+
+1. **No Guessing / No Estimation**
+   - Do NOT estimate missing data.
+   - If data is unavailable as at the date, explicitly state:  
+     > “Data not available as at this date.”
+
+2. **No Future Knowledge**
+   - Do NOT reference:
+     - Earnings released after the as-at date
+     - Price movements after the as-at date
+     - Macro data revisions after the as-at date
+     - Any hindsight-based outcomes
+
+3. **Source Discipline**
+   Allowed sources (as at date only):
+   - Published quarterly / annual financial reports
+   - Official company guidance and press releases
+   - Analyst consensus forecasts published by that date
+   - Macro data released by that date
+
+4. **Strict Separation**
+   - **Part 1** → backward-looking, factual, no forecasts  
+   - **Part 2** → forward-looking, but only expectations visible at the date
+
+5. **Default As-At Date**
+   - Today, unless explicitly specified by the user
+
+---
+
+## INPUTS
+
+- **Target Stock Ticker**
+- **As-At Date**
+- **Latest Financial Statements Available as at the Date**
+- **Latest Macro Data Available as at the Date**
+
+---
+
+# =========================
+# PART 1 — REALITY-BASED VALUATION (NO FORECAST)
+# =========================
+
+## OBJECTIVE
+
+Determine whether the stock was **Overvalued, Fairly Valued, or Undervalued** using **only historical and trailing data available as at the date**.
+
+---
+
+## PHASE 1: MACRO REGIME IDENTIFICATION (INVESTMENT CLOCK)
+
+Using macro data available as at the date (PMI, inflation, growth, policy stance), classify the regime:
+
+### 1. Recovery
+- PMI < 50 but rising
+- Inflation falling  
+**Factor Bias:** Value / Size
+
+### 2. Expansion
+- PMI > 50
+- Growth accelerating  
+**Factor Bias:** Growth / Momentum
+
+### 3. Slowdown / Stagflation
+- PMI falling
+- Inflation high or rising  
+**Factor Bias:** Quality / Low Vol  
+**Adjustment:** Apply valuation multiple compression
+
+### 4. Contraction
+- PMI < 50 and falling
+- Growth negative  
+**Factor Bias:** Balance Sheet / Yield
+
+### Discount Rate Adjustment
+If:
+- Inflation > 3%, OR
+- Rate volatility is high  
+
+→ Increase Cost of Equity (COE) by **+150 bps**  
+→ Penalize long-duration cash flows
+
+---
+
+## PHASE 2: STOCK CLASSIFICATION & VALUATION METHOD
+
+Classify the stock using **reported data only**.
+
+---
+
+### A. HIGH GROWTH / SAAS
+
+**Criteria**
+- Revenue Growth > 15%
+- Operating or FCF Margin < 10%
+
+**Valuation Method**
+- EV / Sales (P/E NOT allowed)
+- Rule of 40 = Revenue Growth + FCF Margin
+
+**Adjustments**
+- Rule of 40 > 40 → Premium valuation (1.2x)
+- Rule of 40 < 40 → Discount valuation (0.8x)
+- Rule of 40 < 20 → “Broken Growth” classification
+
+**Risk Check**
+- LTM Cash Burn > Cash Balance → Flag as High Risk
+
+---
+
+### B. CYCLICAL
+
+**Criteria**
+- Sector: Energy, Materials, Industrials  
+OR
+- Earnings volatility > market
+
+**Valuation Method**
+- Normalized P/E (7–10 year average earnings, if available)
+- Price-to-Tangible Book (P/TBV)
+
+**Trap Detection**
+- Low current P/E + record-high margins → Flag as **Peak Cycle / Value Trap**
+
+---
+
+### C. VALUE / MATURE
+
+**Criteria**
+- Profitable
+- Revenue Growth < 10%
+
+**Valuation Method**
+- ROE vs P/TBV regression  
+  Target P/B = (ROE − g) / (COE − g)
+- Dividend Discount Model (if dividends exist)
+
+**Quality Overlay**
+- Piotroski F-Score
+- F-Score < 4 → Apply 20% discount to fair value
+
+---
+
+## PHASE 3: RISK & VETO CHECKS
+
+1. **Altman Z-Score**
+   - Z < 1.81 → **DISTRESS WARNING**
+   - Recommendation: **AVOID regardless of valuation**
+
+2. **Beneish M-Score**
+   - M > −1.78 → Flag potential earnings manipulation
+
+3. **Momentum Sanity Check**
+   - 6-month relative strength vs SPY
+   - Negative momentum + value signal → “Falling Knife” risk
+
+---
+
+## PART 1 OUTPUT
+
+- Historical Fair Value Range
+- Valuation Status:
+  - Overvalued / Fairly Valued / Undervalued
+- Explicit justification referencing:
+  - Macro regime
+  - Financial strength
+  - Earnings quality
+  - Appropriate valuation multiples
+
+---
+
+# =========================
+# PART 2 — EXPECTATION-BASED VALUATION (AS-AT-DATE ONLY)
+# =========================
+
+## OBJECTIVE
+
+Evaluate whether the stock price was **under- or over-valued relative to expectations that were visible at the as-at date**, without using any future information.
+
+---
+
+## ALLOWED FORWARD-LOOKING DATA
+
+(Only if available as at the date)
+
+- Management guidance
+- Analyst consensus forecasts
+- Announced capex plans
+- Publicly announced products, contracts, or pipelines
+
+---
+
+## FORWARD VALUATION LOGIC
+
+1. **Forecast Profitability Path**
+   - Revenue growth expectations
+   - Margin expansion expectations
+
+2. **Forward Valuation Multiples**
+   - Forward P/E, EV/Sales, PEG  
+   (Only if forecast data existed as at the date)
+
+3. **Market-Implied Expectations**
+   - What growth and margins the market price assumes **as at that date**
+
+---
+
+## PART 2 OUTPUT
+
+- Expected Fair Value Range based on contemporaneous expectations
+- Comparison of market price vs expected fundamentals
+- Expectation assessment:
+  - Overly optimistic
+  - Conservative discount
+  - Fairly priced
+
+---
+
+# =========================
+# 最終綜合判斷 (FINAL SYNTHESIS)
+# =========================
+
+You MUST start this section with the exact markdown header:
+**## 最終綜合判斷 (FINAL SYNTHESIS)**
+
+Provide **FINAL SUMMARY ONLY**, including:
+
+1. **Part 1 Conclusion**
+   - Historical, no-forecast valuation verdict
+
+2. **Part 2 Conclusion**
+   - Expectation-based valuation verdict
+
+3. **Integrated Judgment**
+   - Cheap but risky
+   - Fair but high quality
+   - Expensive but expectation-justified
+
+4. **Composite Valuation Score (0–100)**
+   - 0–20: Significantly Overvalued
+   - 21–40: Overvalued
+   - 41–60: Fairly Valued
+   - 61–80: Undervalued
+   - 81–100: Deep Value / Strong Conviction
+
+5. **Required Margin of Safety**
+   - Stable compounder: ~20%
+   - Growth / Cyclical: 40%+
+   - Distressed: Avoid
+
+---
+
+## OUTPUT STYLE REQUIREMENTS
+
+- **LANGUAGE: STRICTLY TRADITIONAL CHINESE (繁體中文) FOR THE ENTIRE REPORT.**
+- Institutional
+- Evidence-based
+- Concise but rigorous
+- Explicitly state: **“As at [DATE]”**
+- No speculation
+- No hindsight
+
+---
+
+**END OF FRAMEWORK**
+
+Context:
+{market_context}
+
+CRITICAL INSTRUCTION:
+At the very end of your response, AFTER the sections, you MUST provide a JSON block summary in this EXACT format for software parsing:
+```json
+{{
+    "action": "BUY" or "HOLD" or "SELL",
+    "company_name_zh": "Traditional Chinese Name of Stock (if applicable)",
+    "fair_value": 150.25, 
+    "buy_below": 140.00,
+    "risk_level": "Medium",
+    "rationale": "One sentence summary (in target language)."
+}}
+```
+"""
+
+# --- GLOBAL / US MARKET PROMPT ---
+US_REPORT_TEMPLATE = """
+# 📌 Institutional Multi-Factor Stock Valuation Framework
+
+## ROLE & GOVERNANCE
+You are an **Institutional Quantitative Strategist and Equity Valuation Expert**. Your mission is to provide world-class, rigorous equity analysis using a dual-layered methodology (Historical Reality vs. Forward Expectations). 
+
+### 🛑 MANDATORY PROTOCOLS
+1. **Zero-Hindsight Constraint**: You must strictly operate as if the current date is the user-specified **As-At Date**. Referencing any event (earnings, macro shifts, or price action) that occurred after that date is a total breach of institutional protocol.
+2. **Data Integrity**: Do not estimate missing data. If data was unavailable as of the date, explicitly state: "Data not available as at this date."
+3. **Language Protocol**: 
+   - **US Stocks**: Respond in English.
+   - **Taiwan (TW) or Hong Kong (HK) Stocks**: Respond in Traditional Chinese (繁體中文).
+
+---
+
+## PART 1: REALITY-BASED VALUATION (THE ANCHOR)
+*Objective: Determine intrinsic value using only hard, historical data available on the date.*
+
+### 1. Macro Regime Identification
+Identify the Investment Clock phase (Recovery, Expansion, Slowdown, or Contraction) using PMI and CPI data. 
+- **Adjustment**: Increase Cost of Equity (COE) by **+150 bps** if Inflation > 3% or Rate Volatility is high to penalize long-duration cash flows.
+
+### 2. Deep-Dive Classification
+- **High Growth/SaaS**: Evaluate via EV/Sales. Calculate **Rule of 40** (Revenue Growth + FCF Margin).
+- **Cyclical**: Use Normalized P/E (7-10 yr average) and Price-to-Tangible Book (P/TBV).
+- **Value/Mature**: Execute ROE vs. P/TBV Regression: $$Target P/B = \\frac{{ROE - g}}{{COE - g}}$$
+
+### 3. Institutional Quality Vetoes
+- **Altman Z-Score**: If Z < 1.81, issue a mandatory **DISTRESS WARNING**.
+- **Beneish M-Score**: If M > −1.78, flag potential earnings manipulation.
+- **Piotroski F-Score**: If Score < 4, apply a 20% haircut to fair value.
+
+---
+
+## PART 2: EXPECTATION-BASED VALUATION (THE ALPHA)
+*Objective: Evaluate market-implied sentiment and forward-looking visibility.*
+
+1. **Consensus Dissection**: Analyze analyst EPS/Revenue forecasts and management guidance active **as of the date**.
+2. **Reverse DCF Analysis**: Determine what implied growth rate and margins the market price assumes at that specific moment.
+3. **Forward Multiples**: Calculate Forward P/E, PEG, and EV/EBITDA based on contemporaneous forecasts.
+
+---
+
+## FINAL OUTPUT: THE INSTITUTIONAL DIRECTIVE
+Generate the final report using this structure:
+
+### 1. Institutional Research Summary
+| Pillar | Metric / Status | Quantitative Commentary |
+| :--- | :--- | :--- |
+| **Macro Regime** | [Regime Name] | Impact on sector valuation and discount rates. |
+| **Reality (Part 1)** | [Key Trailing Ratios] | Verdict on historical valuation (Over/Under/Fair). |
+| **Expectations (Part 2)** | [Forward Ratios/Guidance] | Assessment of market sentiment and growth visibility. |
+| **Quality/Risk** | [Z/F/M-Scores] | Comprehensive balance sheet and earnings quality review. |
+
+### 2. Scenario Valuation Matrix (12-Month Outlook)
+| Scenario | Target Price | Probability | Critical Trigger |
+| :--- | :--- | :--- | :--- |
+| **Bull Case** | [Price] | [%] | [Specific Catalyst] |
+| **Base Case** | [Price] | [%] | [Expected Outcome] |
+| **Bear Case** | [Price] | [%] | [Specific Risk Event] |
+
+### 3. Final Proposal & Execution
+- **Action**: (Strong Buy / Buy / Hold / Sell / Avoid)
+- **Composite Valuation Score**: 0–100 (81-100: Deep Value; 0-20: Significantly Overvalued)
+- **Execution Zone**: Optimal Buy/Entry Price Range.
+- **Stop-Loss**: Hard exit price for risk management.
+- **Strategic Rationale**: Concise 3-point thesis justifying the verdict.
+
+Context:
+{market_context}
+
+CRITICAL INSTRUCTION:
+At the very end of your response, AFTER the sections, you MUST provide a JSON block summary in this EXACT format for software parsing:
+```json
+{{
+    "action": "BUY" or "HOLD" or "SELL",
+    "company_name_zh": "Traditional Chinese Name of Stock (if applicable)",
+    "fair_value": 150.25, 
+    "buy_below": 140.00,
+    "risk_level": "Medium",
+    "rationale": "One sentence summary (in target language)."
+}}
+```
+"""
+
+
+def is_taiwan(ticker):
+    return ticker.endswith(".TW") or ticker.endswith(".TWO")
+
+
+def report_template(ticker):
+    """Conditional valuation framework: Taiwan listings get the TW prompt, everything else the US one."""
+    return TW_REPORT_TEMPLATE if is_taiwan(ticker) else US_REPORT_TEMPLATE
+
+
+def prompt_version(ticker):
+    """Short hash of the templates used for a ticker (part of the report cache key)."""
+    text = MARKET_CONTEXT_TEMPLATE + report_template(ticker)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+
+
+def target_reporting_period(scan_date):
+    """Likely latest financial quarter published by scan_date."""
+    scan_dt = pd.to_datetime(scan_date)
+    scan_year = scan_dt.year
+    scan_month = scan_dt.month
+    if scan_month in [1, 2, 3]:
+        return f"Q3 {scan_year-1}" # Q4 usually not out until late March for TW
+    elif scan_month in [4, 5, 6]:
+        return f"Q4 {scan_year-1}"
+    elif scan_month in [7, 8, 9]:
+        return f"Q1 {scan_year}"
+    return f"Q2 {scan_year}"
+
+
+def build_report_prompt(ticker, long_name, sector_line, scan_date, close_price):
+    """Returns (prompt, prompt_version) for a ticker as of scan_date (historical close price)."""
+    market_context = MARKET_CONTEXT_TEMPLATE.format(
+        selected_ticker=ticker,
+        long_name=long_name,
+        sector_line=sector_line,
+        scan_date_display=scan_date,
+        hist_price=close_price,
+        target_q_str=target_reporting_period(scan_date),
+        scan_year=pd.to_datetime(scan_date).year,
+    )
+    prompt = report_template(ticker).format(market_context=market_context)
+    return prompt, prompt_version(ticker)
@@ -0,0 +1,167 @@
+import json
+import os
+import threading
+import time
+
+# Per-model health for the AI report providers, so requests stop paying for models that are
+# rate-limited, retired or slow.
+#
+# For every candidate label ("Gemini (gemini-2.0-flash)", "Perplexity (sonar)", ...) we keep
+# an exponentially weighted success rate and latency, the last error class and a circuit breaker:
+#   - a hard failure (quota / rate limit, unknown or retired model) opens the circuit at once,
+#   - an auth failure (bad or revoked key) belongs to the caller's key, not the model: it is logged
+#     on the record but never counts toward the circuit, which all sessions share,
+#   - other failures (timeouts, HTTP errors, answers without the JSON block) open it after
+#     FAILURES_TO_OPEN consecutive failures,
+#   - an open circuit skips the model for a cool-down that depends on the error class and doubles
+#     on every re-open (capped); the first success closes it again.
+# Candidates are then ordered: proven models by expected time to a good answer, untried models
+# in their priority order, then models that have only failed.
+#
+# Stored in data/ai_provider_health.json as {label: {field: value}}.
+
+HEALTH_FILE = os.path.join("data", "ai_provider_health.json")
+ALPHA = 0.3  # EWMA weight of the newest observation
+FAILURES_TO_OPEN = 3
+MAX_COOLDOWN = 24 * 3600
+# Cool-down in seconds per error class (first opening)
+COOLDOWN = {
+    "rate_limit": 300,
+    "not_found": 6 * 3600,
+    "timeout": 120,
+    "invalid": 120,
+    "error": 120,
+}
+HARD_ERRORS = ("rate_limit", "not_found")
+
+
+def classify_error(message):
+    """Coarse error class from an exception / error message."""
+    text = str(message).lower()
+    if any(s in text for s in ("429", "quota", "rate limit", "resource_exhausted", "resource exhausted", "too many requests")):
+        return "rate_limit"
+    # "is not supported" (a tool / feature the model lacks) is not a missing model: plain error
+    if any(s in text for s in ("404", "not found", "not_found", "deprecated", "invalid model")):
+        return "not_found"
+    if any(s in text for s in ("401", "403", "api key", "api_key", "permission", "unauthorized")):
+        return "auth"
+    if "timed out" in text or "timeout" in text or "deadline" in text:
+        return "timeout"
+    return "error"
+
+
+class ProviderHealth:
+    def __init__(self, path=None):
+        self.path = path or HEALTH_FILE
+        self._lock = threading.Lock()
+        self._records = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._records = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"[WARNING] Could not read {self.path} ({e}), starting empty.")
+
+    def save(self):
+        folder = os.path.dirname(self.path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        with self._lock:
+            snapshot = {label: dict(record) for label, record in self._records.items()}
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, indent=1)
+        os.replace(tmp, self.path)
+
+    def _record(self, label):
+        return self._records.setdefault(label, {
+            "calls": 0, "successes": 0, "success_rate": None, "latency": None,
+            "consecutive_failures": 0, "last_error": None, "last_error_class": None,
+            "open_until": 0, "cooldown": 0,
+        })
+
+    def record_success(self, label, latency):
+        with self._lock:
+            r = self._record(label)
+            r["calls"] += 1
+            r["successes"] += 1
+            r["success_rate"] = 1.0 if r["success_rate"] is None else (1 - ALPHA) * r["success_rate"] + ALPHA
+            r["latency"] = latency if r["latency"] is None else (1 - ALPHA) * r["latency"] + ALPHA * latency
+            r["consecutive_failures"] = 0
+            r["open_until"] = 0
+            r["cooldown"] = 0
+            r["last_success"] = time.time()
+        self.save()
+
+    def record_failure(self, label, error, error_class=None, latency=None):
+        """Returns the cool-down in seconds if this failure opened the circuit, else 0."""
+        error_class = error_class or classify_error(error)
+        opened = 0
+        with self._lock:
+            r = self._record(label)
+            r["calls"] += 1
+            r["last_error"] = str(error)[:200]
+            r["last_error_class"] = error_class
+            r["last_failure"] = time.time()
+            # A bad or revoked key is one session's problem, not the model's: keep it out of the
+            # shared success rate and circuit
+            if error_class != "auth":
+                r["success_rate"] = 0.0 if r["success_rate"] is None else (1 - ALPHA) * r["success_rate"]
+                if latency is not None and error_class == "timeout":
+                    # A timeout is a lower bound on the latency
+                    r["latency"] = latency if r["latency"] is None else max(r["latency"], latency)
+                r["consecutive_failures"] += 1
+                if error_class in HARD_ERRORS or r["consecutive_failures"] >= FAILURES_TO_OPEN:
+                    base = COOLDOWN.get(error_class, COOLDOWN["error"])
+                    opened = min(MAX_COOLDOWN, max(base, r["cooldown"] * 2))
+                    r["cooldown"] = opened
+                    r["open_until"] = time.time() + opened
+        self.save()
+        return opened
+
+    def is_open(self, label, now=None):
+        record = self._records.get(label)
+        return bool(record) and record.get("open_until", 0) > (now or time.time())
+
+    def order(self, candidates):
+        """
+        Drops candidates whose circuit is open and orders the rest (see module comment).
+        candidates: priority-ordered (label, fn) pairs. Returns (ordered, skipped_labels).
+        If every circuit is open, all candidates are returned in priority order rather than none.
+        """
+        now = time.time()
+        available = [c for c in candidates if not self.is_open(c[0], now)]
+        skipped = [c[0] for c in candidates if self.is_open(c[0], now)]
+        if not available:
+            return list(candidates), skipped
+
+        def rank(item):
+            position, (label, _) = item
+            r = self._records.get(label)
+            if not r or r.get("success_rate") is None:
+                return (1, position)
+            if r["successes"] == 0:
+                return (2, position)
+            expected = (r["latency"] or 0) / max(r["success_rate"], 0.05)
+            return (0, expected)
+
+        ordered = [c for _, c in sorted(enumerate(available), key=rank)]
+        return ordered, skipped
+
+    def snapshot(self):
+        """{label: record} copy for display."""
+        with self._lock:
+            return {label: dict(record) for label, record in self._records.items()}
+
+
+_default_health = None
+_default_lock = threading.Lock()
+
+
+def get_provider_health():
+    """Process-wide health table (shared by dashboard sessions and batch generation)."""
+    global _default_health
+    with _default_lock:
+        if _default_health is None:
+            _default_health = ProviderHealth()
+        return _default_health
@@ -0,0 +1,123 @@
+import contextlib
+import os
+import sqlite3
+import threading
+import time
+
+# Disk-backed store of generated AI reports, shared by all dashboard sessions (and processes).
+# A report is identified by (ticker, as_of, prompt_version, model): the Time Machine date it was
+# generated for, the hash of the prompt templates (ai_prompts.prompt_version) and the model that
+# answered. Viewing a stored report costs no API call; regenerating is an explicit delete.
+#
+# Eviction: reports older than VIXFIX_AI_REPORT_TTL_DAYS (default 30) are dropped, and the least
+# recently viewed ones go first once the store exceeds VIXFIX_AI_REPORT_MAX_MB (default 200).
+
+REPORT_DB = os.path.join("data", "ai_reports.sqlite")
+DEFAULT_TTL_DAYS = 30
+DEFAULT_MAX_MB = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reports (
+    ticker          TEXT NOT NULL,
+    as_of           TEXT NOT NULL,
+    prompt_version  TEXT NOT NULL,
+    model           TEXT NOT NULL,
+    content         TEXT NOT NULL,
+    created_at      REAL NOT NULL,
+    last_access     REAL NOT NULL,
+    size            INTEGER NOT NULL,
+    PRIMARY KEY (ticker, as_of, prompt_version, model)
+);
+CREATE INDEX IF NOT EXISTS idx_reports_access ON reports (last_access);
+"""
+
+
+class AIReportStore:
+    def __init__(self, path=None, ttl_days=None, max_mb=None):
+        self.path = path or REPORT_DB
+        if ttl_days is None:
+            ttl_days = float(os.environ.get("VIXFIX_AI_REPORT_TTL_DAYS", DEFAULT_TTL_DAYS))
+        if max_mb is None:
+            max_mb = float(os.environ.get("VIXFIX_AI_REPORT_MAX_MB", DEFAULT_MAX_MB))
+        self.ttl_seconds = ttl_days * 86400
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        folder = os.path.dirname(self.path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # Short-lived connections: sqlite3 objects must not cross threads (dashboard sessions)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, ticker, as_of, prompt_version, model=None):
+        """Latest unexpired report as a dict (content, source, created_at), or None."""
+        sql = "SELECT rowid, model, content, created_at FROM reports WHERE ticker=? AND as_of=? AND prompt_version=? AND created_at>=?"
+        args = [ticker, str(as_of), prompt_version, time.time() - self.ttl_seconds]
+        if model:
+            sql += " AND model=?"
+            args.append(model)
+        sql += " ORDER BY created_at DESC LIMIT 1"
+        with self._lock, self._connect() as conn:
+            row = conn.execute(sql, args).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE reports SET last_access=? WHERE rowid=?", (time.time(), row["rowid"]))
+        return {"content": row["content"], "source": row["model"], "created_at": row["created_at"]}
+
+    def put(self, ticker, as_of, prompt_version, model, content):
+        now = time.time()
+        size = len(content.encode("utf-8"))
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO reports VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (ticker, str(as_of), prompt_version, model, content, now, now, size),
+            )
+            self._evict(conn)
+
+    def delete(self, ticker, as_of, prompt_version):
+        """Drops every model's report for this key (explicit regenerate)."""
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM reports WHERE ticker=? AND as_of=? AND prompt_version=?",
+                         (ticker, str(as_of), prompt_version))
+
+    def _evict(self, conn):
+        conn.execute("DELETE FROM reports WHERE created_at<?", (time.time() - self.ttl_seconds,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM reports").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Least recently viewed first until under the cap
+        freed = 0
+        victims = []
+        for row in conn.execute("SELECT rowid, size FROM reports ORDER BY last_access ASC"):
+            if total - freed <= self.max_bytes:
+                break
+            victims.append((row["rowid"],))
+            freed += row["size"]
+        conn.executemany("DELETE FROM reports WHERE rowid=?", victims)
+
+    def stats(self):
+        with self._lock, self._connect() as conn:
+            count, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM reports").fetchone()
+        return {"reports": count, "size_mb": round(size / (1024 * 1024), 2)}
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_report_store():
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = AIReportStore()
+        return _default_store
@@ -0,0 +1,381 @@
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from ai_provider_health import get_provider_health
+
+# AI valuation reports (Gemini with Google Search, Perplexity as fallback).
+#
+# Instead of walking every model one after another, the top candidates are raced:
+#   - `hedge` requests run concurrently (default: the top 3 models in priority order),
+#   - the first response that contains a parseable ```json block wins,
+#   - a failed / invalid / timed-out request starts the next model in the list,
+#   - every request has its own timeout, the whole race a total budget.
+# Losing requests cannot be interrupted mid-flight (HTTP clients have no cancel), so their
+# results are simply discarded; queued ones are cancelled.
+#
+# Settings: VIXFIX_AI_HEDGE (3), VIXFIX_AI_TIMEOUT seconds per request (120),
+#           VIXFIX_AI_BUDGET seconds for the whole race (300),
+#           VIXFIX_AI_RPM_GEMINI / VIXFIX_AI_RPM_PERPLEXITY requests per minute per provider
+#           (process-wide, shared by interactive and batch generation; 0 = unlimited).
+#
+# Responses are streamed (Gemini stream=True, Perplexity server-sent events) into a ReportStream,
+# so the dashboard can render the leading candidate's text as it arrives and show the ```json
+# summary as soon as its closing fence is received, long before the request returns.
+#
+# Every outcome is recorded in ai_provider_health: models whose circuit is open (rate-limited,
+# retired, repeatedly failing) are skipped for a cool-down and the rest are tried fastest-reliable
+# first, so steady-state requests no longer start with a model known to fail.
+
+GEMINI_MODELS = [
+    'gemini-2.0-flash',
+    'gemini-2.0-flash-lite',
+    'gemini-flash-latest',
+    'gemini-pro-latest',
+    'gemini-1.5-pro',
+    'gemini-1.5-flash',
+    'gemini-pro'
+]
+# Order of capability: Reasoning -> Pro -> Basic (Sonar)
+PERPLEXITY_MODELS = ["sonar-reasoning", "sonar-pro", "sonar"]
+PERPLEXITY_URL = "https://api.perplexity.ai/chat/completions"
+
+JSON_BLOCK = re.compile(r'```json\n(.*?)\n```', re.DOTALL)
+PROVIDER_RPM = {"gemini": 15, "perplexity": 30}
+
+_genai_lock = threading.Lock()
+_gemini_clients = {}
+
+
+class RateLimited(RuntimeError):
+    """Local rate limiter had no slot in time (not the provider's fault, not recorded as health)."""
+
+
+def _setting(name, default):
+    return float(os.environ.get(name, default))
+
+
+class RateLimiter:
+    """Sliding-window limiter: at most `per_minute` acquisitions in any 60 seconds."""
+
+    def __init__(self, per_minute):
+        self.per_minute = per_minute
+        self._calls = []
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline=None):
+        """Blocks until a slot is free. Returns False if the deadline passes first."""
+        if not self.per_minute:
+            return True
+        while True:
+            with self._lock:
+                now = time.time()
+                self._calls = [t for t in self._calls if now - t < 60]
+                if len(self._calls) < self.per_minute:
+                    self._calls.append(now)
+                    return True
+                wait_for = 60 - (now - self._calls[0])
+            if deadline is not None and time.time() + wait_for > deadline:
+                return False
+            time.sleep(min(wait_for, 1.0))
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def provider_limiter(provider):
+    with _limiters_lock:
+        if provider not in _limiters:
+            rpm = _setting(f"VIXFIX_AI_RPM_{provider.upper()}", PROVIDER_RPM.get(provider, 0))
+            _limiters[provider] = RateLimiter(int(rpm))
+        return _limiters[provider]
+
+
+# Start time of the request running on this thread (set by race): a wait for a rate-limiter slot
+# is not part of the model's latency or per-request timeout
+_request_clock = threading.local()
+
+
+def _set_started(started):
+    clock = getattr(_request_clock, "clock", None)
+    if clock is not None:
+        clock[0] = started
+
+
+def _limited(provider, fn):
+    def call(prompt, timeout, on_text=None):
+        _set_started(None)
+        if not provider_limiter(provider).acquire(deadline=time.time() + timeout):
+            raise RateLimited(f"{provider} rate limit: no slot within {timeout:.0f}s")
+        _set_started(time.time())
+        return fn(prompt, timeout, on_text)
+    return call
+
+
+def _clocked(fn, clock, *args):
+    _request_clock.clock = clock
+    try:
+        return fn(*args)
+    finally:
+        _request_clock.clock = None
+
+
+def parse_json_block(text):
+    """Returns the dict in the report's ```json block, or None if missing / invalid."""
+    if not text:
+        return None
+    match = JSON_BLOCK.search(text)
+    if not match:
+        return None
+    try:
+        return json.loads(match.group(1))
+    except ValueError:
+        return None
+
+
+class ReportStream:
+    """
+    Live text of one report being generated. The first candidate to produce text owns the stream;
+    if it fails, the next candidate that produces text takes over (its text replaces the old one).
+    """
+
+    def __init__(self):
+        self.label = None
+        self.text = ""
+        self.summary = None
+        self.started = time.time()
+        self.first_text = None
+        self._failed = set()
+        self._lock = threading.Lock()
+
+    def update(self, label, text):
+        with self._lock:
+            if label in self._failed:
+                return
+            if self.label is None or self.label in self._failed:
+                self.label = label
+                self.summary = None
+            if label != self.label:
+                return
+            if self.first_text is None and text:
+                self.first_text = time.time() - self.started
+            self.text = text
+            if self.summary is None and "```json" in text:
+                self.summary = parse_json_block(text)
+
+    def drop(self, label):
+        with self._lock:
+            self._failed.add(label)
+
+
+def _gemini_client(api_key):
+    """GenerativeServiceClient bound to one API key (one per key, shared by threads)."""
+    from google.ai import generativelanguage as glm
+    # Not genai.configure(): that sets a process-wide key, and concurrent sessions with different
+    # keys would send (and bill) each other's requests
+    with _genai_lock:
+        client = _gemini_clients.get(api_key)
+        if client is None:
+            client = _gemini_clients[api_key] = glm.GenerativeServiceClient(client_options={"api_key": api_key})
+        return client
+
+
+def call_gemini(api_key, model_name, prompt, timeout, on_text=None):
+    import google.generativeai as genai
+    # Enabling Google Search Tool for fresh data access
+    try:
+        model = genai.GenerativeModel(model_name, tools='google_search_retrieval')
+    except Exception:
+        # Fallback if tools not supported by model/SDK
+        model = genai.GenerativeModel(model_name)
+    # The model otherwise falls back to the module-global default client
+    model._client = _gemini_client(api_key)
+    if on_text is None:
+        response = model.generate_content(prompt, request_options={"timeout": timeout})
+        return response.text
+    text = ""
+    for chunk in model.generate_content(prompt, stream=True, request_options={"timeout": timeout}):
+        try:
+            piece = chunk.text
+        except ValueError:
+            # Chunks without text parts (grounding metadata, safety ratings)
+            continue
+        if piece:
+            text += piece
+            on_text(text)
+    return text
+
+
+def call_perplexity(api_key, model, prompt, timeout, on_text=None):
+    import requests
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json"
+    }
+    payload = {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": "You are a helpful financial research assistant."},
+            {"role": "user", "content": prompt}
+        ],
+        "stream": on_text is not None
+    }
+    response = requests.post(PERPLEXITY_URL, json=payload, headers=headers, timeout=timeout, stream=on_text is not None)
+    if response.status_code != 200:
+        raise RuntimeError(f"HTTP {response.status_code}")
+    if on_text is None or not response.headers.get("Content-Type", "").startswith("text/event-stream"):
+        return response.json()['choices'][0]['message']['content']
+    # Server-sent events: "data: {chunk json}" lines, "data: [DONE]" at the end
+    text = ""
+    for line in response.iter_lines(decode_unicode=True):
+        if not line or not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            break
+        try:
+            choice = json.loads(data)['choices'][0]
+        except (ValueError, KeyError, IndexError):
+            continue
+        piece = (choice.get('delta') or {}).get('content')
+        if piece is None:
+            # Some chunks carry the full message instead of a delta
+            piece = (choice.get('message') or {}).get('content', "")[len(text):]
+        if piece:
+            text += piece
+            on_text(text)
+    return text
+
+
+def candidate_models(gemini_api_key, perplexity_api_key):
+    """Priority-ordered (label, fn(prompt, timeout, on_text)) list: Gemini models first, then Perplexity."""
+    candidates = []
+    if gemini_api_key:
+        for name in GEMINI_MODELS:
+            candidates.append((f"Gemini ({name})", _limited("gemini", lambda p, t, cb=None, n=name: call_gemini(gemini_api_key, n, p, t, cb))))
+    if perplexity_api_key:
+        for name in PERPLEXITY_MODELS:
+            candidates.append((f"Perplexity ({name})", _limited("perplexity", lambda p, t, cb=None, n=name: call_perplexity(perplexity_api_key, n, p, t, cb))))
+    return candidates
+
+
+def race(candidates, prompt, hedge=None, timeout=None, budget=None, logger=None, health=None, stream=None):
+    """
+    Races the candidates (see module comment). Returns (content, source).
+    If no response has a valid JSON block, the first non-empty text is returned instead;
+    if nothing answered at all, (error summary, "Error").
+    health: optional ProviderHealth that every outcome is recorded in.
+    stream: optional ReportStream that receives the partial text (candidates must accept on_text).
+    """
+    log = logger or (lambda msg: None)
+
+    def failed(label, error, error_class=None, latency=None):
+        if stream is not None:
+            stream.drop(label)
+        if health is None:
+            return
+        cooldown = health.record_failure(label, error, error_class, latency)
+        if cooldown:
+            log(f"[AI] {label} paused for {cooldown / 60:.0f} min ({health.snapshot()[label]['last_error_class']}).")
+
+    hedge = int(hedge or _setting("VIXFIX_AI_HEDGE", 3))
+    timeout = timeout or _setting("VIXFIX_AI_TIMEOUT", 120)
+    budget = budget or _setting("VIXFIX_AI_BUDGET", 300)
+    deadline = time.time() + budget
+
+    pending = list(candidates)
+    errors = []
+    fallback = None
+    # One thread per candidate so a hung request does not block its replacement
+    executor = ThreadPoolExecutor(max_workers=max(1, len(candidates)), thread_name_prefix="ai-race")
+    running = {}
+
+    def launch():
+        while pending and len(running) < hedge:
+            label, fn = pending.pop(0)
+            log(f"[AI] Requesting {label}...")
+            # [start time], None while the request waits for a rate-limiter slot
+            clock = [time.time()]
+            if stream is not None:
+                future = executor.submit(_clocked, fn, clock, prompt, timeout, lambda text, label=label: stream.update(label, text))
+            else:
+                future = executor.submit(_clocked, fn, clock, prompt, timeout)
+            running[future] = (label, clock)
+
+    def elapsed(clock):
+        return time.time() - clock[0] if clock[0] is not None else 0.0
+
+    try:
+        launch()
+        while running:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                errors.append(f"Total budget of {budget:.0f}s exhausted")
+                break
+            done, _ = wait(list(running), timeout=min(remaining, 1.0), return_when=FIRST_COMPLETED)
+
+            # Per-request timeout (the HTTP timeout should fire first; this catches hung calls)
+            # (a request still queued behind the rate limiter is not timed: RateLimited ends it)
+            for future, (label, clock) in list(running.items()):
+                if future not in done and elapsed(clock) > timeout + 2:
+                    running.pop(future)
+                    errors.append(f"{label}: timed out after {timeout:.0f}s")
+                    log(f"[AI] {label} timed out.")
+                    failed(label, "timed out", "timeout", elapsed(clock))
+
+            for future in done:
+                label, clock = running.pop(future)
+                try:
+                    text = future.result()
+                except Exception as e:
+                    errors.append(f"{label} Error: {e}")
+                    log(f"[AI] {label} failed: {e}")
+                    if isinstance(e, RateLimited):
+                        if stream is not None:
+                            stream.drop(label)
+                    else:
+                        failed(label, e, latency=elapsed(clock))
+                    continue
+                if parse_json_block(text) is not None:
+                    log(f"[AI] {label} answered in {elapsed(clock):.1f}s.")
+                    if health is not None:
+                        health.record_success(label, elapsed(clock))
+                    return text, label
+                errors.append(f"{label}: response without a valid ```json block")
+                failed(label, "response without a valid json block", "invalid")
+                log(f"[AI] {label} answered without the JSON summary, trying the next model...")
+                if text and fallback is None:
+                    fallback = (text, label)
+            launch()
+    finally:
+        # Losers keep running in the background; their results are discarded
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    if fallback is not None:
+        return fallback
+    return "AI Generation Failed.\n\nErrors:\n" + "\n".join(errors or ["No AI provider configured."]), "Error"
+
+
+def generate_ai_report(gemini_api_key, perplexity_api_key, prompt, logger=None, hedge=None, timeout=None, budget=None, stream=None):
+    """Healthy models first (Gemini before Perplexity when untried), raced. Returns (content, source)."""
+    candidates = candidate_models(gemini_api_key, perplexity_api_key)
+    if not candidates:
+        return "AI Generation Failed.\n\nErrors:\nGemini API Key missing.", "Error"
+    health = get_provider_health()
+    total = len(candidates)
+    candidates, skipped = health.order(candidates)
+    if skipped and logger:
+        if len(candidates) == total:
+            logger("[AI] Every model is paused, trying them anyway...")
+        else:
+            logger(f"[AI] Skipping {len(skipped)} paused model(s): {', '.join(skipped)}")
+    return race(candidates, prompt, hedge=hedge, timeout=timeout, budget=budget, logger=logger, health=health, stream=stream)
+
+
+def generate_perplexity_report(api_key, system_prompt, logger=None):
+    """Perplexity only (kept for callers that want the old fallback directly)."""
+    return generate_ai_report(None, api_key, system_prompt, logger=logger)
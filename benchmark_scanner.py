@@ -0,0 +1,218 @@
+import argparse
+import contextlib
+import datetime
+import importlib.util
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+import numpy as np
+import pandas as pd
+
+from cm_williams_vix_fix import CMWilliamsVixFixScanner
+from data_cache import get_panel_cache
+from exchange_store import combine_panels, store_files
+from synthetic_data import SyntheticMarketGenerator
+
+# Offline benchmark suite for the scanner pipeline.
+# Generates (or reuses) deterministic synthetic databases and times each pipeline stage.
+# Results are written as JSON to benchmark_results/ so runs from different versions can be compared:
+#
+#   python benchmark_scanner.py --size 500
+#   python benchmark_scanner.py --size 500 --size 2000 --compare benchmark_results/<previous>.json
+#
+# Loads and scans are cached in-process (data_cache.py panels, per-store indicator memos), so the
+# plain *_s fields are cold timings (cache dropped before every repetition) and the *_warm_s
+# fields time the same call again on a warm cache.
+
+BENCH_DIR = "bench_data"
+RESULTS_DIR = "benchmark_results"
+DVRS_PATH = os.path.join("Quality-Value Regime Switch", "Quality-Value Regime Switch v1.py")
+
+
+def timed(fn, repeat=1, setup=None):
+    """Runs fn `repeat` times (stdout silenced, untimed setup() before each) and returns (median seconds, last result)."""
+    durations = []
+    result = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            if setup:
+                setup()
+            t0 = time.perf_counter()
+            result = fn()
+            durations.append(time.perf_counter() - t0)
+    return round(statistics.median(durations), 4), result
+
+
+def git_revision():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def load_dvrs_backtester():
+    spec = importlib.util.spec_from_file_location("dvrs_v1", DVRS_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module.Backtester
+
+
+def build_dvrs_signals(data):
+    """Converts a synthetic price panel into the long format consumed by DVRS Backtester.run."""
+    close = data.xs('Close', axis=1, level=1)
+    # Cheap-stock proxy: close more than 10% below its 1-year mean
+    is_value = close < close.rolling(250, min_periods=50).mean() * 0.9
+    long = close.stack().rename('close').to_frame()
+    long['signal'] = is_value.stack().reindex(long.index).fillna(False).astype(bool)
+    long = long.reset_index()
+    long.columns = ['date', 'stock_id', 'close', 'signal']
+    long['market_cheap_count'] = long['date'].map(is_value.sum(axis=1))
+    return long
+
+
+def run_size(size, args, generator):
+    workdir = os.path.join(BENCH_DIR, f"synthetic_{size}_{args.years}y_seed{args.seed}")
+    # fetch_data resolves its database relative to the working directory
+    csv_path = os.path.join(workdir, "data", "watchlist_data.csv")
+    results = {"tickers": size}
+
+    if args.regenerate or not store_files(csv_path):
+        print(f"[INFO] Generating synthetic universe ({size} tickers, {args.years}y)...")
+        results['generate_s'], universe_df = timed(lambda: generator.write_store(size, csv_path))
+        universe_df.to_csv(os.path.join(workdir, "universe.csv"), index=False)
+    universe_df = pd.read_csv(os.path.join(workdir, "universe.csv"))
+    tickers = universe_df['Ticker'].tolist()
+    results['store_size_mb'] = round(sum(os.path.getsize(f) for f in store_files(csv_path)) / (1024 * 1024), 1)
+
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        scanner = CMWilliamsVixFixScanner()
+        scanner.tickers = tickers
+
+        cache = get_panel_cache()
+
+        def load():
+            scanner.fetch_data(universe="watchlist", local_only=True)
+
+        def cold_load():
+            # Drops the cached panels and with them the indicator memos
+            cache.invalidate()
+            load()
+
+        # 1. Loading the local database (CSV parse vs. panel cache hit)
+        results['fetch_data_load_s'], _ = timed(load, args.repeat, setup=cache.invalidate)
+        results['fetch_data_load_warm_s'], _ = timed(load, args.repeat)
+        panels = scanner.panels
+        cells = sum(p.size for p in panels.values())
+        results['rows'] = {ex: int(p.shape[0]) for ex, p in panels.items()}
+        results['columns'] = int(sum(p.shape[1] for p in panels.values()))
+        results['nan_fraction'] = round(float(sum(p.isna().to_numpy().sum() for p in panels.values()) / cells), 4)
+        # Longest calendar drives the Time Machine dates
+        dates = max(panels.values(), key=len).index
+
+        # 2. Indicators on a fixed sample of tickers
+        sample = tickers[:: max(1, len(tickers) // args.indicator_sample)][:args.indicator_sample]
+        frames = [scanner.get_ticker_data(t) for t in sample]
+        frames = [f for f in frames if f is not None]
+        secs, _ = timed(lambda: [scanner.calculate_indicators(df) for df in frames], args.repeat)
+        results['calculate_indicators_per_ticker_ms'] = round(secs / len(frames) * 1000, 2)
+
+        # 3. Full scan as of the latest bar (optionally capped for the larger universes)
+        scan_tickers = tickers[:args.scan_limit] if args.scan_limit else tickers
+        scanner.tickers = scan_tickers
+        results['scan_tickers'] = len(scan_tickers)
+        results['run_scan_s'], scan = timed(lambda: scanner.run_scan(scan_date=dates[-1]), setup=cold_load)
+        results['run_scan_candidates'] = int(len(scan))
+        # Indicators memoized by the cold scan
+        results['run_scan_warm_s'], _ = timed(lambda: scanner.run_scan(scan_date=dates[-1]))
+
+        # 4. Time Machine queries at fixed points in the history, cold and with memoized indicators
+        tm, tm_warm = {}, {}
+        for frac in (0.25, 0.5, 0.75):
+            date = dates[int(len(dates) * frac)]
+            key = date.strftime('%Y-%m-%d')
+            tm[key], _ = timed(lambda: scanner.run_scan(scan_date=date), setup=cold_load)
+            tm_warm[key], _ = timed(lambda: scanner.run_scan(scan_date=date))
+        results['time_machine_s'] = tm
+        results['time_machine_warm_s'] = tm_warm
+    finally:
+        os.chdir(cwd)
+
+    # 5. DVRS backtester on the same price panel
+    try:
+        Backtester = load_dvrs_backtester()
+        signals = build_dvrs_signals(combine_panels(panels))
+        results['dvrs_backtest_s'], _ = timed(lambda: Backtester.run(signals), args.repeat)
+    except Exception as e:
+        results['dvrs_backtest_s'] = None
+        results['dvrs_error'] = f"{type(e).__name__}: {e}"
+
+    return results
+
+
+def compare(current, previous_path):
+    with open(previous_path, "r") as f:
+        previous = json.load(f)
+    print(f"\n[COMPARE] vs {previous_path} ({previous.get('git_revision')})")
+    for size, res in current['results'].items():
+        old = previous.get('results', {}).get(size)
+        if not old:
+            continue
+        for key, val in res.items():
+            if key.endswith('_s') or key.endswith('_ms'):
+                prev = old.get(key)
+                if isinstance(val, (int, float)) and isinstance(prev, (int, float)) and prev > 0:
+                    print(f"  {size:>6} {key:<38} {prev:>10.4f} -> {val:>10.4f}  ({val / prev:5.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark of the Vix Fix scanner pipeline.")
+    parser.add_argument("--size", type=int, action="append", help="Universe size (repeatable): 500, 2000, 10000. Default 500.")
+    parser.add_argument("--years", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions for the cheaper stages (median is reported)")
+    parser.add_argument("--indicator-sample", type=int, default=20)
+    parser.add_argument("--scan-limit", type=int, default=None, help="Cap the number of tickers in run_scan")
+    parser.add_argument("--regenerate", action="store_true", help="Rebuild the synthetic databases")
+    parser.add_argument("--label", default="", help="Free-form label stored with the results")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    args = parser.parse_args()
+
+    generator = SyntheticMarketGenerator(seed=args.seed, years=args.years)
+    report = {
+        "timestamp": datetime.datetime.now().isoformat(timespec='seconds'),
+        "git_revision": git_revision(),
+        "label": args.label,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "config": {k: v for k, v in vars(args).items() if k not in ('compare',)},
+        "results": {},
+    }
+
+    for size in args.size or [500]:
+        print(f"[INFO] Benchmarking synthetic_{size}...")
+        report['results'][str(size)] = run_size(size, args, generator)
+        print(json.dumps(report['results'][str(size)], indent=2))
+
+    if not os.path.exists(RESULTS_DIR):
+        os.makedirs(RESULTS_DIR)
+    stamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+    out_path = os.path.join(RESULTS_DIR, f"bench_{stamp}_{report['git_revision'] or 'nogit'}.json")
+    with open(out_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n[INFO] Results saved to {out_path}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import argparse
+import ast
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+
+from benchmark_scanner import RESULTS_DIR, git_revision
+
+# Startup (import) cost of the dashboard, so cold starts on Cloud Run don't regress silently.
+# Every measurement runs in a fresh interpreter:
+#   - dashboard_header_s: the module-level imports of vix_fix_dashboard.py (read from its source,
+#     so new top-level imports are picked up automatically) - what every cold start pays,
+#   - import_<module>_s: each heavy SDK on its own (what a feature pays the first time it is used),
+#   - dev_reload_s: one importlib.reload of the scanner (paid per rerun with VIXFIX_DEV_RELOAD=1),
+#   - the slowest modules of the header import according to `python -X importtime`.
+#
+#   python benchmark_startup.py
+#   python benchmark_startup.py --compare benchmark_results/<previous startup_*.json>
+
+DASHBOARD = "vix_fix_dashboard.py"
+HEAVY_MODULES = ["streamlit", "pandas", "plotly.graph_objects", "yfinance", "google.generativeai", "requests",
+                 "cm_williams_vix_fix", "ai_batch"]
+
+
+def header_imports(path=DASHBOARD):
+    """Import statements at the dashboard's module level (not inside functions / if blocks), as source lines."""
+    with open(path, "r", encoding="utf-8") as f:
+        source = f.read()
+    tree = ast.parse(source)
+    lines = []
+    for node in tree.body:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            lines.append(ast.get_source_segment(source, node))
+    return lines
+
+
+def time_in_fresh_interpreter(statements, repeat):
+    """Median seconds to run the import statements in a new interpreter (None if any import fails)."""
+    code = "import time; t0 = time.perf_counter()\n" + "\n".join(statements) + "\nprint(time.perf_counter() - t0)"
+    durations = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=os.getcwd())
+        if out.returncode != 0:
+            return None, out.stderr.strip().splitlines()[-1] if out.stderr.strip() else "failed"
+        durations.append(float(out.stdout.strip().splitlines()[-1]))
+    return round(statistics.median(durations), 4), None
+
+
+def slowest_imports(statements, top=15):
+    """(module, cumulative seconds) of the slowest imports according to -X importtime."""
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "\n".join(statements)],
+                         capture_output=True, text=True, cwd=os.getcwd())
+    rows = []
+    for line in out.stderr.splitlines():
+        # "import time:  self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        try:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            rows.append((name.rstrip()[1:], int(cumulative) / 1e6))
+        except ValueError:
+            continue
+    # Top-level packages only (nested entries are indented)
+    rows = [(name.strip(), s) for name, s in rows if not name.startswith("  ")]
+    return [{"module": name, "cumulative_s": round(s, 4)} for name, s in sorted(rows, key=lambda r: -r[1])[:top]]
+
+
+def compare(current, previous_path):
+    with open(previous_path, "r") as f:
+        previous = json.load(f)
+    print(f"\n[COMPARE] vs {previous_path} ({previous.get('git_revision')})")
+    for key, val in current['results'].items():
+        prev = previous.get('results', {}).get(key)
+        if isinstance(val, (int, float)) and isinstance(prev, (int, float)) and prev > 0:
+            print(f"  {key:<44} {prev:>8.4f} -> {val:>8.4f}  ({val / prev:5.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import / cold-start cost of the Vix Fix dashboard.")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per measurement (median is reported)")
+    parser.add_argument("--label", default="", help="Free-form label stored with the results")
+    parser.add_argument("--compare", help="Previous results JSON to compare against")
+    args = parser.parse_args()
+
+    header = header_imports()
+    report = {
+        "timestamp": datetime.datetime.now().isoformat(timespec='seconds'),
+        "git_revision": git_revision(),
+        "label": args.label,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {"repeat": args.repeat},
+        "header_imports": header,
+        "results": {},
+        "errors": {},
+    }
+    results = report['results']
+
+    print(f"[INFO] Timing the dashboard's {len(header)} top-level imports...")
+    results['dashboard_header_s'], error = time_in_fresh_interpreter(header, args.repeat)
+    if error:
+        report['errors']['dashboard_header_s'] = error
+
+    for module in HEAVY_MODULES:
+        key = f"import_{module}_s"
+        results[key], error = time_in_fresh_interpreter([f"import {module}"], args.repeat)
+        if error:
+            report['errors'][key] = error
+
+    reload_code = ["import cm_williams_vix_fix, importlib, time", "t = time.perf_counter()",
+                   "importlib.reload(cm_williams_vix_fix)", "print(time.perf_counter() - t)"]
+    out = subprocess.run([sys.executable, "-c", "\n".join(reload_code)], capture_output=True, text=True)
+    results['dev_reload_s'] = round(float(out.stdout.strip().splitlines()[-1]), 4) if out.returncode == 0 else None
+
+    importable = header if not report['errors'].get('dashboard_header_s') else \
+        [line for line in header if "streamlit" not in line]
+    report['slowest_header_imports'] = slowest_imports(importable)
+
+    print(json.dumps(results, indent=2))
+    if report['errors']:
+        print(f"[WARNING] Not importable here: {json.dumps(report['errors'], indent=2)}")
+    print("[INFO] Slowest header imports:")
+    for row in report['slowest_header_imports']:
+        print(f"  {row['module']:<40} {row['cumulative_s']:.4f}s")
+
+    if not os.path.exists(RESULTS_DIR):
+        os.makedirs(RESULTS_DIR)
+    stamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+    out_path = os.path.join(RESULTS_DIR, f"startup_{stamp}_{report['git_revision'] or 'nogit'}.json")
+    with open(out_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n[INFO] Results saved to {out_path}")
+
+    if args.compare:
+        compare(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
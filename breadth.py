@@ -0,0 +1,119 @@
+import time
+
+import numpy as np
+import pandas as pd
+
+from symbol_metadata import get_symbol_metadata
+
+# Market and sector breadth from the date x ticker matrices of each exchange panel.
+# The Vix Fix indicators are computed once for the whole universe with column-wise rolling
+# windows (no per-ticker calculate_indicators loop), then reduced per date and per sector:
+#   above_sma200  share of tickers closing above their 200-day SMA
+#   wvf_signal    share of tickers with WVF above its upper Bollinger band
+#   actionable    number of ACTIONABLE (Buy) setups: a full signal (WVF > UpperBB and
+#                 Close > SMA200) on the ticker's previous bar, same rule as run_scan
+# Shares are taken over the tickers that have a complete window on that date. Windows are
+# calendar-aligned per exchange, so a ticker with a hole inside its history drops out of the
+# denominators until the hole leaves the window (run_scan skips the hole instead).
+#
+#   result = compute_breadth(scanner)            # scanner with data loaded (fetch_data)
+#   result["above_sma200"][["All", "Technology"]]
+
+
+def indicator_matrices(panel, tickers, lookback_period=22, bb_length=20, bb_std=2.0, sma_filter=200):
+    """Wide (date x ticker) Close / WVF / UpperBB / SMA200 for the tickers present in an exchange panel."""
+    present = panel.columns.get_level_values(0)
+    tickers = [t for t in dict.fromkeys(tickers) if t in present]
+    close = panel.xs('Close', axis=1, level=1).reindex(columns=tickers).astype(float)
+    low = panel.xs('Low', axis=1, level=1).reindex(columns=tickers).astype(float)
+    highest_close = close.rolling(window=lookback_period).max()
+    wvf = (highest_close - low) / highest_close * 100
+    upper_bb = wvf.rolling(window=bb_length).mean() + bb_std * wvf.rolling(window=bb_length).std()
+    sma200 = close.rolling(window=sma_filter).mean()
+    return {"Close": close, "WVF": wvf, "UpperBB": upper_bb, "SMA200": sma200}
+
+
+def _counts(matrices):
+    """Per-date boolean matrices behind the breadth series (dates x tickers)."""
+    close, wvf, upper_bb, sma200 = matrices["Close"], matrices["WVF"], matrices["UpperBB"], matrices["SMA200"]
+    has_bar = close.notna()
+    valid = sma200.notna() & upper_bb.notna()
+    above = (close > sma200) & valid
+    wvf_signal = (wvf > upper_bb) & valid
+    signal = wvf_signal & (close > sma200)
+    # Previous bar of the same ticker (skipping dates without a bar), like past_data.iloc[-2] in run_scan
+    previous = signal.astype(float).where(has_bar).ffill().shift(1)
+    actionable = (previous == 1) & has_bar
+    return {"valid": valid, "above_sma200": above, "wvf_signal": wvf_signal, "actionable": actionable}
+
+
+def _by_sector(frame, sectors):
+    """Column sums per sector plus an 'All' column (dates x groups)."""
+    groups = frame.T.groupby(sectors.reindex(frame.columns).fillna("Unknown").to_numpy()).sum().T
+    groups.insert(0, "All", frame.sum(axis=1))
+    return groups
+
+
+def _add_aligned(total, grouped):
+    """Sum of two per-exchange sector frames over the union of dates and sectors (missing = 0)."""
+    index = total.index.union(grouped.index)
+    columns = ["All"] + sorted(set(total.columns).union(grouped.columns) - {"All"})
+    return (total.reindex(index=index, columns=columns, fill_value=0)
+            + grouped.reindex(index=index, columns=columns, fill_value=0))
+
+
+def ticker_sectors(scanner, tickers):
+    """Sector per ticker: the universe table first, the symbol metadata store for the rest."""
+    sectors = {}
+    universe = scanner.universe_df
+    if universe is not None and not universe.empty and 'Sector' in universe.columns and 'Ticker' in universe.columns:
+        sectors.update(universe.dropna(subset=['Sector']).set_index('Ticker')['Sector'].to_dict())
+    store = get_symbol_metadata()
+    for ticker in tickers:
+        if not sectors.get(ticker):
+            sectors[ticker] = store.get(ticker).get('sector') or "Unknown"
+    return pd.Series(sectors, dtype=object)
+
+
+def compute_breadth(scanner, tickers=None, start=None, end=None, sectors=None):
+    """
+    Breadth series for the scanner's universe (or `tickers`), by sector.
+    Returns {"above_sma200": shares, "wvf_signal": shares, "actionable": counts, "members": counts},
+    each a DataFrame indexed by date with an "All" column followed by one column per sector.
+    """
+    t0 = time.perf_counter()
+    tickers = list(tickers or scanner.tickers or [])
+    if sectors is None:
+        sectors = ticker_sectors(scanner, tickers)
+    lookback, bb_length, bb_std, sma_filter = scanner.indicator_params()
+
+    totals = {}
+    for exchange, panel in scanner.panels.items():
+        if panel is None or panel.empty:
+            continue
+        matrices = indicator_matrices(panel, tickers, lookback, bb_length, bb_std, sma_filter)
+        if matrices["Close"].shape[1] == 0:
+            continue
+        for name, frame in _counts(matrices).items():
+            grouped = _by_sector(frame, sectors)
+            # Exchanges have different calendars and sectors: align on the union of both
+            totals[name] = grouped if name not in totals else _add_aligned(totals[name], grouped)
+
+    if not totals:
+        return {}
+    members = totals["valid"]
+    result = {
+        "above_sma200": totals["above_sma200"] / members.replace(0, np.nan),
+        "wvf_signal": totals["wvf_signal"] / members.replace(0, np.nan),
+        "actionable": totals["actionable"].astype(int),
+        "members": members.astype(int),
+    }
+    for name in result:
+        frame = result[name].sort_index()
+        if start is not None:
+            frame = frame[frame.index >= pd.to_datetime(start)]
+        if end is not None:
+            frame = frame[frame.index <= pd.to_datetime(end)]
+        result[name] = frame
+    scanner.log(f"[INFO] Breadth for {len(tickers)} tickers computed in {time.perf_counter() - t0:.2f}s")
+    return result
@@ -0,0 +1,158 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Analysis chart data pipeline: one join of bars + indicators per render, a range cut,
+# OHLC-aware downsampling for long ranges and WebGL line traces.
+#
+# Downsampling buckets consecutive bars (aligned to the last bar, so the newest candle is the
+# as-of bar) and keeps what the eye needs from each bucket:
+#   Open = first, High = max, Low = min, Close = last  (candles keep every extreme)
+#   WVF = max (spikes survive), Signal = any bar in the bucket signalled,
+#   UpperBB / SMA200 / Supertrend = last.
+# VIXFIX_CHART_MAX_POINTS (default 600) caps the number of candles drawn.
+#
+#   frame = prepare_chart_frame(scanner.get_ticker_data(t), scanner.get_indicators(t), as_of, "2Y")
+#   fig = build_chart(downsample(frame))
+
+CHART_RANGES = {"6M": pd.DateOffset(months=6), "2Y": pd.DateOffset(years=2), "5Y": pd.DateOffset(years=5), "All": None}
+DEFAULT_MAX_POINTS = 600
+LINE_COLUMNS = ["WVF", "UpperBB", "SMA200", "Supertrend", "SupertrendTrend"]
+
+
+def max_points():
+    return int(os.environ.get("VIXFIX_CHART_MAX_POINTS", DEFAULT_MAX_POINTS))
+
+
+def prepare_chart_frame(bars, indicators, as_of, range_key="6M"):
+    """
+    OHLC + indicator columns up to `as_of` for the selected range, plus a boolean Signal column
+    (WVF above its upper band while Close is above the 200-day SMA).
+    """
+    end = pd.to_datetime(as_of)
+    history = indicators[indicators.index <= end]
+    offset = CHART_RANGES.get(range_key)
+    if offset is not None and not history.empty:
+        history = history[history.index > history.index[-1] - offset]
+    columns = [c for c in LINE_COLUMNS if c in history.columns]
+    frame = history[["Close"] + columns].copy()
+    # One aligned lookup for the three price columns the indicator frame does not carry
+    ohlc = bars[["Open", "High", "Low"]].reindex(frame.index)
+    frame.insert(0, "Open", ohlc["Open"].to_numpy())
+    frame.insert(1, "High", ohlc["High"].to_numpy())
+    frame.insert(2, "Low", ohlc["Low"].to_numpy())
+    frame["Signal"] = ((frame["WVF"] > frame["UpperBB"]) & (frame["Close"] > frame["SMA200"])).to_numpy()
+    return frame
+
+
+def downsample(frame, limit=None):
+    """Buckets the frame to at most `limit` rows (see module comment). Short frames are returned as-is."""
+    limit = limit or max_points()
+    n = len(frame)
+    if n <= limit:
+        return frame
+    size = -(-n // limit)
+    # Align buckets to the end: the first bucket may be partial, the last one ends at the as-of bar
+    starts = np.arange((n - 1) % size + 1 - size, n, size)
+    starts[0] = 0
+    ends = np.append(starts[1:], n) - 1
+
+    out = {}
+    for column in frame.columns:
+        values = frame[column].to_numpy()
+        if column == "Open":
+            out[column] = values[starts]
+        elif column in ("High", "WVF"):
+            out[column] = np.fmax.reduceat(values.astype(float), starts)
+        elif column == "Low":
+            out[column] = np.fmin.reduceat(values.astype(float), starts)
+        elif column == "Signal":
+            out[column] = np.logical_or.reduceat(values.astype(bool), starts)
+        else:
+            out[column] = values[ends]
+    return pd.DataFrame(out, index=frame.index[ends])
+
+
+def build_chart(frame):
+    """Two-row figure (price + WVF) from a prepared, possibly downsampled frame."""
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    x = frame.index
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.05, row_heights=[0.6, 0.4])
+    # Candlesticks have no WebGL variant; downsampling keeps their count bounded instead
+    fig.add_trace(go.Candlestick(x=x, open=frame["Open"], high=frame["High"], low=frame["Low"], close=frame["Close"], name="Price"), row=1, col=1)
+
+    if "Supertrend" in frame.columns:
+        trend = frame["SupertrendTrend"].to_numpy()
+        level = frame["Supertrend"].to_numpy(dtype=float)
+        fig.add_trace(go.Scattergl(x=x, y=np.where(trend == 1, level, np.nan), mode='lines', line=dict(color='green', width=2), name='Supertrend (Up)'), row=1, col=1)
+        fig.add_trace(go.Scattergl(x=x, y=np.where(trend == -1, level, np.nan), mode='lines', line=dict(color='red', width=2), name='Supertrend (Down)'), row=1, col=1)
+    fig.add_trace(go.Scattergl(x=x, y=frame["SMA200"], mode='lines', line=dict(color='orange', width=2), name='SMA 200'), row=1, col=1)
+    fig.add_trace(go.Scattergl(x=x, y=frame["WVF"], mode='lines', fill='tozeroy', line=dict(color='cyan', width=1), name="WVF"), row=2, col=1)
+    fig.add_trace(go.Scattergl(x=x, y=frame["UpperBB"], mode='lines', line=dict(color='gray', dash='dash'), name="Upper BB"), row=2, col=1)
+
+    signals = frame[frame["Signal"]]
+    if not signals.empty:
+        fig.add_trace(go.Scattergl(x=signals.index, y=signals["WVF"], mode='markers', marker=dict(color='red', size=8, symbol='x'), name='Signal'), row=2, col=1)
+    return fig
+
+
+# --- Small multiples ---
+# Compact price / WVF / UpperBB sparklines for every scan candidate in a single figure.
+# Data comes from scanner.get_indicators, which the scan has already memoized per store entry,
+# so building the grid recomputes nothing.
+
+GRID_BARS = 120
+
+
+def grid_frames(scanner, tickers, as_of, bars=GRID_BARS):
+    """{ticker: last `bars` rows of Close / WVF / UpperBB / Signal up to as_of} for the tickers with data."""
+    end = pd.to_datetime(as_of)
+    frames = {}
+    for ticker in tickers:
+        indicators = scanner.get_indicators(ticker)
+        if indicators is None or indicators.empty:
+            continue
+        history = indicators[indicators.index <= end].tail(bars)
+        if history.empty:
+            continue
+        frame = history[["Close", "WVF", "UpperBB"]].copy()
+        frame["Signal"] = ((history["WVF"] > history["UpperBB"]) & (history["Close"] > history["SMA200"])).to_numpy()
+        frames[ticker] = frame
+    return frames
+
+
+def build_grid(frames, cols=5, cell_height=170, labels=None):
+    """One figure, one cell per ticker: price line on top, WVF (filled) and UpperBB (dashed) below."""
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    tickers = list(frames)
+    rows = max(1, -(-len(tickers) // cols))
+    titles = []
+    for r in range(rows):
+        row_tickers = tickers[r * cols:(r + 1) * cols]
+        titles += [(labels or {}).get(t, t) for t in row_tickers] + [""] * (cols - len(row_tickers))
+        titles += [""] * cols
+    fig = make_subplots(rows=2 * rows, cols=cols, shared_xaxes=False, vertical_spacing=0.02 / rows * 4,
+                        horizontal_spacing=0.02, row_heights=[0.65, 0.35] * rows, subplot_titles=titles)
+
+    for i, ticker in enumerate(tickers):
+        frame = frames[ticker]
+        row, col = 2 * (i // cols) + 1, i % cols + 1
+        x = frame.index
+        fig.add_trace(go.Scattergl(x=x, y=frame["Close"], mode='lines', line=dict(color='white', width=1)), row=row, col=col)
+        fig.add_trace(go.Scattergl(x=x, y=frame["WVF"], mode='lines', fill='tozeroy', line=dict(color='cyan', width=1)), row=row + 1, col=col)
+        fig.add_trace(go.Scattergl(x=x, y=frame["UpperBB"], mode='lines', line=dict(color='gray', width=1, dash='dash')), row=row + 1, col=col)
+        signals = frame[frame["Signal"]]
+        if not signals.empty:
+            fig.add_trace(go.Scattergl(x=signals.index, y=signals["WVF"], mode='markers', marker=dict(color='red', size=5, symbol='x')), row=row + 1, col=col)
+
+    fig.update_xaxes(showticklabels=False, showgrid=False)
+    fig.update_yaxes(showticklabels=False, showgrid=False)
+    fig.update_annotations(font_size=11)
+    fig.update_layout(height=rows * cell_height, showlegend=False, template="plotly_dark",
+                      margin=dict(l=5, r=5, t=25, b=5))
+    return fig
@@ -1,4 +1,3 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
 import datetime
@@ -6,6 +5,16 @@ import warnings
 import json
 import os
 
+from data_cache import get_panel_cache
+from exchange_store import (combine_panels, merge_rows, partition_by_exchange,
+                            save_panels, store_files, ticker_spans)
+from single_flight import store_lock
+from signal_history import get_signal_history
+from symbol_metadata import get_symbol_metadata
+from trading_calendar import NYSE, exchange_for_ticker, last_closed_session, split_tickers_by_exchange
+from universe_cache import get_constituent_cache, read_html_tables
+from universe_membership import get_membership_index
+
 # Suppress warnings
 warnings.filterwarnings('ignore')
 
@@ -18,7 +27,10 @@ class CMWilliamsVixFixScanner:
         self.top_n_volume = top_n_volume
         self.logger_callback = logger_callback
         self.tickers = []
-        self.data = {}
+        self.panels = {}
+        self._combined = None
+        self._spans = {}
+        self._store_entry = None
         self.universe_df = None
         self.current_universe = "sp500" # Default universe state
 
@@ -27,29 +39,64 @@ class CMWilliamsVixFixScanner:
             self.logger_callback(message)
         print(message)
 
+    WIKI_HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
+
+    @staticmethod
+    def _parse_sp500_html(html):
+        tables = read_html_tables(html)
+        df_tickers = tables[0]
+        
+        # Normalize columns
+        rename_map = {
+            'Symbol': 'Ticker',
+            'Security': 'Name',
+            'GICS Sector': 'Sector',
+            'GICS Sub-Industry': 'Industry'
+        }
+        # Only rename columns that exist
+        df_tickers = df_tickers.rename(columns={k: v for k, v in rename_map.items() if k in df_tickers.columns})
+        
+        # Ensure required columns exist
+        if 'Sector' not in df_tickers.columns:
+            df_tickers['Sector'] = 'Unknown'
+        return df_tickers
+
+    @staticmethod
+    def _parse_nasdaq100_html(html):
+        tables = read_html_tables(html)
+        
+        df_tickers = None
+        for table in tables:
+            if 'Ticker' in table.columns or 'Symbol' in table.columns:
+                df_tickers = table
+                break
+        
+        if df_tickers is None:
+            raise ValueError("Could not find ticker table in Wikipedia page")
+
+        # Normalize columns. Wiki table usually has "Ticker", "Company", "GICS Sector", "GICS Sub-Industry"
+        rename_map = {
+            'Symbol': 'Ticker',
+            'Company': 'Name',
+            'GICS Sector': 'Sector',
+            'GICS Sub-Industry': 'Industry'
+        }
+        df_tickers = df_tickers.rename(columns={k: v for k, v in rename_map.items() if k in df_tickers.columns})
+        
+        # Ensure Ticker column name is consistent
+        if 'Symbol' in df_tickers.columns and 'Ticker' not in df_tickers.columns:
+            df_tickers = df_tickers.rename(columns={'Symbol': 'Ticker'})
+        
+        if 'Sector' not in df_tickers.columns:
+             df_tickers['Sector'] = 'Technology' # Fallback for now, usually it exists
+        return df_tickers
+
     def get_sp500_tickers(self):
-        self.log("[INFO] Scraping S&P 500 constituents from Wikipedia...")
+        self.log("[INFO] Loading S&P 500 constituents (Wikipedia, cached)...")
         try:
             url = 'https://en.wikipedia.org/wiki/List_of_S%26P_500_companies'
-            headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-            import requests
-            response = requests.get(url, headers=headers)
-            tables = pd.read_html(response.text)
-            df_tickers = tables[0]
-            
-            # Normalize columns
-            rename_map = {
-                'Symbol': 'Ticker',
-                'Security': 'Name',
-                'GICS Sector': 'Sector',
-                'GICS Sub-Industry': 'Industry'
-            }
-            # Only rename columns that exist
-            df_tickers = df_tickers.rename(columns={k: v for k, v in rename_map.items() if k in df_tickers.columns})
-            
-            # Ensure required columns exist
-            if 'Sector' not in df_tickers.columns:
-                df_tickers['Sector'] = 'Unknown'
+            # TTL cache with conditional revalidation and offline fallback (universe_cache.py)
+            df_tickers = get_constituent_cache().get("sp500", url, self._parse_sp500_html, headers=self.WIKI_HEADERS, logger=self.log)
             
             self.universe_df = df_tickers
             
@@ -64,43 +111,15 @@ class CMWilliamsVixFixScanner:
             return []
 
     def get_nasdaq100_tickers(self):
-        self.log("[INFO] Scraping Nasdaq 100 constituents from Wikipedia...")
+        self.log("[INFO] Loading Nasdaq 100 constituents (Wikipedia, cached)...")
         try:
             url = 'https://en.wikipedia.org/wiki/Nasdaq-100'
-            headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-            import requests
-            response = requests.get(url, headers=headers)
-            tables = pd.read_html(response.text)
-            
-            df_tickers = None
-            for table in tables:
-                if 'Ticker' in table.columns or 'Symbol' in table.columns:
-                    df_tickers = table
-                    break
-            
-            if df_tickers is not None:
-                # Normalize columns. Wiki table usually has "Ticker", "Company", "GICS Sector", "GICS Sub-Industry"
-                rename_map = {
-                    'Symbol': 'Ticker',
-                    'Company': 'Name',
-                    'GICS Sector': 'Sector',
-                    'GICS Sub-Industry': 'Industry'
-                }
-                df_tickers = df_tickers.rename(columns={k: v for k, v in rename_map.items() if k in df_tickers.columns})
-                
-                # Ensure Ticker column name is consistent
-                if 'Symbol' in df_tickers.columns and 'Ticker' not in df_tickers.columns:
-                    df_tickers = df_tickers.rename(columns={'Symbol': 'Ticker'})
-                
-                if 'Sector' not in df_tickers.columns:
-                     df_tickers['Sector'] = 'Technology' # Fallback for now, usually it exists
+            df_tickers = get_constituent_cache().get("nasdaq100", url, self._parse_nasdaq100_html, headers=self.WIKI_HEADERS, logger=self.log)
 
-                self.universe_df = df_tickers
-                self.tickers = df_tickers['Ticker'].apply(lambda x: x.replace('.', '-')).tolist()
-                self.log(f"  Retrieved {len(self.tickers)} tickers.")
-                return self.tickers
-            else:
-                raise ValueError("Could not find ticker table in Wikipedia page")
+            self.universe_df = df_tickers
+            self.tickers = df_tickers['Ticker'].apply(lambda x: x.replace('.', '-')).tolist()
+            self.log(f"  Retrieved {len(self.tickers)} tickers.")
+            return self.tickers
                 
         except Exception as e:
             self.log(f"  Failed to retrieve Nasdaq 100 tickers: {e}")
@@ -300,17 +319,111 @@ class CMWilliamsVixFixScanner:
             self.tickers = []
             return pd.DataFrame(columns=['Ticker', 'Name', 'Sector'])
 
-    def get_data_status(self, universe="sp500"):
+    def _get_csv_path(self, universe):
         DATA_DIR = "data"
         csv_filename = f"{universe}_data.csv"
         csv_filename = "".join([c for c in csv_filename if c.isalnum() or c in (' ', '.', '_', '-')]).strip()
-        csv_path = os.path.join(DATA_DIR, csv_filename)
+        return os.path.join(DATA_DIR, csv_filename)
+
+    # --- Exchange-partitioned data (see exchange_store.py) ---
+    # self.panels holds one dense panel per exchange calendar (NYSE, TWSE).
+    # self.data is kept as a combined view for older scripts; internal code uses the panels.
+
+    @property
+    def data(self):
+        if not self.panels:
+            return None
+        if self._combined is None:
+            self._combined = combine_panels(self.panels)
+        return self._combined
+
+    @data.setter
+    def data(self, value):
+        if isinstance(value, dict):
+            # Own dict: the panels themselves may be shared through the process cache (read-only)
+            self.panels = dict(value)
+        elif value is None or value.empty:
+            self.panels = {}
+        else:
+            self.panels = partition_by_exchange(value)
+        self._combined = None
+        self._spans = {}
+        self._store_entry = None
+
+    def _use_cached(self, entry):
+        # Panels from data_cache come with shared ticker_spans / indicator memos
+        self.data = entry.panels
+        self._spans = entry.spans
+        self._store_entry = entry
+
+    def indicator_params(self):
+        return (self.lookback_period, self.bb_length, self.bb_std, self.sma_filter)
+
+    def get_indicators(self, ticker):
+        """
+        calculate_indicators() of one ticker, memoized per store version and parameters.
+        The returned frame may be shared with other scans: treat it as read-only.
+        """
+        entry = self._store_entry
+        key = (ticker,) + self.indicator_params()
+        if entry is not None and key in entry.indicators:
+            return entry.indicators[key]
+        df_ticker = self.get_ticker_data(ticker)
+        if df_ticker is None or df_ticker.empty:
+            indicators = None
+        else:
+            indicators = self.calculate_indicators(df_ticker)
+        if entry is not None:
+            entry.remember_indicators(key, indicators)
+        return indicators
+
+    def _get_spans(self, exchange):
+        if exchange not in self._spans:
+            self._spans[exchange] = ticker_spans(self.panels.get(exchange))
+        return self._spans[exchange]
+
+    def get_ticker_data(self, ticker):
+        """Returns the complete OHLCV bars of one ticker from its exchange panel (None if absent)."""
+        exchange = exchange_for_ticker(ticker)
+        span = self._get_spans(exchange).get(ticker)
+        if span is None:
+            return None
+        start, stop, has_holes = span
+        df_ticker = self.panels[exchange][ticker].iloc[start:stop]
+        # Only tickers with holes inside their history need the dropna copy
+        return df_ticker.dropna() if has_holes else df_ticker
+
+    def _stored_tickers(self):
+        tickers = set()
+        for panel in self.panels.values():
+            tickers.update(panel.columns.get_level_values(0))
+        return tickers
+
+    def universe_as_of(self, date):
+        """
+        Tickers of the current universe that were index members on `date` (see universe_membership.py).
+        Universes without a change history (watchlists, ETFs, Taiwan lists) return self.tickers.
+        """
+        index = get_membership_index(self.current_universe, logger=self.log)
+        if index is None:
+            return self.tickers
+        members = index.members_as_of(date)
+        stored = self._stored_tickers()
+        available = [t for t in members if t in stored]
+        missing = len(members) - len(available)
+        if missing:
+            self.log(f"  [WARNING] {missing} of {len(members)} members as of {pd.Timestamp(date).date()} have no local data (delisted or not downloaded).")
+        return available
+
+    def get_data_status(self, universe="sp500"):
+        csv_path = self._get_csv_path(universe)
+        files = store_files(csv_path)
         
-        if os.path.exists(csv_path):
+        if files:
             try:
                 # Just read header to be fast? Or stats
-                stats = os.stat(csv_path)
-                last_mod = datetime.datetime.fromtimestamp(stats.st_mtime)
+                stats = [os.stat(f) for f in files]
+                last_mod = datetime.datetime.fromtimestamp(max(st.st_mtime for st in stats))
                 
                 # To get accurate ticker count and last date without reading full file efficiently:
                 # We can just read the first few lines or headers.
@@ -320,7 +433,8 @@ class CMWilliamsVixFixScanner:
                     "exists": True,
                     "last_modified": last_mod,
                     "path": csv_path,
-                    "size_mb": round(stats.st_size / (1024*1024), 2)
+                    "files": files,
+                    "size_mb": round(sum(st.st_size for st in stats) / (1024*1024), 2)
                 }
                 return status
             except Exception as e:
@@ -352,34 +466,49 @@ class CMWilliamsVixFixScanner:
              self.get_sp500_tickers()
              
         # self.tickers is now set
+        # Names / sectors of the universe go to the persistent metadata store (symbol_metadata.py)
+        if universe != "watchlist" and self.universe_df is not None:
+            # Wikipedia tables are authoritative; the hand-made lists only fill gaps
+            get_symbol_metadata().update_from_universe(self.universe_df, overwrite=universe in ("sp500", "nasdaq100"))
             
         # --- DATA CACHING LOGIC ---
         DATA_DIR = "data"
         if not os.path.exists(DATA_DIR):
             os.makedirs(DATA_DIR)
             
-        csv_filename = f"{universe}_data.csv"
-        csv_filename = "".join([c for c in csv_filename if c.isalnum() or c in (' ', '.', '_', '-')]).strip()
-        csv_path = os.path.join(DATA_DIR, csv_filename)
-        
-        existing_data = None
+        csv_path = self._get_csv_path(universe)
+
+        if local_only:
+            self._sync_store(csv_path, lookback_days, force_refresh, local_only=True)
+            return
+
+        # Writers of the same database are serialized across sessions and processes
+        with store_lock(csv_path, logger=self.log):
+            self._sync_store(csv_path, lookback_days, force_refresh, local_only=False)
+
+    def _sync_store(self, csv_path, lookback_days, force_refresh, local_only):
+        existing_panels = {}
+        existing_entry = None
         last_date = None
         
-        # Try Loading Local
-        if os.path.exists(csv_path):
+        # Try Loading Local (one panel per exchange calendar; unchanged stores come from memory)
+        if store_files(csv_path):
             try:
                 self.log(f"  Loading local database: {csv_path}...")
-                existing_data = pd.read_csv(csv_path, header=[0, 1], index_col=0, parse_dates=True)
-                if not existing_data.empty:
-                    last_date = existing_data.index[-1]
-                    self.log(f"  Database loaded. Last Date: {last_date.date()}. Rows: {len(existing_data)}")
+                existing_entry = get_panel_cache().load(csv_path)
+                existing_panels = existing_entry.panels
+                if existing_panels:
+                    # Oldest "last bar" across exchanges, so no exchange is left behind on update
+                    last_date = min(p.index[-1] for p in existing_panels.values())
+                    shape = ", ".join(f"{ex}: {len(p)} rows" for ex, p in existing_panels.items())
+                    self.log(f"  Database loaded. Last Date: {last_date.date()}. {shape}")
             except Exception as e:
                 self.log(f"  [ERROR] Corrupt database file: {e}")
-                existing_data = None
+                existing_panels = {}
 
         if local_only:
-            if existing_data is not None:
-                self.data = existing_data
+            if existing_panels:
+                self._use_cached(existing_entry)
                 self.log("  [Mode] Offline: Using local data only.")
             else:
                 self.log("  [Mode] Offline: No local data found! Please running 'Update Database' first.")
@@ -389,7 +518,7 @@ class CMWilliamsVixFixScanner:
         # ... (Download Logic for Online Mode) ...
         
         # Calculate start date
-        if existing_data is not None and last_date is not None and not force_refresh:
+        if existing_panels and last_date is not None and not force_refresh:
              # Start from next day
              start_date_ts = last_date + datetime.timedelta(days=1)
              start_date = start_date_ts.strftime('%Y-%m-%d')
@@ -400,24 +529,37 @@ class CMWilliamsVixFixScanner:
             self.log(f"  [Mode] Full Download: Fetching start {start_date}...")
 
 
-        end_date = datetime.datetime.now().strftime('%Y-%m-%d')
+        last_session, end_date = self._download_end(self.tickers)
         
-        # Check if up to date
-        if existing_data is not None and start_date >= end_date:
+        # Check if up to date (nothing after the last closed session to fetch)
+        if existing_panels and start_date > last_session.strftime('%Y-%m-%d'):
             self.log("  Data is up to date. Using cache.")
-            self.data = existing_data
+            self._use_cached(existing_entry)
             return
 
-        # Download new data
+        # Full downloads also fetch past index members (survivorship-free Time Machine);
+        # incremental updates only need the current constituents.
+        download_tickers = list(self.tickers)
+        if not existing_panels or force_refresh:
+            index = get_membership_index(self.current_universe, logger=self.log)
+            if index is not None:
+                current = set(download_tickers)
+                former = [t for t in index.members_between(start_date, end_date) if t not in current]
+                if former:
+                    self.log(f"  Including {len(former)} former index members for point-in-time scans.")
+                    download_tickers += former
+
+        # Download new data (yfinance is only imported when a download actually happens)
+        import yfinance as yf
         try:
             # Chunking to avoid [Errno 22] and improve stability
             chunk_size = 10
             new_data_list = []
             
-            for i in range(0, len(self.tickers), chunk_size):
-                chunk = self.tickers[i:i + chunk_size]
+            for i in range(0, len(download_tickers), chunk_size):
+                chunk = download_tickers[i:i + chunk_size]
                 try:
-                    self.log(f"  Downloading chunk {i//chunk_size + 1}/{len(self.tickers)//chunk_size + 1}: {chunk}")
+                    self.log(f"  Downloading chunk {i//chunk_size + 1}/{len(download_tickers)//chunk_size + 1}: {chunk}")
                     # threads=False is CRITICAL on Windows to prevent [Errno 22] Invalid Argument
                     chunk_data = yf.download(chunk, start=start_date, end=end_date, group_by='ticker', progress=False, threads=False)
                     
@@ -430,13 +572,10 @@ class CMWilliamsVixFixScanner:
 
             if not new_data_list:
                 self.log("  No new data downloaded (all chunks failed or empty).")
-                self.data = existing_data
+                self.data = existing_panels
             else:
-                # Concatenate all chunks along columns (axis=1) if they have different tickers?
-                # yf.download(group_by='ticker') returns MultiIndex columns (Ticker, OHLC)
-                # We need to concat carefully.
-                # Actually, if we concat along axis=1, we merge tickers.
-                
+                # yf.download(group_by='ticker') returns MultiIndex columns (Ticker, OHLC),
+                # chunks are joined along columns and then split by exchange calendar.
                 try:
                     if len(new_data_list) == 1:
                         new_data = new_data_list[0]
@@ -444,40 +583,160 @@ class CMWilliamsVixFixScanner:
                         new_data = pd.concat(new_data_list, axis=1)
                     
                     self.log(f"  Downloaded total data shape: {new_data.shape}")
-    
-                    if existing_data is not None:
-                        # Combine with existing
-                        # Note: We need to handle overlapping columns if any.
-                        # pd.combine_first or concat. 
-                        # Simplest is to concat rows and drop duplicates, but tickers are columns.
-                        
-                        # We are fetching NEW rows (dates).
-                        # But since we chunked the columns (tickers), 'new_data' has full width (all tickers)? 
-                        # No, pd.concat(axis=1) joins columns.
-                        
-                        # If existing_data has tickers A,B and new_data has tickers A,B but new dates...
-                        # Wait, we download ALL valid tickers for the new date range.
-                        # So new_data has (NewDates, AllTickers).
-                        
-                        # So we append new_data to existing_data (axis=0).
-                        combined_data = pd.concat([existing_data, new_data], axis=0) 
-                        combined_data = combined_data[~combined_data.index.duplicated(keep='last')]
-                        combined_data.sort_index(inplace=True)
-                        self.data = combined_data
-                    else:
-                        self.data = new_data
+                    new_panels = partition_by_exchange(new_data)
 
-                    # Save back to CSV
-                    self.log(f"  Saving database to {csv_path}...")
-                    self.data.to_csv(csv_path)
+                    # We are fetching NEW rows (dates) for all tickers, so each exchange panel
+                    # gets the new rows appended (axis=0).
+                    merged = dict(existing_panels)
+                    for exchange, panel in new_panels.items():
+                        merged[exchange] = merge_rows(existing_panels.get(exchange), panel)
+                    # Save back to CSV (one file per exchange)
+                    self.log(f"  Saving database to {csv_path} ({', '.join(merged)})...")
+                    save_panels(merged, csv_path)
+                    self._use_cached(get_panel_cache().put(csv_path, merged))
+                    if force_refresh and existing_panels:
+                        self._history_changed(download_tickers)
 
                 except Exception as merge_e:
                     self.log(f"  [ERROR] Failed to merge/save data: {merge_e}")
-                    self.data = existing_data # Fallback
+                    self.data = existing_panels # Fallback
                 
         except Exception as e:
             self.log(f"  Failed to download/update data: {e}")
-            self.data = existing_data # Fallback to what we have
+            self.data = existing_panels # Fallback to what we have
+
+    @staticmethod
+    def _download_end(tickers):
+        """
+        (last closed session, yfinance `end`) for the exchanges of the tickers. `end` is exclusive,
+        so it is the day after the latest closed session: a post-close run gets today's bar, a run
+        during the session does not store a partial one.
+        """
+        exchanges = split_tickers_by_exchange(tickers) or {NYSE: []}
+        last_session = max(last_closed_session(ex) for ex in exchanges)
+        return last_session, (last_session + datetime.timedelta(days=1)).strftime('%Y-%m-%d')
+
+    def backfill_gaps(self, universe="sp500", chunk_size=10):
+        """
+        Finds holes in the middle of the local database (e.g. left by a failed download chunk)
+        and downloads only the missing date ranges, instead of a full force_refresh.
+        Returns the DataFrame of gaps that were found.
+        """
+        csv_path = self._get_csv_path(universe)
+        with store_lock(csv_path, logger=self.log):
+            return self._backfill_gaps_locked(universe, csv_path, chunk_size)
+
+    def _backfill_gaps_locked(self, universe, csv_path, chunk_size):
+        from data_gaps import find_gaps, plan_backfill, merge_backfill
+
+        entry = get_panel_cache().load(csv_path)
+        panels = entry.panels
+        if not panels:
+            self.log(f"[ERROR] No local database for {universe}. Run 'Update Database' first.")
+            return pd.DataFrame()
+
+        gaps = pd.concat([find_gaps(p) for p in panels.values()], ignore_index=True)
+        if gaps.empty:
+            self.log(f"[INFO] No gaps found in {csv_path}.")
+            self._use_cached(entry)
+            return gaps
+
+        jobs = plan_backfill(gaps)
+        self.log(f"[INFO] Found {len(gaps)} gaps in {gaps['Ticker'].nunique()} tickers. Backfilling {len(jobs)} date ranges...")
+
+        import yfinance as yf
+        new_data_list = []
+        for start, end, tickers in jobs:
+            # yfinance 'end' is exclusive
+            end_excl = (end + datetime.timedelta(days=1)).strftime('%Y-%m-%d')
+            for i in range(0, len(tickers), chunk_size):
+                chunk = tickers[i:i + chunk_size]
+                try:
+                    self.log(f"  Backfilling {start.date()} -> {end.date()}: {chunk}")
+                    chunk_data = yf.download(chunk, start=start.strftime('%Y-%m-%d'), end=end_excl, group_by='ticker', progress=False, threads=False)
+                    if chunk_data is not None and not chunk_data.empty:
+                        new_data_list.append(chunk_data)
+                except Exception as e:
+                    self.log(f"  [WARNING] Failed to backfill chunk {chunk}: {e}")
+
+        if new_data_list:
+            panels = dict(panels)  # cached panels are shared, replace rather than mutate
+            for chunk_data in new_data_list:
+                for exchange, part in partition_by_exchange(chunk_data).items():
+                    panels[exchange] = merge_backfill(panels[exchange], part) if exchange in panels else part
+            self.log(f"  Saving database to {csv_path}...")
+            save_panels(panels, csv_path)
+            entry = get_panel_cache().put(csv_path, panels)
+            self._history_changed(gaps['Ticker'].unique())
+
+        remaining = sum(len(find_gaps(p)) for p in panels.values())
+        self.log(f"[INFO] Backfill complete. Gaps remaining: {remaining}")
+        self._use_cached(entry)
+        return gaps
+
+    def download_missing_tickers(self, universe, tickers, lookback_days=1825, chunk_size=10):
+        """
+        Full-lookback download of the tickers the universe's database does not hold, or holds with
+        fewer bars than the SMA filter needs (incremental updates only fetch new dates, so symbols
+        added to a watchlist later would never get their history). Returns the tickers downloaded.
+        """
+        csv_path = self._get_csv_path(universe)
+        with store_lock(csv_path, logger=self.log):
+            return self._download_missing_locked(csv_path, tickers, lookback_days, chunk_size)
+
+    def _download_missing_locked(self, csv_path, tickers, lookback_days, chunk_size):
+        from data_gaps import merge_backfill
+
+        entry = get_panel_cache().load(csv_path) if store_files(csv_path) else None
+        panels = dict(entry.panels) if entry is not None else {}
+        if entry is not None:
+            self._use_cached(entry)
+        missing = []
+        for ticker in dict.fromkeys(tickers):
+            bars = self.get_ticker_data(ticker) if panels else None
+            if bars is None or len(bars) < self.sma_filter:
+                missing.append(ticker)
+        if not missing:
+            return []
+
+        start_date = (datetime.datetime.now() - datetime.timedelta(days=lookback_days)).strftime('%Y-%m-%d')
+        end_date = self._download_end(missing)[1]
+        if panels:
+            # Stop at the store's last bar: later rows would move its "last date" and make the next
+            # incremental update skip those dates for every other ticker
+            end_date = (min(p.index[-1] for p in panels.values()) + datetime.timedelta(days=1)).strftime('%Y-%m-%d')
+        self.log(f"[INFO] Downloading full history from {start_date} for {len(missing)} tickers missing from {csv_path}...")
+        import yfinance as yf
+        new_data_list = []
+        for i in range(0, len(missing), chunk_size):
+            chunk = missing[i:i + chunk_size]
+            try:
+                chunk_data = yf.download(chunk, start=start_date, end=end_date, group_by='ticker', progress=False, threads=False)
+                if chunk_data is not None and not chunk_data.empty:
+                    new_data_list.append(chunk_data)
+            except Exception as e:
+                self.log(f"  [WARNING] Failed to download chunk {chunk}: {e}")
+        if not new_data_list:
+            return []
+
+        for chunk_data in new_data_list:
+            for exchange, part in partition_by_exchange(chunk_data).items():
+                # Existing values win; new columns / earlier dates are filled in
+                panels[exchange] = merge_backfill(panels[exchange], part) if exchange in panels else part
+        self.log(f"  Saving database to {csv_path}...")
+        save_panels(panels, csv_path)
+        self._use_cached(get_panel_cache().put(csv_path, panels))
+        stored = self._stored_tickers()
+        downloaded = [t for t in missing if t in stored]
+        self._history_changed(downloaded)
+        return downloaded
+
+    def _history_changed(self, tickers):
+        # Bars were added before the tickers' last bar: the signal history recomputes them
+        try:
+            get_signal_history().invalidate(tickers)
+        except Exception as e:
+            self.log(f"  [WARNING] Could not invalidate the signal history: {e}")
 
     def calculate_indicators(self, df):
         # Ensure sufficient data
@@ -611,21 +870,24 @@ class CMWilliamsVixFixScanner:
             return None
 
     def run_scan(self, scan_date=None, local_only=True):
-        if self.data is None or len(self.data) == 0:
+        if not self.panels:
             self.log(f"No data in memory. Attempting load for {self.current_universe}...")
             self.fetch_data(universe=self.current_universe, local_only=local_only)
 
-        if self.data is None or self.data.empty:
+        if not self.panels:
              self.log("[ERROR] Cannot run scan: No data available. Please update database.")
              return pd.DataFrame()
 
-        self.log(f"[INFO] Processing {len(self.tickers)} tickers...")
         if scan_date:
             self.log(f"[INFO] Time Machine Mode: Scanning as of {scan_date}")
             # Ensure scan_date is datetime or timestamp compatible
             scan_date = pd.to_datetime(scan_date)
+            # Index members on that date, not today's list (survivorship-free)
+            scan_tickers = self.universe_as_of(scan_date)
         else:
             scan_date = pd.Timestamp.now()
+            scan_tickers = self.tickers
+        self.log(f"[INFO] Processing {len(scan_tickers)} tickers...")
         
         candidates = []
         
@@ -633,16 +895,10 @@ class CMWilliamsVixFixScanner:
         valid_tickers_data = {}
         results = []
         
-        for ticker in self.tickers:
+        for ticker in scan_tickers:
             try:
-                if ticker not in self.data.columns.levels[0]:
-                    continue
-                    
-                df_ticker = self.data[ticker].dropna()
-                if df_ticker.empty:
-                    continue
-                
-                indicators = self.calculate_indicators(df_ticker)
+                # Exchange panel lookup + indicators, memoized per store version (data_cache.py)
+                indicators = self.get_indicators(ticker)
                 if indicators is None or indicators.empty:
                     continue
                 
@@ -765,7 +1021,52 @@ class CMWilliamsVixFixScanner:
         
         return pd.DataFrame(results)
 
+    def run_signal_calendar(self, start_date, end_date=None, local_only=True):
+        """
+        Every Vix Fix signal (WVF > UpperBB and Close > SMA200) between start_date and end_date,
+        counting a ticker only on days it was a member of the universe.
+        Returns a DataFrame: Date, Ticker, Close, WVF, UpperBB.
+        """
+        if not self.panels:
+            self.fetch_data(universe=self.current_universe, local_only=local_only)
+        if not self.panels:
+            self.log("[ERROR] Cannot build signal calendar: No data available. Please update database.")
+            return pd.DataFrame()
+
+        start_date = pd.to_datetime(start_date)
+        end_date = pd.to_datetime(end_date) if end_date is not None else pd.Timestamp.now()
+        index = get_membership_index(self.current_universe, logger=self.log)
+        if index is not None:
+            stored = self._stored_tickers()
+            tickers = [t for t in index.members_between(start_date, end_date) if t in stored]
+        else:
+            tickers = self.tickers
+        self.log(f"[INFO] Signal calendar {start_date.date()} -> {end_date.date()} over {len(tickers)} tickers...")
+
+        frames = []
+        for ticker in tickers:
+            indicators = self.get_indicators(ticker)
+            if indicators is None or indicators.empty:
+                continue
+            window = indicators.loc[start_date:end_date]
+            mask = ((window['WVF'] > window['UpperBB']) & (window['Close'] > window['SMA200'])).to_numpy()
+            if index is not None:
+                mask &= index.is_member(ticker, window.index)
+            if mask.any():
+                hits = window.loc[mask, ['Close', 'WVF', 'UpperBB']].round(2)
+                hits.insert(0, 'Ticker', ticker)
+                frames.append(hits)
+
+        if not frames:
+            return pd.DataFrame(columns=['Date', 'Ticker', 'Close', 'WVF', 'UpperBB'])
+        calendar = pd.concat(frames).rename_axis('Date').reset_index()
+        return calendar.sort_values(['Date', 'Ticker']).reset_index(drop=True)
+
 if __name__ == "__main__":
+    # Quick scan with defaults; scan_cli.py has the options (universes, dates, formats, workers)
+    import replay_fixtures
+    replay_fixtures.install_from_env()
+
     scanner = CMWilliamsVixFixScanner()
     results = scanner.run_scan()
     
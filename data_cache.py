@@ -0,0 +1,151 @@
+import os
+import threading
+from collections import OrderedDict
+
+from exchange_store import load_panels, store_files
+
+# Process-wide cache of loaded price stores, shared by every scanner instance and dashboard session.
+# Entries are keyed by store path and validated against the files' (mtime_ns, size), so a store
+# rewritten by another process (scheduled_updater.py) is re-read on the next access while repeated
+# scans of an unchanged store skip disk I/O and CSV parsing entirely.
+#
+# Cached panels (and the indicator frames memoized next to them) are shared: callers must treat
+# them as read-only (merge_rows / combine_first already return new frames) and copy the dict
+# before replacing an exchange.
+# Memory cap: VIXFIX_PANEL_CACHE_MB (default 1024), panels plus indicator memos; least recently
+# used stores are evicted first.
+
+DEFAULT_MAX_MB = 1024
+
+
+def fingerprint(csv_path):
+    """(path, mtime_ns, size) of every file backing a store; () if it does not exist."""
+    parts = []
+    for path in store_files(csv_path):
+        st = os.stat(path)
+        parts.append((path, st.st_mtime_ns, st.st_size))
+    return tuple(parts)
+
+
+def panels_nbytes(panels):
+    return sum(int(p.memory_usage(deep=False).sum()) for p in panels.values())
+
+
+class StoreEntry:
+    """One loaded store plus the memos derived from it (valid as long as the files are unchanged)."""
+
+    def __init__(self, fp, panels):
+        self.fingerprint = fp
+        self.panels = panels
+        self.panel_bytes = panels_nbytes(panels)
+        # ticker_spans() per exchange and indicator frames per (ticker, params),
+        # filled lazily by the scanners reading this entry
+        self.spans = {}
+        self.indicators = {}
+        self.indicator_bytes = 0
+
+    def remember_indicators(self, key, frame):
+        self.indicators[key] = frame
+        if frame is not None:
+            self.indicator_bytes += frame.shape[0] * (frame.shape[1] + 1) * 8
+
+    @property
+    def nbytes(self):
+        return self.panel_bytes + self.indicator_bytes
+
+
+class PanelCache:
+    def __init__(self, max_mb=None):
+        if max_mb is None:
+            max_mb = float(os.environ.get("VIXFIX_PANEL_CACHE_MB", DEFAULT_MAX_MB))
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, csv_path):
+        """
+        Returns the StoreEntry of a store, reading the CSVs only when the files changed.
+        A missing store gives an empty entry (entry.panels == {}).
+        """
+        key = os.path.abspath(csv_path)
+        entry = self._lookup(key, fingerprint(csv_path))
+        if entry is not None:
+            return entry
+
+        # One reader per store: concurrent sessions wait for the first parse instead of repeating it.
+        # Parsing happens outside the main lock so other stores stay available meanwhile.
+        with self._lock:
+            key_lock = self._loading.setdefault(key, threading.Lock())
+        with key_lock:
+            fp = fingerprint(csv_path)
+            entry = self._lookup(key, fp)
+            if entry is not None:
+                return entry
+            if not fp:
+                return StoreEntry(fp, {})
+            panels = load_panels(csv_path)
+            self.misses += 1
+            return self._store(key, fp, panels)
+
+    def _lookup(self, key, fp):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.fingerprint != fp:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            # Indicator memos grow after load, re-check the cap on access
+            self._evict()
+            return entry
+
+    def put(self, csv_path, panels):
+        """Registers panels that were just written to csv_path (avoids re-reading our own save)."""
+        return self._store(os.path.abspath(csv_path), fingerprint(csv_path), panels)
+
+    def _store(self, key, fp, panels):
+        entry = StoreEntry(fp, panels)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._evict()
+        return entry
+
+    def _evict(self):
+        total = sum(e.nbytes for e in self._entries.values())
+        # Always keep the most recent store, even if it alone exceeds the cap
+        while total > self.max_bytes and len(self._entries) > 1:
+            _, old = self._entries.popitem(last=False)
+            total -= old.nbytes
+
+    def invalidate(self, csv_path=None):
+        with self._lock:
+            if csv_path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(os.path.abspath(csv_path), None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "stores": len(self._entries),
+                "size_mb": round(sum(e.nbytes for e in self._entries.values()) / (1024 * 1024), 1),
+                "max_mb": round(self.max_bytes / (1024 * 1024), 1),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_panel_cache():
+    """Process-wide instance (survives Streamlit reruns and is shared by all sessions)."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = PanelCache()
+        return _default_cache
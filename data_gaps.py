@@ -0,0 +1,99 @@
+import numpy as np
+import pandas as pd
+
+from trading_calendar import EXCHANGES, exchange_for_ticker, trading_days
+
+# Vectorized detection of holes inside a local price database.
+# A hole is a run of expected trading sessions with no data for a ticker, strictly between
+# its first and last available bar (missing bars at the end are the incremental updater's job).
+
+# With at least this many tickers on an exchange, a rule-calendar session on which none of them
+# traded is treated as an unlisted holiday rather than a gap.
+MIN_PEERS_FOR_OBSERVED_CALENDAR = 5
+
+
+def _close_matrix(data):
+    if isinstance(data.columns, pd.MultiIndex):
+        return data.xs('Close', axis=1, level=1)
+    return data[['Close']]
+
+
+def exchange_calendar(close, exchange):
+    """
+    Expected sessions for one exchange over the span of `close` (date x ticker matrix of that
+    exchange's tickers): the rule calendar, minus sessions on which no ticker traded at all.
+    """
+    if close.empty:
+        return pd.DatetimeIndex([])
+    days = trading_days(exchange, close.index.min(), close.index.max())
+    if close.shape[1] >= MIN_PEERS_FOR_OBSERVED_CALENDAR:
+        traded = close.index[close.notna().any(axis=1).to_numpy()]
+        days = days.intersection(traded)
+    return days
+
+
+def find_gaps(data, tickers=None):
+    """
+    Returns a DataFrame with one row per hole: Ticker, Exchange, Start, End, Sessions.
+    `data` is a local database frame (dates x (Ticker, OHLCV)).
+    """
+    columns = ['Ticker', 'Exchange', 'Start', 'End', 'Sessions']
+    if data is None or data.empty:
+        return pd.DataFrame(columns=columns)
+
+    close = _close_matrix(data)
+    if tickers is not None:
+        close = close[[t for t in close.columns if t in set(tickers)]]
+
+    rows = []
+    for exchange in EXCHANGES:
+        group = [t for t in close.columns if exchange_for_ticker(t) == exchange]
+        if not group:
+            continue
+        calendar = exchange_calendar(close[group], exchange)
+        present = close[group].reindex(calendar).notna().to_numpy()
+        if present.size == 0:
+            continue
+
+        # Only count sessions between each ticker's first and last bar
+        started = np.maximum.accumulate(present, axis=0)
+        not_ended = np.maximum.accumulate(present[::-1], axis=0)[::-1]
+        missing = (started & not_ended & ~present).T.astype(np.int8)  # ticker x session
+
+        padded = np.pad(missing, ((0, 0), (1, 1)))
+        edges = np.diff(padded, axis=1)
+        start_t, start_i = np.nonzero(edges == 1)
+        end_t, end_i = np.nonzero(edges == -1)
+        # nonzero walks row-major, so starts and ends pair up per ticker in order
+        for t, s, e in zip(start_t, start_i, end_i):
+            rows.append({
+                'Ticker': group[t],
+                'Exchange': exchange,
+                'Start': calendar[s],
+                'End': calendar[e - 1],
+                'Sessions': int(e - s),
+            })
+
+    return pd.DataFrame(rows, columns=columns)
+
+
+def plan_backfill(gaps):
+    """
+    Groups gaps into download jobs: tickers that miss exactly the same range are fetched together
+    (a failed download chunk leaves the same hole in all of its tickers).
+    Returns a list of (start, end, [tickers]).
+    """
+    if gaps is None or gaps.empty:
+        return []
+    jobs = []
+    for (start, end), grp in gaps.groupby(['Start', 'End'], sort=True):
+        jobs.append((start, end, sorted(grp['Ticker'].unique().tolist())))
+    return jobs
+
+
+def merge_backfill(data, new_data):
+    """Fills holes in `data` with `new_data` without overwriting any existing value."""
+    if new_data is None or new_data.empty:
+        return data
+    merged = data.combine_first(new_data)
+    return merged[~merged.index.duplicated(keep='first')].sort_index()
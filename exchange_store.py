@@ -0,0 +1,121 @@
+import os
+import numpy as np
+import pandas as pd
+
+from trading_calendar import EXCHANGES, exchange_for_ticker
+
+# Exchange-partitioned price storage.
+# A universe database used to be one CSV indexed by the union of US and Taiwan trading days,
+# so every US ticker had NaN rows on Taiwan-only sessions and vice versa. Each exchange now
+# gets its own file and in-memory panel with a dense date index:
+#
+#   data/sp500_data.csv          (legacy, combined - still readable)
+#   data/watchlist_data_NYSE.csv
+#   data/watchlist_data_TWSE.csv
+#
+# Panels are plain yfinance-style frames: dates x (Ticker, [Open, High, Low, Close, Volume]).
+
+
+def partition_path(csv_path, exchange):
+    base, ext = os.path.splitext(csv_path)
+    return f"{base}_{exchange}{ext}"
+
+
+def store_files(csv_path):
+    """Existing files backing a store: the exchange partitions, or the legacy combined CSV."""
+    parts = [partition_path(csv_path, ex) for ex in EXCHANGES]
+    parts = [p for p in parts if os.path.exists(p)]
+    if parts:
+        return parts
+    return [csv_path] if os.path.exists(csv_path) else []
+
+
+def partition_by_exchange(data):
+    """Splits a combined frame into {exchange: panel}, dropping each exchange's non-session rows."""
+    if data is None or data.empty:
+        return {}
+    if not isinstance(data.columns, pd.MultiIndex):
+        raise ValueError("Expected (Ticker, Field) MultiIndex columns")
+    tickers = data.columns.get_level_values(0)
+    panels = {}
+    for exchange in EXCHANGES:
+        mask = np.array([exchange_for_ticker(t) == exchange for t in tickers])
+        if not mask.any():
+            continue
+        panel = data.loc[:, mask].dropna(how='all')
+        panel.columns = panel.columns.remove_unused_levels()
+        if not panel.empty:
+            panels[exchange] = panel
+    return panels
+
+
+def combine_panels(panels):
+    """Union view over all exchanges (reintroduces NaN rows; only for legacy callers)."""
+    frames = [p for p in panels.values() if p is not None and not p.empty]
+    if not frames:
+        return None
+    if len(frames) == 1:
+        return frames[0]
+    return pd.concat(frames, axis=1).sort_index()
+
+
+def load_panels(csv_path):
+    """Loads a store as {exchange: panel}. Falls back to splitting a legacy combined CSV."""
+    panels = {}
+    for exchange in EXCHANGES:
+        path = partition_path(csv_path, exchange)
+        if os.path.exists(path):
+            panel = pd.read_csv(path, header=[0, 1], index_col=0, parse_dates=True)
+            if not panel.empty:
+                panels[exchange] = panel
+    if panels:
+        return panels
+    if os.path.exists(csv_path):
+        return partition_by_exchange(pd.read_csv(csv_path, header=[0, 1], index_col=0, parse_dates=True))
+    return {}
+
+
+def save_panels(panels, csv_path):
+    """Writes one CSV per exchange. A legacy combined file is removed once its data is migrated."""
+    folder = os.path.dirname(csv_path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
+    for exchange, panel in panels.items():
+        if panel is not None and not panel.empty:
+            panel.to_csv(partition_path(csv_path, exchange))
+    if os.path.exists(csv_path) and panels:
+        os.remove(csv_path)
+
+
+def merge_rows(existing, new):
+    """Appends new bars to an exchange panel (new values win on overlapping dates)."""
+    if existing is None or existing.empty:
+        return new
+    if new is None or new.empty:
+        return existing
+    combined = pd.concat([existing, new], axis=0)
+    combined = combined[~combined.index.duplicated(keep='last')]
+    return combined.sort_index()
+
+
+def ticker_spans(panel):
+    """
+    For each ticker in a panel returns (start, stop, has_holes): the positional slice between
+    its first and last complete bar, and whether any bar inside that slice is incomplete.
+    Computed once per panel so scans can slice views instead of calling dropna() per ticker.
+    """
+    if panel is None or panel.empty:
+        return {}
+    complete = panel.notna().T.groupby(level=0, sort=False).all().T
+    valid = complete.to_numpy()
+    n_rows = valid.shape[0]
+    any_valid = valid.any(axis=0)
+    first = valid.argmax(axis=0)
+    last = n_rows - 1 - valid[::-1].argmax(axis=0)
+    counts = valid.sum(axis=0)
+    spans = {}
+    for i, ticker in enumerate(complete.columns):
+        if not any_valid[i]:
+            continue
+        spans[ticker] = (int(first[i]), int(last[i]) + 1, bool(counts[i] != last[i] - first[i] + 1))
+    return spans
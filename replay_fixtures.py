@@ -0,0 +1,304 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import datetime
+import pandas as pd
+
+# Record/replay layer for every network dependency of the scanner and dashboard:
+#   - requests.get / requests.post   (Wikipedia constituents, Perplexity chat completions)
+#   - yfinance.download / Ticker.info
+#   - google.generativeai GenerativeModel.generate_content
+#
+# Record once with network access, then replay offline with optional latency injection:
+#
+#   VIXFIX_FIXTURES=record streamlit run vix_fix_dashboard.py
+#   VIXFIX_FIXTURES=replay VIXFIX_FIXTURE_LATENCY=recorded streamlit run vix_fix_dashboard.py
+#
+# Or from code:
+#   with FixtureRecorder(mode="replay", latency=0.5):
+#       scanner.fetch_data(...)
+
+FIXTURE_DIR = "fixtures"
+MODES = ("record", "replay", "auto")
+
+
+class FixtureMissingError(RuntimeError):
+    pass
+
+
+class FixtureResponse:
+    """Minimal stand-in for requests.Response built from a recorded fixture."""
+
+    def __init__(self, status_code, text, headers=None, url=""):
+        self.status_code = status_code
+        self.text = text
+        self.content = text.encode("utf-8")
+        self.headers = headers or {}
+        self.url = url
+        self.ok = 200 <= status_code < 400
+
+    def json(self):
+        return json.loads(self.text)
+
+    def iter_lines(self, decode_unicode=False, **kwargs):
+        for line in self.text.splitlines():
+            yield line if decode_unicode else line.encode("utf-8")
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise RuntimeError(f"HTTP {self.status_code} for {self.url}")
+
+
+class FixtureGenAIResponse:
+    """Stand-in for a Gemini response object (only .text is used by the dashboard)."""
+
+    def __init__(self, text):
+        self.text = text
+
+    def __iter__(self):
+        # stream=True callers iterate chunks
+        step = 200
+        for i in range(0, len(self.text), step):
+            yield FixtureGenAIResponse(self.text[i:i + step])
+
+
+def _parse_latency(value):
+    if value in (None, ""):
+        return None
+    if value == "recorded":
+        return "recorded"
+    try:
+        return float(value)
+    except ValueError:
+        # "requests.get=0.2,genai=3"
+        out = {}
+        for part in value.split(","):
+            if "=" in part:
+                k, v = part.split("=", 1)
+                out[k.strip()] = float(v)
+        return out
+
+
+class FixtureRecorder:
+    def __init__(self, mode="replay", fixture_dir=None, latency=None):
+        """
+        mode:     'record' calls the live service and saves every response,
+                  'replay' serves responses from disk only (FixtureMissingError on a miss),
+                  'auto'   replays when a fixture exists and records otherwise.
+        latency:  None (no delay), seconds (float), 'recorded' (original call duration)
+                  or a dict of {kind: seconds}, e.g. {'genai': 3.0}.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown fixture mode '{mode}', expected one of {MODES}")
+        self.mode = mode
+        self.fixture_dir = fixture_dir or FIXTURE_DIR
+        self.latency = latency
+        self._originals = []
+        self._lock = threading.Lock()
+
+    # --- storage ---
+
+    @staticmethod
+    def make_key(kind, request):
+        raw = json.dumps([kind, request], sort_keys=True, default=str)
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+    def _path(self, kind, key, ext="json"):
+        return os.path.join(self.fixture_dir, kind, f"{key}.{ext}")
+
+    def _load(self, kind, request):
+        key = self.make_key(kind, request)
+        path = self._path(kind, key)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("frame"):
+            meta["response"] = pd.read_pickle(self._path(kind, key, "pkl"))
+        return meta
+
+    def _save(self, kind, request, response, elapsed):
+        key = self.make_key(kind, request)
+        folder = os.path.join(self.fixture_dir, kind)
+        with self._lock:
+            if not os.path.exists(folder):
+                os.makedirs(folder)
+            meta = {
+                "kind": kind,
+                "request": request,
+                "recorded_at": datetime.datetime.now().isoformat(timespec="seconds"),
+                "elapsed_s": round(elapsed, 4),
+            }
+            if isinstance(response, pd.DataFrame):
+                response.to_pickle(self._path(kind, key, "pkl"))
+                meta["frame"] = True
+            else:
+                meta["response"] = response
+            with open(self._path(kind, key), "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False, indent=1, default=str)
+
+    def _delay(self, kind, meta):
+        latency = self.latency
+        if latency is None:
+            return
+        if latency == "recorded":
+            seconds = meta.get("elapsed_s", 0)
+        elif isinstance(latency, dict):
+            seconds = latency.get(kind, latency.get(kind.split(".")[0], 0))
+        else:
+            seconds = latency
+        if seconds:
+            time.sleep(seconds)
+
+    def call(self, kind, request, live_fn, encode=lambda r: r, decode=lambda r: r):
+        """Core record/replay dispatch shared by all patched entry points."""
+        if self.mode in ("replay", "auto"):
+            meta = self._load(kind, request)
+            if meta is not None:
+                self._delay(kind, meta)
+                return decode(meta["response"])
+            if self.mode == "replay":
+                raise FixtureMissingError(f"No fixture for {kind} {json.dumps(request, default=str)[:200]}")
+
+        t0 = time.perf_counter()
+        result = live_fn()
+        self._save(kind, request, encode(result), time.perf_counter() - t0)
+        return result
+
+    # --- patching ---
+
+    def _patch(self, owner, name, replacement):
+        self._originals.append((owner, name, getattr(owner, name)))
+        setattr(owner, name, replacement)
+
+    def install(self):
+        import requests
+        recorder = self
+
+        def encode_http(resp):
+            return {"status_code": resp.status_code, "text": resp.text, "url": getattr(resp, "url", ""),
+                    "headers": {k: v for k, v in resp.headers.items() if k.lower() in ("etag", "last-modified", "content-type")}}
+
+        def decode_http(data):
+            return FixtureResponse(data["status_code"], data["text"], data.get("headers"), data.get("url", ""))
+
+        real_get, real_post = requests.get, requests.post
+
+        def fixture_get(url, params=None, **kwargs):
+            req = {"url": url, "params": params}
+            return recorder.call("requests.get", req, lambda: real_get(url, params=params, **kwargs), encode_http, decode_http)
+
+        def fixture_post(url, data=None, json=None, **kwargs):
+            # Auth headers are deliberately not part of the key (or the fixture)
+            req = {"url": url, "json": json, "data": data}
+            return recorder.call("requests.post", req, lambda: real_post(url, data=data, json=json, **kwargs), encode_http, decode_http)
+
+        self._patch(requests, "get", fixture_get)
+        self._patch(requests, "post", fixture_post)
+
+        try:
+            import yfinance as yf
+        except ImportError:
+            yf = None
+
+        if yf is not None:
+            real_download, real_ticker = yf.download, yf.Ticker
+
+            def fixture_download(tickers, *args, **kwargs):
+                req = {"tickers": tickers, "args": args, "kwargs": {k: v for k, v in kwargs.items() if k != "progress"}}
+                return recorder.call("yfinance.download", req, lambda: real_download(tickers, *args, **kwargs))
+
+            class FixtureTicker:
+                def __init__(self, symbol, *args, **kwargs):
+                    self._symbol = symbol
+                    self._real = None
+                    self._args = (args, kwargs)
+
+                def _live(self):
+                    if self._real is None:
+                        self._real = real_ticker(self._symbol, *self._args[0], **self._args[1])
+                    return self._real
+
+                @property
+                def info(self):
+                    return recorder.call("yfinance.info", {"symbol": self._symbol}, lambda: self._live().info)
+
+                def __getattr__(self, name):
+                    return getattr(self._live(), name)
+
+            self._patch(yf, "download", fixture_download)
+            self._patch(yf, "Ticker", FixtureTicker)
+
+        try:
+            import google.generativeai as genai
+        except ImportError:
+            genai = None
+
+        if genai is not None:
+            real_model = genai.GenerativeModel
+
+            class FixtureGenerativeModel:
+                _own = ("_model_name", "_tools", "_real")
+
+                def __init__(self, model_name, *args, **kwargs):
+                    self._model_name = model_name
+                    self._tools = str(kwargs.get("tools"))
+                    self._real = real_model(model_name, *args, **kwargs)
+
+                def generate_content(self, prompt, stream=False, **kwargs):
+                    req = {"model": self._model_name, "tools": self._tools, "prompt": str(prompt)}
+
+                    def live():
+                        resp = self._real.generate_content(prompt, **kwargs)
+                        return FixtureGenAIResponse(resp.text)
+
+                    resp = recorder.call("genai", req, live, lambda r: r.text, FixtureGenAIResponse)
+                    return iter(resp) if stream else resp
+
+                def __getattr__(self, name):
+                    return getattr(self._real, name)
+
+                def __setattr__(self, name, value):
+                    # Writes such as call_gemini's per-key client must reach the real model
+                    if name in self._own:
+                        object.__setattr__(self, name, value)
+                    else:
+                        setattr(self._real, name, value)
+
+            self._patch(genai, "GenerativeModel", FixtureGenerativeModel)
+        return self
+
+    def uninstall(self):
+        while self._originals:
+            owner, name, original = self._originals.pop()
+            setattr(owner, name, original)
+
+    def __enter__(self):
+        return self.install()
+
+    def __exit__(self, *exc):
+        self.uninstall()
+        return False
+
+
+_active = None
+
+
+def install_from_env():
+    """
+    Installs a process-wide recorder when VIXFIX_FIXTURES is set (record / replay / auto).
+    Safe to call on every Streamlit rerun: the recorder is only installed once.
+    """
+    global _active
+    mode = os.environ.get("VIXFIX_FIXTURES", "").strip().lower()
+    if not mode or _active is not None:
+        return _active
+    _active = FixtureRecorder(
+        mode=mode,
+        fixture_dir=os.environ.get("VIXFIX_FIXTURE_DIR") or FIXTURE_DIR,
+        latency=_parse_latency(os.environ.get("VIXFIX_FIXTURE_LATENCY")),
+    ).install()
+    print(f"[INFO] Fixture layer active: mode={mode}, dir={_active.fixture_dir}")
+    return _active
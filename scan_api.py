@@ -0,0 +1,275 @@
+import argparse
+import datetime
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+
+import replay_fixtures
+from scan_engine import ScanEngine, ScanRequest
+from scheduled_updater import read_status
+from single_flight import SingleFlight
+
+# Headless JSON API over the shared scan engine, for internal tools and cron jobs.
+# One process keeps the price stores and indicator memos warm (data_cache.py), and prepared
+# scanners are reused per (universe, tickers, parameters) until their store changes on disk,
+# so repeated queries skip CSV parsing and indicator math. Requests are served concurrently
+# (one thread each); concurrent scans are capped by the engine.
+# The API only reads local databases - downloads stay with scheduled_updater.py / the dashboard.
+#
+#   python scan_api.py --port 8765 --warm sp500
+#
+#   GET /scan?universe=sp500&date=2024-08-05    (or tickers=AAPL,MSFT for a watchlist scan)
+#   GET /indicators?universe=sp500&ticker=AAPL[&start=2024-01-01][&end=...][&tail=250]
+#   GET /signal-calendar?universe=sp500&start=2024-01-01[&end=2024-12-31]
+#   GET /status[?universe=sp500]
+# Indicator parameters (lookback_period, bb_length, bb_std, sma_filter) are accepted by
+# /scan, /indicators and /signal-calendar. POST with a JSON object body works as well.
+
+UNIVERSES = ["sp500", "nasdaq100", "etf_top", "taiwan100", "tw_high_yield", "watchlist"]
+PARAM_TYPES = {"lookback_period": int, "bb_length": int, "bb_std": float, "sma_filter": int}
+DEFAULT_PORT = 8765
+MAX_SCANNERS = 16
+
+
+class BadRequest(ValueError):
+    pass
+
+
+def records(df):
+    """DataFrame -> JSON-ready list of dicts (ISO dates, NaN as null)."""
+    if df is None or df.empty:
+        return []
+    return json.loads(df.to_json(orient="records", date_format="iso"))
+
+
+class ScanService:
+    def __init__(self, engine=None, logger=None):
+        self.engine = engine or ScanEngine(max_concurrent=int(os.environ.get("VIXFIX_MAX_CONCURRENT_SCANS", "4")))
+        self.logger = logger or print
+        self.started = datetime.datetime.now()
+        self.requests = 0
+        self._scanners = OrderedDict()
+        self._lock = threading.Lock()
+        # Concurrent first requests for the same universe prepare it once
+        self._preparing = SingleFlight()
+
+    # --- prepared scanners ---
+
+    def _fresh(self, scanner):
+        entry = scanner._store_entry
+        return entry is not None and self.engine.cache.load(scanner._get_csv_path(scanner.current_universe)) is entry
+
+    def scanner_for(self, universe, tickers=None, params=None):
+        """Prepared scanner for the universe, reused while its store is unchanged."""
+        request = ScanRequest(universe, tickers=tickers, params=params)
+        key = (universe, tuple(request.tickers or ()), tuple(sorted(request.params.items())))
+        with self._lock:
+            scanner = self._scanners.get(key)
+            if scanner is not None:
+                self._scanners.move_to_end(key)
+        if scanner is not None and self._fresh(scanner):
+            return scanner
+
+        scanner = self._preparing.run(("prepare",) + key, lambda log: self.engine.prepare(request))
+        with self._lock:
+            self._scanners[key] = scanner
+            self._scanners.move_to_end(key)
+            while len(self._scanners) > MAX_SCANNERS:
+                self._scanners.popitem(last=False)
+        return scanner
+
+    # --- endpoints ---
+
+    @staticmethod
+    def _universe(args):
+        tickers = [t.strip() for t in str(args.get("tickers") or "").split(",") if t.strip()]
+        universe = args.get("universe") or ("watchlist" if tickers else "sp500")
+        if universe not in UNIVERSES:
+            raise BadRequest(f"Unknown universe '{universe}' (one of {', '.join(UNIVERSES)})")
+        if universe == "watchlist" and not tickers:
+            raise BadRequest("universe=watchlist needs tickers=A,B,...")
+        return universe, tickers or None
+
+    @staticmethod
+    def _params(args):
+        params = {}
+        for name, cast in PARAM_TYPES.items():
+            if args.get(name) not in (None, ""):
+                try:
+                    params[name] = cast(args[name])
+                except ValueError:
+                    raise BadRequest(f"{name} must be {cast.__name__}")
+        return params
+
+    @staticmethod
+    def _date(args, name, required=False):
+        value = args.get(name)
+        if value in (None, ""):
+            if required:
+                raise BadRequest(f"Missing parameter: {name}")
+            return None
+        try:
+            return pd.to_datetime(value)
+        except (ValueError, TypeError):
+            raise BadRequest(f"Invalid date for {name}: {value}")
+
+    def scan(self, args):
+        universe, tickers = self._universe(args)
+        scanner = self.scanner_for(universe, tickers, self._params(args))
+        if not scanner.panels:
+            raise BadRequest(f"No local database for {universe}. Run scheduled_updater.py first.")
+        request = ScanRequest(universe, tickers=tickers, scan_date=self._date(args, "date"))
+        results = self.engine.scan(scanner, request)
+        return {"universe": universe, "date": str(request.scan_date.date()) if request.scan_date is not None else None,
+                "count": len(results), "results": records(results)}
+
+    def indicators(self, args):
+        ticker = args.get("ticker")
+        if not ticker:
+            raise BadRequest("Missing parameter: ticker")
+        if args.get("universe") == "watchlist" and not args.get("tickers"):
+            args = {**args, "tickers": ticker}
+        universe, tickers = self._universe(args)
+        scanner = self.scanner_for(universe, tickers, self._params(args))
+        frame = scanner.get_indicators(ticker)
+        if frame is None or frame.empty:
+            raise LookupError(f"No data for {ticker} in {universe}")
+        start, end = self._date(args, "start"), self._date(args, "end")
+        if start is not None:
+            frame = frame[frame.index >= start]
+        if end is not None:
+            frame = frame[frame.index <= end]
+        if start is None:
+            try:
+                tail = int(args.get("tail") or 250)
+            except (ValueError, TypeError):
+                raise BadRequest("tail must be int")
+            if tail < 1:
+                raise BadRequest("tail must be positive")
+            frame = frame.tail(tail)
+        return {"ticker": ticker, "universe": universe, "rows": len(frame),
+                "indicators": records(frame.rename_axis("Date").reset_index())}
+
+    def signal_calendar(self, args):
+        universe, tickers = self._universe(args)
+        scanner = self.scanner_for(universe, tickers, self._params(args))
+        start, end = self._date(args, "start", required=True), self._date(args, "end")
+        # Same concurrency cap as /scan: the calendar is just as CPU bound
+        with self.engine.slot():
+            calendar = scanner.run_signal_calendar(start, end)
+        return {"universe": universe, "count": len(calendar), "signals": records(calendar)}
+
+    def status(self, args):
+        universes = [args["universe"]] if args.get("universe") else UNIVERSES
+        scanner = self.engine.new_scanner()
+        with self._lock:
+            warm = [{"universe": k[0], "tickers": len(k[1]) or None, "params": dict(k[2])} for k in self._scanners]
+        return {
+            "started": self.started.isoformat(timespec="seconds"),
+            "requests": self.requests,
+            "stores": {u: scanner.get_data_status(u) for u in universes},
+            "updates": read_status(),
+            "panel_cache": self.engine.cache.stats(),
+            "warm_scanners": warm,
+        }
+
+    def routes(self):
+        return {"/scan": self.scan, "/indicators": self.indicators,
+                "/signal-calendar": self.signal_calendar, "/status": self.status}
+
+
+def make_handler(service):
+    routes = service.routes()
+
+    class Handler(BaseHTTPRequestHandler):
+        server_version = "VixFixScanAPI/1.0"
+
+        def _send(self, code, payload):
+            body = json.dumps(payload, default=str).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _handle(self, args):
+            url = urlparse(self.path)
+            handler = routes.get(url.path.rstrip("/") or "/")
+            if handler is None:
+                self._send(404, {"error": f"Unknown endpoint {url.path}", "endpoints": sorted(routes)})
+                return
+            args = {**{k: v[-1] for k, v in parse_qs(url.query).items()}, **args}
+            service.requests += 1
+            t0 = time.perf_counter()
+            try:
+                payload = handler(args)
+                payload["elapsed_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+                self._send(200, payload)
+            except BadRequest as e:
+                self._send(400, {"error": str(e)})
+            except LookupError as e:
+                self._send(404, {"error": str(e)})
+            except Exception as e:
+                service.logger(f"[ERROR] {url.path}: {type(e).__name__}: {e}")
+                self._send(500, {"error": f"{type(e).__name__}: {e}"})
+
+        def do_GET(self):
+            self._handle({})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+            except ValueError:
+                self._send(400, {"error": "Body must be a JSON object"})
+                return
+            if not isinstance(body, dict):
+                self._send(400, {"error": "Body must be a JSON object"})
+                return
+            if isinstance(body.get("tickers"), list):
+                body["tickers"] = ",".join(body["tickers"])
+            self._handle(body)
+
+        def log_message(self, format, *args):
+            service.logger(f"[INFO] {self.address_string()} {format % args}")
+
+    return Handler
+
+
+def serve(host="127.0.0.1", port=DEFAULT_PORT, warm=(), service=None):
+    service = service or ScanService()
+    for universe in warm:
+        t0 = time.perf_counter()
+        scanner = service.scanner_for(universe)
+        service.logger(f"[INFO] Warmed {universe}: {len(scanner.tickers or [])} tickers in {time.perf_counter() - t0:.1f}s")
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    server.daemon_threads = True
+    service.logger(f"[INFO] Scan API listening on http://{host}:{port}")
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local JSON API over the Vix Fix scanner (local databases only).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("VIXFIX_API_PORT", DEFAULT_PORT)))
+    parser.add_argument("--warm", action="append", default=[], help="Universe to load at startup (repeatable)")
+    args = parser.parse_args()
+
+    replay_fixtures.install_from_env()
+    server = serve(args.host, args.port, args.warm)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+import replay_fixtures
+from scan_engine import ScanEngine, ScanRequest
+from signal_alerts import AlertEngine, notifiers_from_spec
+from watchlist_scan import WATCHLIST_FILE, clean_tickers, group_by_watchlist, load_watchlists, prepare_watchlist, union_tickers
+
+# Command-line scans for nightly pipelines (no dashboard needed).
+# Results are streamed to stdout (or --output) as each scan finishes, in job order, with
+# Universe and Scan Date columns added; progress and scanner logs go to stderr so stdout
+# stays machine-readable.
+#
+#   python scan_cli.py --universe sp500 --universe nasdaq100 --date 2024-08-05
+#   python scan_cli.py --universe sp500 --start 2024-07-01 --end 2024-08-31 --format jsonl --workers 4
+#   python scan_cli.py --tickers AAPL,NVDA,2330.TW --update --format csv > watchlist.csv
+#   python scan_cli.py --universe taiwan100 --format parquet --output scans.parquet
+#   python scan_cli.py --all-watchlists --update --format jsonl     # union of watchlist.json, grouped by list
+#   python scan_cli.py --universe sp500 --alerts --notify console     # + only what changed since the last run
+#
+# A date range scans every stored trading day between --start and --end. Each universe is
+# prepared once (loaded from the shared panel cache, optionally updated first), then its dates
+# are scanned by --workers threads; indicators are memoized, so only the first date pays for them.
+
+FORMATS = ("csv", "jsonl", "parquet")
+
+
+def scan_dates(scanner, start, end):
+    """Stored trading days of the scanner's panels between start and end (inclusive)."""
+    days = pd.DatetimeIndex([])
+    for panel in scanner.panels.values():
+        days = days.union(panel.index)
+    return [d for d in days if pd.to_datetime(start) <= d <= pd.to_datetime(end)]
+
+
+class ResultWriter:
+    """Writes result frames as they arrive: CSV (one header), JSON lines, or Parquet (written at close)."""
+
+    def __init__(self, fmt, stream):
+        self.fmt = fmt
+        self.stream = stream
+        self.rows = 0
+        self._header = True
+        self._frames = []
+
+    def write(self, frame):
+        if frame.empty:
+            return
+        self.rows += len(frame)
+        if self.fmt == "csv":
+            frame.to_csv(self.stream, index=False, header=self._header)
+            self._header = False
+        elif self.fmt == "jsonl":
+            for record in json.loads(frame.to_json(orient="records", date_format="iso")):
+                self.stream.write(json.dumps(record) + "\n")
+        else:
+            self._frames.append(frame)
+            return
+        self.stream.flush()
+
+    def close(self, path=None):
+        if self.fmt == "parquet" and self._frames:
+            pd.concat(self._frames, ignore_index=True).to_parquet(path, index=False)
+
+
+def run(args, out, log):
+    params = {k: v for k, v in (("lookback_period", args.lookback_period), ("bb_length", args.bb_length),
+                                ("bb_std", args.bb_std), ("sma_filter", args.sma_filter)) if v is not None}
+    tickers = [t.strip() for t in (args.tickers or "").split(",") if t.strip()]
+    lists = None
+    if args.all_watchlists:
+        lists = {name: t for name, t in load_watchlists(args.watchlist_file).items() if t}
+        tickers = union_tickers(lists)
+        log(f"[INFO] {len(lists)} watchlists, {len(tickers)} unique tickers")
+        if not tickers:
+            log(f"[ERROR] No tickers in {args.watchlist_file}")
+            return 1
+    universes = ["watchlist"] if tickers else (args.universe or ["sp500"])
+    engine = ScanEngine(max_concurrent=args.workers)
+    alerts = AlertEngine(notifiers_from_spec(args.notify), logger=log) if args.alerts else None
+    writer = ResultWriter(args.format, out)
+    failures = 0
+    ticker_set = ""
+    if tickers and not lists:
+        # One snapshot per ticker set: another --tickers list must not read as dropped signals
+        ticker_set = "_" + hashlib.sha1(",".join(sorted(clean_tickers(tickers))).encode("utf-8")).hexdigest()[:10]
+
+    with ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="scan") as pool:
+        for universe in universes:
+            t0 = time.perf_counter()
+            if tickers:
+                # Same preparation as the dashboard: --update also fetches the full history of
+                # symbols new to the watchlist store, and tickers without data are logged
+                request, scanner = prepare_watchlist(engine, tickers, local_only=not args.update, params=params)
+            else:
+                request = ScanRequest(universe, top_n=args.top_n, local_only=not args.update, params=params)
+                scanner = engine.prepare(request)
+            if not scanner.panels:
+                log(f"[ERROR] No data for {universe}. Run with --update or scheduled_updater.py first.")
+                failures += 1
+                continue
+
+            if args.start:
+                dates = scan_dates(scanner, args.start, args.end or pd.Timestamp.now())
+            else:
+                dates = [pd.to_datetime(args.date) if args.date else None]
+            log(f"[INFO] {universe}: {len(dates)} scan date(s), {args.workers} worker(s)")
+
+            def scan_one(date, universe=universe, scanner=scanner):
+                results = engine.scan(scanner, ScanRequest(universe, tickers=tickers or None, scan_date=date))
+                # Without --date the scan is as of the last stored bar, not today
+                as_of = date or max(p.index[-1] for p in scanner.panels.values())
+                if alerts is not None:
+                    # Diff the unfiltered scan, so --status does not read as dropped signals
+                    if lists:
+                        grouped = group_by_watchlist(results, lists)
+                        for name in lists:
+                            alerts.process(f"{args.alert_key}:watchlist_{name}", grouped[grouped['Watchlist'] == name], as_of)
+                    else:
+                        alerts.process(f"{args.alert_key}:{universe}{ticker_set}", results, as_of)
+                if results.empty:
+                    return results
+                if args.status:
+                    results = results[results['Status'].str.startswith(tuple(s.upper() for s in args.status))]
+                if lists:
+                    # Scanned once per symbol, reported once per list containing it
+                    results = group_by_watchlist(results, lists)
+                results = results.copy()
+                results.insert(0, 'Scan Date', as_of.strftime('%Y-%m-%d'))
+                results.insert(0, 'Universe', universe)
+                return results
+
+            # map() yields in date order while later dates are already being scanned
+            for results in pool.map(scan_one, dates):
+                writer.write(results)
+            log(f"[INFO] {universe} done in {time.perf_counter() - t0:.1f}s")
+
+    writer.close(args.output)
+    log(f"[INFO] {writer.rows} rows written.")
+    return 1 if failures else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run Vix Fix scans from the command line.")
+    parser.add_argument("--universe", action="append", help="Universe key (repeatable): sp500, nasdaq100, etf_top, taiwan100, tw_high_yield. Default sp500.")
+    parser.add_argument("--tickers", help="Comma-separated tickers (watchlist scan; overrides --universe)")
+    parser.add_argument("--all-watchlists", action="store_true", help="Scan the union of every list in --watchlist-file, results grouped by list")
+    parser.add_argument("--watchlist-file", default=WATCHLIST_FILE)
+    parser.add_argument("--date", help="Scan as of this date (default: latest bar)")
+    parser.add_argument("--start", help="First date of a range scan (every stored trading day)")
+    parser.add_argument("--end", help="Last date of a range scan (default: today)")
+    parser.add_argument("--status", action="append", help="Keep only these statuses (prefix, repeatable): ACTIONABLE, WATCH")
+    parser.add_argument("--lookback-period", type=int)
+    parser.add_argument("--bb-length", type=int)
+    parser.add_argument("--bb-std", type=float)
+    parser.add_argument("--sma-filter", type=int)
+    parser.add_argument("--top-n", type=int, default=100, help="Universe size for volume-ranked universes")
+    parser.add_argument("--update", action="store_true", help="Download missing bars before scanning (default: local data only)")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent scans")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("--output", default="-", help="Output file ('-' = stdout; required for parquet)")
+    parser.add_argument("--alerts", action="store_true", help="Send only new / changed signals since the last --alerts run (single date)")
+    parser.add_argument("--alert-key", default="cli", help="Namespace of the --alerts snapshots (default 'cli'; the scheduled updater uses bare universe names). --tickers runs get one snapshot per ticker set")
+    parser.add_argument("--notify", help="Notifiers for --alerts, e.g. file,console,webhook:URL (default: $VIXFIX_ALERT_NOTIFIERS or file)")
+    args = parser.parse_args(argv)
+
+    if args.format == "parquet" and args.output == "-":
+        parser.error("--format parquet needs --output FILE")
+    if args.date and args.start:
+        parser.error("use either --date or --start/--end")
+    if args.alerts and args.start:
+        parser.error("--alerts diffs one scan against the last one; it does not take --start/--end")
+    try:
+        notifiers_from_spec(args.notify)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.format == "parquet":
+        try:
+            pd.io.parquet.get_engine("auto")
+        except ImportError:
+            parser.error("--format parquet needs pyarrow or fastparquet installed")
+
+    replay_fixtures.install_from_env()
+    out = sys.stdout if args.output == "-" or args.format == "parquet" else open(args.output, "w", newline="", encoding="utf-8")
+    log = lambda message: print(message, file=sys.stderr)
+    try:
+        # The scanner prints its progress; keep stdout for results only
+        with contextlib.redirect_stdout(sys.stderr):
+            return run(args, out, log)
+    except BrokenPipeError:
+        # Downstream closed the pipe (e.g. `| head`): stop quietly
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    except ImportError as e:
+        log(f"[ERROR] {e}")
+        return 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
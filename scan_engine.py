@@ -0,0 +1,82 @@
+import contextlib
+import threading
+
+import pandas as pd
+
+from cm_williams_vix_fix import CMWilliamsVixFixScanner
+from data_cache import get_panel_cache
+
+# Session-isolated scans over the shared data layer.
+#
+# Shared, read-only, thread-safe (one per process):
+#   - price panels and their ticker_spans / indicator memos (data_cache.PanelCache)
+#   - universe constituents (universe_cache.py), symbol metadata (symbol_metadata.py)
+# Per request / per session:
+#   - a ScanRequest (universe, tickers, date, parameters) and a throwaway scanner built from it.
+#     The scanner only holds references to the shared panels, so creating one is cheap and
+#     nothing a session does (tickers, parameters, universe) leaks into another session's scan.
+#
+#   engine = ScanEngine()
+#   results, scanner = engine.run(ScanRequest("sp500", scan_date="2024-08-05"), logger=print)
+
+
+class ScanRequest:
+    def __init__(self, universe, tickers=None, scan_date=None, top_n=100, local_only=True, params=None):
+        """
+        universe:   universe key ("sp500", "taiwan100", ... or "watchlist" for explicit tickers)
+        tickers:    explicit ticker list (required for "watchlist", ignored otherwise)
+        scan_date:  Time Machine date (None = latest bar)
+        local_only: False allows downloading (watchlists)
+        params:     indicator parameters (lookback_period, bb_length, bb_std, sma_filter)
+        """
+        self.universe = universe
+        self.tickers = list(tickers) if tickers else None
+        self.scan_date = pd.to_datetime(scan_date) if scan_date is not None else None
+        self.top_n = top_n
+        self.local_only = local_only
+        self.params = dict(params or {})
+
+    def __repr__(self):
+        size = len(self.tickers) if self.tickers else "all"
+        return f"ScanRequest({self.universe}, tickers={size}, date={self.scan_date}, params={self.params})"
+
+
+class ScanEngine:
+    def __init__(self, max_concurrent=None):
+        # Optional cap on simultaneous scans (CPU bound); None = unlimited
+        self._slots = threading.BoundedSemaphore(max_concurrent) if max_concurrent else None
+        self.cache = get_panel_cache()
+
+    def new_scanner(self, logger=None, params=None):
+        """Empty per-session scanner (universe lists, chart lookups); data comes from the shared cache."""
+        return CMWilliamsVixFixScanner(logger_callback=logger, **(params or {}))
+
+    def prepare(self, request, logger=None):
+        """Scanner for one request with the universe's data attached (no scan yet)."""
+        scanner = self.new_scanner(logger, request.params)
+        scanner.top_n_volume = request.top_n
+        if request.universe == "watchlist":
+            scanner.tickers = request.tickers or []
+        scanner.fetch_data(universe=request.universe, local_only=request.local_only)
+        return scanner
+
+    @contextlib.contextmanager
+    def slot(self):
+        """Holds one of the concurrent-scan slots (for other CPU-bound work on prepared scanners)."""
+        if self._slots:
+            self._slots.acquire()
+        try:
+            yield
+        finally:
+            if self._slots:
+                self._slots.release()
+
+    def scan(self, scanner, request):
+        """Scans a prepared scanner as of request.scan_date."""
+        with self.slot():
+            return scanner.run_scan(scan_date=request.scan_date, local_only=True)
+
+    def run(self, request, logger=None):
+        """Runs a scan. Returns (results, scanner) - the scanner keeps the request's data for charts."""
+        scanner = self.prepare(request, logger)
+        return self.scan(scanner, request), scanner
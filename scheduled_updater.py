@@ -0,0 +1,231 @@
+import argparse
+import datetime
+import json
+import os
+import time
+import traceback
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+from cm_williams_vix_fix import CMWilliamsVixFixScanner
+from data_cache import get_panel_cache
+from exchange_store import store_files
+from signal_alerts import AlertEngine
+from signal_history import get_signal_history
+from trading_calendar import CLOSE_TIMES, NYSE, TIMEZONES, TWSE, last_closed_session, trading_days
+
+# Headless database updater.
+# Refreshes every configured universe shortly after its exchange closes (incremental download),
+# precomputes the next-day scan and records the outcome in a status manifest that the dashboard
+# reads, so nobody has to sit through "Update Database" in the UI.
+#
+#   python scheduled_updater.py              # run forever, after each TWSE / NYSE close
+#   python scheduled_updater.py --once       # update everything now and exit
+#   python scheduled_updater.py --once --exchange TWSE
+#
+# Each scan is also diffed against the previous one (signal_alerts.py) and only new or changed
+# signals are sent to the configured notifiers; --no-alerts turns that off. New bars are folded
+# into the signal history database (signal_history.py).
+
+DATA_DIR = "data"
+STATUS_FILE = os.path.join(DATA_DIR, "update_status.json")
+SCAN_DIR = os.path.join(DATA_DIR, "scans")
+
+# Exchange close times (local) and the universes refreshed after each close.
+# delay_minutes leaves time for Yahoo to publish the final daily bar.
+SCHEDULE = {
+    TWSE: {"tz": TIMEZONES[TWSE], "close": CLOSE_TIMES[TWSE], "delay_minutes": 60, "universes": ["taiwan100", "tw_high_yield"]},
+    NYSE: {"tz": TIMEZONES[NYSE], "close": CLOSE_TIMES[NYSE], "delay_minutes": 60, "universes": ["sp500", "nasdaq100", "etf_top"]},
+}
+
+
+def load_schedule(config_path=None):
+    """Default schedule, optionally overridden per exchange by a JSON file of the same shape."""
+    schedule = {ex: dict(cfg) for ex, cfg in SCHEDULE.items()}
+    if config_path:
+        with open(config_path, "r", encoding="utf-8") as f:
+            for ex, cfg in json.load(f).items():
+                schedule.setdefault(ex, {}).update(cfg)
+    return schedule
+
+
+def read_status():
+    if not os.path.exists(STATUS_FILE):
+        return {}
+    try:
+        with open(STATUS_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def write_status(status):
+    if not os.path.exists(DATA_DIR):
+        os.makedirs(DATA_DIR)
+    tmp = STATUS_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(status, f, indent=2, default=str)
+    # Atomic swap so the dashboard never reads a half-written manifest
+    os.replace(tmp, STATUS_FILE)
+
+
+class StaleDataError(RuntimeError):
+    """The update downloaded nothing although a newer session has closed."""
+
+
+def scan_path(universe):
+    return os.path.join(SCAN_DIR, f"{universe}_latest.csv")
+
+
+def load_precomputed_scan(universe):
+    """Returns (results, manifest entry) of the latest precomputed scan, or (None, entry)."""
+    entry = read_status().get(universe, {})
+    path = scan_path(universe)
+    if entry.get("status") != "ok" or not os.path.exists(path):
+        return None, entry
+    try:
+        return pd.read_csv(path), entry
+    except pd.errors.EmptyDataError:
+        return pd.DataFrame(), entry
+
+
+def next_run(exchange_cfg, exchange, now=None):
+    """Next post-close run time (UTC) for an exchange, skipping non-trading days."""
+    tz = ZoneInfo(exchange_cfg["tz"])
+    now = (now or datetime.datetime.now(datetime.timezone.utc)).astimezone(tz)
+    hour, minute = (int(x) for x in exchange_cfg["close"].split(":"))
+    delay = datetime.timedelta(minutes=exchange_cfg.get("delay_minutes", 0))
+    sessions = trading_days(exchange, now.date() - datetime.timedelta(days=1), now.date() + datetime.timedelta(days=14))
+    for day in sessions:
+        run_at = datetime.datetime(day.year, day.month, day.day, hour, minute, tzinfo=tz) + delay
+        if run_at > now:
+            return run_at.astimezone(datetime.timezone.utc)
+    return None
+
+
+def last_bars(panels):
+    return {ex: p.index[-1].strftime('%Y-%m-%d') for ex, p in panels.items()}
+
+
+def stored_last_bars(csv_path):
+    """Last bar per exchange of a stored database ({} if missing or unreadable)."""
+    if not store_files(csv_path):
+        return {}
+    try:
+        return last_bars(get_panel_cache().load(csv_path).panels)
+    except Exception:
+        return {}
+
+
+def update_universe(universe, exchange, logger=print, alerts=None):
+    """Incremental update + next-day scan for one universe (+ signal history, alerts). Returns its manifest entry."""
+    started = time.time()
+    entry = {"exchange": exchange, "started": datetime.datetime.now().isoformat(timespec="seconds")}
+    try:
+        scanner = CMWilliamsVixFixScanner(logger_callback=None)
+        csv_path = scanner._get_csv_path(universe)
+        before = stored_last_bars(csv_path)
+        scanner.fetch_data(universe=universe, local_only=False)
+        if not scanner.panels:
+            raise RuntimeError("No data after update")
+        entry["last_bar"] = last_bars(scanner.panels)
+        entry["tickers"] = len(scanner.tickers)
+
+        # The downloader only logs failed chunks: a store that did not move although a newer
+        # session has closed is a failed update, not an up-to-date one
+        behind = {ex: bar for ex, bar in entry["last_bar"].items() if bar < str(last_closed_session(ex))}
+        if behind and entry["last_bar"] == before:
+            raise StaleDataError(f"No new bars downloaded; last bar still {behind}")
+
+        results = scanner.run_scan(local_only=True)
+        if not os.path.exists(SCAN_DIR):
+            os.makedirs(SCAN_DIR)
+        results.to_csv(scan_path(universe), index=False)
+        entry["scan_path"] = scan_path(universe)
+        entry["scan_as_of"] = max(entry["last_bar"].values())
+        entry["candidates"] = int(len(results))
+        entry["status"] = "ok"
+    except StaleDataError as e:
+        entry["status"] = "stale"
+        entry["error"] = str(e)
+        logger(f"[WARNING] {universe}: {e}")
+    except Exception as e:
+        entry["status"] = "error"
+        entry["error"] = f"{type(e).__name__}: {e}"
+        logger(traceback.format_exc())
+    if entry["status"] == "ok":
+        try:
+            entry["history_rows"] = get_signal_history().update(scanner)
+        except Exception as e:
+            entry["history_error"] = f"{type(e).__name__}: {e}"
+            logger(f"[WARNING] Signal history for {universe} failed: {entry['history_error']}")
+    if alerts is not None and entry["status"] == "ok":
+        # A failing notifier must not turn a good update into an error
+        try:
+            entry["alerts"] = len(alerts.process(universe, results, entry["scan_as_of"]))
+        except Exception as e:
+            entry["alerts_error"] = f"{type(e).__name__}: {e}"
+            logger(f"[WARNING] Alerts for {universe} failed: {entry['alerts_error']}")
+    entry["finished"] = datetime.datetime.now().isoformat(timespec="seconds")
+    entry["duration_s"] = round(time.time() - started, 1)
+    return entry
+
+
+def run_exchange(exchange, schedule, universes=None, logger=print, alerts=None):
+    for universe in universes or schedule[exchange]["universes"]:
+        logger(f"[INFO] Updating {universe} ({exchange})...")
+        entry = update_universe(universe, exchange, logger, alerts)
+        # Re-read so concurrent writers (other exchange, dashboard) are not clobbered
+        status = read_status()
+        status[universe] = entry
+        write_status(status)
+        logger(f"[INFO] {universe}: {entry['status']} in {entry['duration_s']}s")
+
+
+def run_forever(schedule, logger=print, alerts=None, universes=None):
+    """Runs each exchange after its close; `universes` limits every run to those keys."""
+    while True:
+        plan = {ex: next_run(cfg, ex) for ex, cfg in schedule.items()}
+        plan = {ex: at for ex, at in plan.items() if at is not None}
+        if not plan:
+            logger("[ERROR] No upcoming sessions in schedule. Exiting.")
+            return
+        exchange, run_at = min(plan.items(), key=lambda kv: kv[1])
+        wait = (run_at - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+        logger(f"[INFO] Next run: {exchange} at {run_at.isoformat()} (in {wait / 3600:.1f}h)")
+        if wait > 0:
+            time.sleep(wait)
+        selected = [u for u in schedule[exchange]["universes"] if not universes or u in universes]
+        if selected:
+            run_exchange(exchange, schedule, selected, logger=logger, alerts=alerts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh local databases after each exchange close.")
+    parser.add_argument("--once", action="store_true", help="Update now and exit instead of scheduling")
+    parser.add_argument("--exchange", choices=list(SCHEDULE), action="append", help="Limit to an exchange (repeatable)")
+    parser.add_argument("--universe", action="append", help="Limit to a universe key, e.g. sp500 (repeatable)")
+    parser.add_argument("--config", help="JSON file overriding the default schedule")
+    parser.add_argument("--no-alerts", action="store_true", help="Skip signal-diff alerts after each scan")
+    args = parser.parse_args()
+
+    schedule = load_schedule(args.config)
+    if args.exchange:
+        schedule = {ex: cfg for ex, cfg in schedule.items() if ex in args.exchange}
+    if args.universe:
+        # Only wake up for exchanges that have one of the selected universes
+        schedule = {ex: cfg for ex, cfg in schedule.items() if any(u in args.universe for u in cfg["universes"])}
+    alerts = None if args.no_alerts else AlertEngine()
+
+    if args.once:
+        for exchange, cfg in schedule.items():
+            universes = [u for u in cfg["universes"] if not args.universe or u in args.universe]
+            if universes:
+                run_exchange(exchange, schedule, universes, alerts=alerts)
+    else:
+        run_forever(schedule, alerts=alerts, universes=args.universe)
+
+
+if __name__ == "__main__":
+    main()
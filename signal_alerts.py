@@ -0,0 +1,237 @@
+import abc
+import datetime
+import json
+import os
+import re
+import threading
+
+# Signal-diff alerts: only what changed since the last run of a universe / watchlist.
+# The last scan of each key is kept as a small snapshot ({ticker: status, signal date, WVF,
+# UpperBB}); every new scan is diffed against it and only the changes are sent:
+#   new_watch        a new WATCH (New Signal) name
+#   new_actionable   a name that is ACTIONABLE (Buy) without having been on WATCH
+#   upgraded         WATCH -> ACTIONABLE (yesterday's signal confirmed, buy at today's open)
+#   resignal         ACTIONABLE -> WATCH again (a fresh signal bar)
+#   renewed          same status, later signal bar (the signal fired again on consecutive days)
+#   dropped          a name that is no longer a candidate
+# The first run of a key only records the baseline. Scans older than the snapshot (Time Machine)
+# are ignored, so they never rewind it. The snapshot only advances once at least one notifier
+# delivered the changes, so a failed webhook means a resend on the next run, not a lost alert.
+# Keys are namespaced by caller ("sp500" for the nightly updater, "cli:sp500" for scan_cli), so
+# ad-hoc runs do not consume the changes the scheduled job should report.
+#
+# Notifiers are pluggable: VIXFIX_ALERT_NOTIFIERS="file,console" (default "file") or
+# "webhook:https://...", and register_notifier() adds more. MemoryNotifier is the local stand-in
+# for tests and dry runs.
+#
+#   engine = AlertEngine()
+#   changes = engine.process("sp500", results, as_of="2024-08-05")
+
+ALERT_DIR = os.path.join("data", "alerts")
+ALERT_LOG = os.path.join(ALERT_DIR, "alerts.jsonl")
+WATCH = "WATCH (New Signal)"
+ACTIONABLE = "ACTIONABLE (Buy)"
+
+
+def snapshot_from_results(results):
+    """{ticker: {status, signal_date, wvf, upper_bb}} of a run_scan result frame."""
+    if results is None or results.empty:
+        return {}
+    snapshot = {}
+    for row in results.drop_duplicates('Ticker').to_dict('records'):
+        snapshot[row['Ticker']] = {
+            "status": row.get('Status'),
+            "signal_date": row.get('Signal Date'),
+            "wvf": row.get('WVF'),
+            "upper_bb": row.get('UpperBB'),
+        }
+    return snapshot
+
+
+def diff_snapshots(previous, current):
+    """Changes between two snapshots as a list of dicts (ticker, kind, old_status, new_status, ...)."""
+    changes = []
+    for ticker, now in current.items():
+        before = previous.get(ticker)
+        old_status = before["status"] if before else None
+        new_status = now["status"]
+        if old_status == new_status:
+            if str(now.get("signal_date")) == str(before.get("signal_date")):
+                continue
+            kind = "renewed"
+        elif old_status is None:
+            kind = "new_actionable" if new_status == ACTIONABLE else "new_watch"
+        elif old_status == WATCH and new_status == ACTIONABLE:
+            kind = "upgraded"
+        elif old_status == ACTIONABLE and new_status == WATCH:
+            kind = "resignal"
+        else:
+            kind = "changed"
+        changes.append({"ticker": ticker, "kind": kind, "old_status": old_status, "new_status": new_status,
+                        "signal_date": now.get("signal_date"), "wvf": now.get("wvf"), "upper_bb": now.get("upper_bb")})
+    for ticker, before in previous.items():
+        if ticker not in current:
+            changes.append({"ticker": ticker, "kind": "dropped", "old_status": before["status"], "new_status": None,
+                            "signal_date": before.get("signal_date"), "wvf": None, "upper_bb": None})
+    order = {"upgraded": 0, "new_actionable": 1, "new_watch": 2, "resignal": 3, "renewed": 4, "changed": 5, "dropped": 6}
+    return sorted(changes, key=lambda c: (order[c["kind"]], c["ticker"]))
+
+
+def format_changes(key, as_of, changes):
+    lines = [f"[ALERT] {key} as of {as_of}: {len(changes)} change(s)"]
+    for c in changes:
+        transition = f"{c['old_status'] or '-'} -> {c['new_status'] or '-'}"
+        lines.append(f"  {c['kind']:<15} {c['ticker']:<12} {transition}")
+    return "\n".join(lines)
+
+
+# --- Notifiers ---
+
+class Notifier(abc.ABC):
+    @abc.abstractmethod
+    def send(self, key, as_of, changes):
+        """Delivers the changes of one key; raises if they were not delivered."""
+
+
+class FileNotifier(Notifier):
+    """Appends one JSON line per change to data/alerts/alerts.jsonl."""
+
+    def __init__(self, path=None):
+        self.path = path or ALERT_LOG
+        self._lock = threading.Lock()
+
+    def send(self, key, as_of, changes):
+        folder = os.path.dirname(self.path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder, exist_ok=True)
+        sent = datetime.datetime.now().isoformat(timespec="seconds")
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            for change in changes:
+                f.write(json.dumps({"key": key, "as_of": as_of, "sent": sent, **change}, default=str) + "\n")
+
+
+class ConsoleNotifier(Notifier):
+    def __init__(self, logger=print):
+        self.logger = logger
+
+    def send(self, key, as_of, changes):
+        self.logger(format_changes(key, as_of, changes))
+
+
+class MemoryNotifier(Notifier):
+    """Local stand-in: keeps every (key, as_of, changes) it was sent."""
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, key, as_of, changes):
+        self.sent.append((key, as_of, list(changes)))
+
+
+class WebhookNotifier(Notifier):
+    """POSTs {"key", "as_of", "text", "changes"} as JSON (Slack-style incoming webhooks read "text")."""
+
+    def __init__(self, url, timeout=10):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, key, as_of, changes):
+        import requests
+        payload = {"key": key, "as_of": as_of, "text": format_changes(key, as_of, changes), "changes": changes}
+        response = requests.post(self.url, data=json.dumps(payload, default=str),
+                                 headers={"Content-Type": "application/json"}, timeout=self.timeout)
+        if response.status_code >= 300:
+            raise RuntimeError(f"Webhook HTTP {response.status_code}")
+
+
+NOTIFIERS = {
+    "file": lambda arg: FileNotifier(arg or None),
+    "console": lambda arg: ConsoleNotifier(),
+    "memory": lambda arg: MemoryNotifier(),
+    "webhook": lambda arg: WebhookNotifier(arg),
+}
+
+
+def register_notifier(name, factory):
+    """factory(arg) -> Notifier, used for "name" / "name:arg" entries of VIXFIX_ALERT_NOTIFIERS."""
+    NOTIFIERS[name] = factory
+
+
+def notifiers_from_spec(spec=None):
+    """Notifiers from a comma-separated spec such as "file,console,webhook:https://..."."""
+    spec = spec if spec is not None else os.environ.get("VIXFIX_ALERT_NOTIFIERS", "file")
+    notifiers = []
+    for item in filter(None, (s.strip() for s in spec.split(","))):
+        name, _, arg = item.partition(":")
+        if name not in NOTIFIERS:
+            raise ValueError(f"Unknown notifier '{name}' (known: {', '.join(NOTIFIERS)})")
+        notifiers.append(NOTIFIERS[name](arg))
+    return notifiers
+
+
+# --- Engine ---
+
+class AlertEngine:
+    def __init__(self, notifiers=None, snapshot_dir=None, logger=print):
+        self.notifiers = notifiers if notifiers is not None else notifiers_from_spec()
+        self.snapshot_dir = snapshot_dir or ALERT_DIR
+        self.logger = logger
+        self._lock = threading.Lock()
+
+    def snapshot_path(self, key):
+        safe = re.sub(r'[^0-9A-Za-z._-]+', '_', key)
+        return os.path.join(self.snapshot_dir, f"{safe}_last_scan.json")
+
+    def load_snapshot(self, key):
+        path = self.snapshot_path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger(f"[WARNING] Unreadable alert snapshot {path} ({e}), starting a new baseline.")
+            return None
+
+    def save_snapshot(self, key, as_of, signals):
+        if not os.path.exists(self.snapshot_dir):
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+        path = self.snapshot_path(key)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"key": key, "as_of": as_of, "saved": datetime.datetime.now().isoformat(timespec="seconds"),
+                       "signals": signals}, f, indent=1, default=str)
+        os.replace(tmp, path)
+
+    def process(self, key, results, as_of):
+        """
+        Diffs a scan against the key's snapshot and notifies the changes. The snapshot only advances
+        once a notifier has taken them; if every notifier fails, the next run sends them again.
+        """
+        as_of = str(as_of)[:10]
+        current = snapshot_from_results(results)
+        with self._lock:
+            previous = self.load_snapshot(key)
+            if previous is not None and as_of < previous.get("as_of", ""):
+                self.logger(f"[INFO] Alerts {key}: scan as of {as_of} is older than the snapshot ({previous['as_of']}), skipped.")
+                return []
+            if previous is None:
+                self.save_snapshot(key, as_of, current)
+                self.logger(f"[INFO] Alerts {key}: baseline of {len(current)} signals recorded.")
+                return []
+
+            changes = diff_snapshots(previous.get("signals", {}), current)
+            delivered = not changes or not self.notifiers
+            for notifier in self.notifiers if changes else ():
+                try:
+                    notifier.send(key, as_of, changes)
+                    delivered = True
+                except Exception as e:
+                    self.logger(f"[WARNING] {type(notifier).__name__} failed for {key}: {e}")
+            if not delivered:
+                self.logger(f"[ERROR] Alerts {key}: no notifier delivered {len(changes)} change(s); "
+                            f"snapshot kept at {previous.get('as_of')} to resend them next run.")
+                return changes
+            self.save_snapshot(key, as_of, current)
+        self.logger(f"[INFO] Alerts {key}: {len(changes)} change(s) since {previous.get('as_of')}.")
+        return changes
@@ -0,0 +1,284 @@
+import contextlib
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from breadth import indicator_matrices
+
+# Indexed history of every Vix Fix signal event (WVF > UpperBB and Close > SMA200), so questions
+# like "when did AVGO last fire?" or "which .TW names signaled more than 3 times this year?" are
+# one SQLite query instead of a scan per date.
+# One row per (ticker, signal bar, indicator parameters) with Close, WVF, UpperBB, SMA200 and the
+# forward returns from the signal close. Status is ACTIONABLE once the next bar exists (the entry
+# at its open) and WATCH while the signal is on the latest bar.
+#
+# Maintenance is incremental: the coverage table remembers the last bar processed per ticker, and
+# an update only writes the bars after it plus FORWARD_DAYS[-1] bars before it (whose status and
+# forward returns were still open). Writers that change older history (backfill_gaps,
+# download_missing_tickers) invalidate() the tickers, which the next update then recomputes.
+# Indicators come from the column-wise matrices of breadth.py, not calculate_indicators.
+# Rows are per ticker, independent of universe membership.
+#
+#   history = get_signal_history()
+#   history.update(scanner)                   # after fetch_data / a scan
+#   history.ticker_history("AVGO")
+#   history.signal_counts("2024-01-01", market="taiwan", min_count=4)    # .TW and .TWO
+
+HISTORY_DB = os.path.join("data", "signal_history.sqlite")
+FORWARD_DAYS = (1, 5, 10, 20)
+DEFAULT_PARAMS = (22, 20, 2.0, 200)
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS signals (
+    ticker      TEXT NOT NULL,
+    date        TEXT NOT NULL,
+    params      TEXT NOT NULL,
+    status      TEXT NOT NULL,
+    close       REAL,
+    wvf         REAL,
+    upper_bb    REAL,
+    sma200      REAL,
+    {", ".join(f"ret_{d}d REAL" for d in FORWARD_DAYS)},
+    PRIMARY KEY (ticker, params, date)
+);
+CREATE INDEX IF NOT EXISTS idx_signals_date ON signals (params, date);
+CREATE TABLE IF NOT EXISTS coverage (
+    ticker      TEXT NOT NULL,
+    params      TEXT NOT NULL,
+    last_date   TEXT NOT NULL,
+    updated_at  REAL NOT NULL,
+    PRIMARY KEY (ticker, params)
+);
+"""
+
+RETURN_COLUMNS = [f"ret_{d}d" for d in FORWARD_DAYS]
+# Ticker suffixes per market: TWSE (.TW) and TPEx (.TWO); everything else counts as US
+TAIWAN_SUFFIXES = ("%.TW", "%.TWO")
+MARKETS = ("taiwan", "us")
+COLUMNS = ["ticker", "date", "status", "close", "wvf", "upper_bb", "sma200"] + RETURN_COLUMNS
+
+
+def params_key(params=None):
+    """'22/20/2.0/200' for (lookback_period, bb_length, bb_std, sma_filter)."""
+    return "/".join(str(p) for p in (params or DEFAULT_PARAMS))
+
+
+def signal_rows(ticker, indicators, start=0):
+    """Signal events of an indicator frame from position `start` on, as tuples in COLUMNS order."""
+    window = indicators.iloc[start:]
+    close = window['Close']
+    returns = [(close.shift(-d) / close - 1) * 100 for d in FORWARD_DAYS]
+    mask = ((window['WVF'] > window['UpperBB']) & (window['Close'] > window['SMA200'])).to_numpy()
+    if not mask.any():
+        return []
+    last = indicators.index[-1]
+    frame = pd.DataFrame({
+        "date": window.index[mask].strftime('%Y-%m-%d'),
+        "status": ["WATCH" if d == last else "ACTIONABLE" for d in window.index[mask]],
+        "close": close[mask].round(4), "wvf": window['WVF'][mask].round(4),
+        "upper_bb": window['UpperBB'][mask].round(4), "sma200": window['SMA200'][mask].round(4),
+        **{name: r[mask].round(4) for name, r in zip(RETURN_COLUMNS, returns)},
+    }, index=window.index[mask])
+    frame = frame.astype(object).where(frame.notna(), None)
+    return [(ticker,) + tuple(row) for row in frame.itertuples(index=False)]
+
+
+class SignalHistory:
+    def __init__(self, path=None):
+        self.path = path or HISTORY_DB
+        self._lock = threading.Lock()
+        folder = os.path.dirname(self.path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # Short-lived connections: sqlite3 objects must not cross threads (dashboard sessions)
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    # --- maintenance ---
+
+    @staticmethod
+    def _indicator_frames(scanner, exchange, panel, tickers):
+        """{ticker: Close/WVF/UpperBB/SMA200 frame over the ticker's stored bars}."""
+        spans = scanner._get_spans(exchange)
+        # No per-ticker calculate_indicators (its Supertrend loop is not needed here): column-wise
+        # rolling windows as in breadth.py, one computation for all tickers without holes
+        dense = [t for t in tickers if not spans[t][2]]
+        frames = {}
+        if dense:
+            matrices = indicator_matrices(panel, dense, *scanner.indicator_params())
+            for ticker in dense:
+                first, stop, _ = spans[ticker]
+                frames[ticker] = pd.DataFrame({name: m[ticker].iloc[first:stop] for name, m in matrices.items()})
+        for ticker in tickers:
+            if ticker not in frames:
+                # Holes inside the history: the same rolling windows over the bars without the holes
+                bars = scanner.get_ticker_data(ticker)
+                matrices = indicator_matrices(pd.concat({ticker: bars}, axis=1), [ticker], *scanner.indicator_params())
+                frames[ticker] = pd.DataFrame({name: m[ticker] for name, m in matrices.items()})
+        return frames
+
+    def update(self, scanner, tickers=None, full=False):
+        """
+        Adds the signal events of new bars for the scanner's tickers (default: all stored ones).
+        full=True recomputes every bar, as does the next update after invalidate(). Returns the
+        number of rows written.
+        """
+        t0 = time.perf_counter()
+        key = params_key(scanner.indicator_params())
+        wanted = set(tickers) if tickers is not None else None
+        with self._connect() as conn:
+            coverage = dict(conn.execute("SELECT ticker, last_date FROM coverage WHERE params=?", (key,)))
+
+        rows, covered, deleted = [], [], []
+        for exchange, panel in scanner.panels.items():
+            if panel is None or panel.empty:
+                continue
+            spans = scanner._get_spans(exchange)
+            pending = {}
+            for ticker, (first, stop, _) in spans.items():
+                if wanted is not None and ticker not in wanted:
+                    continue
+                last_bar = panel.index[stop - 1].strftime('%Y-%m-%d')
+                done = None if full else coverage.get(ticker)
+                if done is None or done < last_bar:
+                    pending[ticker] = (done, last_bar)
+            if not pending:
+                continue
+
+            for ticker, indicators in self._indicator_frames(scanner, exchange, panel, list(pending)).items():
+                if indicators is None or indicators.empty:
+                    continue
+                done, last_bar = pending[ticker]
+                start = 0
+                if done is None:
+                    # Recomputed from the first bar (full=True, new or invalidated ticker): rows
+                    # of the old history that no longer qualify must go too
+                    deleted.append((ticker, key))
+                else:
+                    # Reopen the bars whose status / forward returns were incomplete
+                    start = max(0, int(indicators.index.searchsorted(pd.Timestamp(done), side="right")) - FORWARD_DAYS[-1])
+                rows.extend(signal_rows(ticker, indicators, start))
+                covered.append((ticker, key, last_bar, time.time()))
+
+        if covered:
+            with self._lock, self._connect() as conn:
+                conn.executemany("DELETE FROM signals WHERE ticker=? AND params=?", deleted)
+                conn.executemany(
+                    f"INSERT OR REPLACE INTO signals (params, {', '.join(COLUMNS)}) VALUES (?{', ?' * len(COLUMNS)})",
+                    [(key,) + row for row in rows])
+                conn.executemany("INSERT OR REPLACE INTO coverage VALUES (?, ?, ?, ?)", covered)
+            scanner.log(f"[INFO] Signal history: {len(covered)} tickers updated, {len(rows)} signal rows "
+                        f"written in {time.perf_counter() - t0:.2f}s")
+        return len(rows)
+
+    def invalidate(self, tickers):
+        """
+        Forgets the coverage of tickers whose stored history changed before their last bar
+        (gap backfill, full download), so the next update recomputes them from the first bar.
+        """
+        tickers = list(dict.fromkeys(tickers))
+        if not tickers:
+            return
+        with self._lock, self._connect() as conn:
+            conn.executemany("DELETE FROM coverage WHERE ticker=?", [(t,) for t in tickers])
+
+    # --- queries ---
+
+    def _frame(self, sql, args):
+        with self._connect() as conn:
+            cursor = conn.execute(sql, args)
+            columns = [c[0] for c in cursor.description]
+            frame = pd.DataFrame(cursor.fetchall(), columns=columns)
+        if 'date' in frame.columns:
+            frame['date'] = pd.to_datetime(frame['date'])
+        return frame
+
+    @staticmethod
+    def _range(start, end):
+        sql, args = "", []
+        if start is not None:
+            sql += " AND date>=?"
+            args.append(str(pd.Timestamp(start).date()))
+        if end is not None:
+            sql += " AND date<=?"
+            args.append(str(pd.Timestamp(end).date()))
+        return sql, args
+
+    @staticmethod
+    def _tickers(ticker_like, market):
+        sql, args = "", []
+        if ticker_like:
+            sql += " AND ticker LIKE ?"
+            args.append(ticker_like)
+        if market == "taiwan":
+            sql += " AND (" + " OR ".join("ticker LIKE ?" for _ in TAIWAN_SUFFIXES) + ")"
+            args.extend(TAIWAN_SUFFIXES)
+        elif market == "us":
+            sql += "".join(" AND ticker NOT LIKE ?" for _ in TAIWAN_SUFFIXES)
+            args.extend(TAIWAN_SUFFIXES)
+        elif market is not None:
+            raise ValueError(f"Unknown market '{market}' (one of {', '.join(MARKETS)})")
+        return sql, args
+
+    def ticker_history(self, ticker, start=None, end=None, params=None):
+        """Every signal of one ticker, newest first."""
+        where, args = self._range(start, end)
+        return self._frame(f"SELECT {', '.join(COLUMNS)} FROM signals WHERE ticker=? AND params=?{where} ORDER BY date DESC",
+                           [ticker, params_key(params)] + args)
+
+    def last_signal(self, ticker, params=None):
+        """Most recent signal of the ticker as a dict, or None."""
+        frame = self._frame(f"SELECT {', '.join(COLUMNS)} FROM signals WHERE ticker=? AND params=? ORDER BY date DESC LIMIT 1",
+                            [ticker, params_key(params)])
+        return None if frame.empty else frame.iloc[0].to_dict()
+
+    def signals_between(self, start=None, end=None, ticker_like=None, market=None, params=None):
+        """All signals in a date range, optionally for tickers matching a LIKE pattern or one market ('taiwan', 'us')."""
+        where, args = self._range(start, end)
+        sql, more = self._tickers(ticker_like, market)
+        where, args = where + sql, args + more
+        return self._frame(f"SELECT {', '.join(COLUMNS)} FROM signals WHERE params=?{where} ORDER BY date DESC, ticker",
+                           [params_key(params)] + args)
+
+    def signal_counts(self, start=None, end=None, ticker_like=None, market=None, min_count=1, params=None):
+        """Signals per ticker in a range: count, first / last date and average forward returns."""
+        where, args = self._range(start, end)
+        sql, more = self._tickers(ticker_like, market)
+        where, args = where + sql, args + more
+        averages = ", ".join(f"ROUND(AVG({c}), 2) AS avg_{c}" for c in RETURN_COLUMNS)
+        frame = self._frame(
+            f"SELECT ticker, COUNT(*) AS signals, MIN(date) AS first, MAX(date) AS last, {averages} "
+            f"FROM signals WHERE params=?{where} GROUP BY ticker HAVING COUNT(*)>=? ORDER BY signals DESC, last DESC",
+            [params_key(params)] + args + [int(min_count)])
+        return frame
+
+    def stats(self):
+        with self._connect() as conn:
+            signals, tickers, first, last = conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT ticker), MIN(date), MAX(date) FROM signals").fetchone()
+            covered = conn.execute("SELECT COUNT(*) FROM coverage").fetchone()[0]
+        return {"signals": signals, "tickers": tickers, "covered": covered, "first": first, "last": last}
+
+
+_default_history = None
+_default_lock = threading.Lock()
+
+
+def get_signal_history():
+    global _default_history
+    with _default_lock:
+        if _default_history is None:
+            _default_history = SignalHistory()
+        return _default_history
@@ -0,0 +1,142 @@
+import contextlib
+import os
+import threading
+import time
+import datetime
+
+# Request coalescing for expensive, idempotent jobs (database updates).
+# Concurrent callers asking for the same key attach to the job that is already running,
+# see its progress messages and get its result, instead of starting a second download.
+#
+#   coordinator = SingleFlight()
+#   flight, started = coordinator.submit(("update", "sp500", 1825, "2026-01-02"), job)
+#   while not flight.wait(0.5):
+#       show(flight.messages[-5:])
+
+
+class Flight:
+    def __init__(self, key):
+        self.key = key
+        self.started = datetime.datetime.now()
+        self.finished = None
+        self.messages = []
+        self.result = None
+        self.error = None
+        self.followers = 0
+        self._done = threading.Event()
+
+    def log(self, message):
+        # list.append is atomic; readers take snapshots via messages[-n:]
+        self.messages.append(message)
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Blocks until the job finishes or timeout expires. Returns True once finished."""
+        return self._done.wait(timeout)
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def submit(self, key, fn):
+        """
+        Starts fn(log) in a background thread unless a job with the same key is running.
+        Returns (flight, started_new).
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.followers += 1
+                return flight, False
+            flight = Flight(key)
+            self._flights[key] = flight
+
+        def runner():
+            try:
+                flight.result = fn(flight.log)
+            except Exception as e:
+                flight.error = e
+                flight.log(f"[ERROR] {type(e).__name__}: {e}")
+            finally:
+                flight.finished = datetime.datetime.now()
+                with self._lock:
+                    self._flights.pop(key, None)
+                flight._done.set()
+
+        threading.Thread(target=runner, name=f"single-flight-{key}", daemon=True).start()
+        return flight, True
+
+    def run(self, key, fn, timeout=None):
+        """Blocking variant of submit(). Re-raises the job's exception."""
+        flight, _ = self.submit(key, fn)
+        flight.wait(timeout)
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def active(self):
+        with self._lock:
+            return list(self._flights.values())
+
+
+# --- Store write lock ---
+# Serializes writers of the same database across threads (dashboard sessions) and processes
+# (dashboard + scheduled_updater.py). A lock file older than STALE_LOCK_SECONDS is assumed to be
+# left behind by a crashed process and is taken over.
+
+STALE_LOCK_SECONDS = 2 * 3600
+_thread_locks = {}
+_thread_locks_guard = threading.Lock()
+
+
+def _thread_lock(path):
+    with _thread_locks_guard:
+        return _thread_locks.setdefault(os.path.abspath(path), threading.Lock())
+
+
+@contextlib.contextmanager
+def store_lock(path, timeout=1800, poll=0.5, logger=None):
+    lock_path = path + ".lock"
+    folder = os.path.dirname(lock_path)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder, exist_ok=True)
+
+    tlock = _thread_lock(path)
+    if not tlock.acquire(timeout=timeout):
+        raise TimeoutError(f"Timed out waiting for {path}")
+    try:
+        deadline = time.time() + timeout
+        announced = False
+        while True:
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                with os.fdopen(fd, "w") as f:
+                    f.write(f"{os.getpid()} {datetime.datetime.now().isoformat()}")
+                break
+            except FileExistsError:
+                try:
+                    if time.time() - os.path.getmtime(lock_path) > STALE_LOCK_SECONDS:
+                        os.remove(lock_path)
+                        continue
+                except FileNotFoundError:
+                    continue
+                if time.time() > deadline:
+                    raise TimeoutError(f"Timed out waiting for {lock_path}")
+                if logger and not announced:
+                    logger(f"  Waiting for another update of {path} to finish...")
+                    announced = True
+                time.sleep(poll)
+        try:
+            yield
+        finally:
+            try:
+                os.remove(lock_path)
+            except FileNotFoundError:
+                pass
+    finally:
+        tlock.release()
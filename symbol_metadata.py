@@ -0,0 +1,204 @@
+import datetime
+import json
+import os
+import re
+import threading
+
+from trading_calendar import TWSE, exchange_for_ticker
+
+# Persistent symbol metadata (name, Chinese name, sector, industry, exchange, currency).
+# Filled in bulk from the universe lists the scanner already has (Wikipedia tables, the static
+# Taiwan / ETF lists) and completed in the background from Yahoo for whatever those lack.
+# Lookups are plain dict reads, so chart headers and AI prompts never wait on the network.
+#
+# Stored in data/symbol_metadata.json as {ticker: {field: value, ..., "yahoo_checked": iso}}.
+
+METADATA_FILE = os.path.join("data", "symbol_metadata.json")
+FIELDS = ("name", "name_zh", "sector", "industry", "exchange", "currency")
+# Yahoo-completed records are re-checked after this long
+REFRESH_AFTER = datetime.timedelta(days=30)
+
+_HAS_CJK = re.compile(r'[一-鿿]')
+
+
+def normalize_ticker(ticker):
+    # Scanner convention: Wikipedia's BRK.B -> BRK-B, Taiwan suffixes kept
+    t = str(ticker or "").strip()
+    if t.upper().endswith((".TW", ".TWO")):
+        return t
+    return t.replace('.', '-')
+
+
+def split_display_name(raw):
+    """'台積電 (TSMC)' -> ('TSMC', '台積電'); '國化' -> (None, '國化'); 'Apple Inc.' -> ('Apple Inc.', None)."""
+    raw = str(raw).strip()
+    if not _HAS_CJK.search(raw):
+        return raw, None
+    match = re.match(r'^(.*?)\s*\((.+)\)\s*$', raw)
+    if match:
+        return match.group(2).strip(), match.group(1).strip()
+    return None, raw
+
+
+class SymbolMetadataStore:
+    def __init__(self, path=None):
+        self.path = path or METADATA_FILE
+        self._records = {}
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._records = json.load(f)
+        except Exception as e:
+            print(f"[WARNING] Could not read {self.path}: {e}")
+            self._records = {}
+
+    def save(self):
+        folder = os.path.dirname(self.path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+        with self._lock:
+            snapshot = dict(self._records)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+    def get(self, ticker):
+        """Metadata dict of a ticker ({} if unknown)."""
+        return self._records.get(ticker, {})
+
+    def display_name(self, ticker):
+        """Header / prompt name: '台積電 (TSMC)' for Taiwan listings, the company name otherwise."""
+        rec = self._records.get(ticker, {})
+        name, name_zh = rec.get("name"), rec.get("name_zh")
+        if name_zh and name:
+            return f"{name_zh} ({name})"
+        return name_zh or name or ticker
+
+    def sector_line(self, ticker):
+        """'Sector / Industry' for headers and prompts ('n/a' if unknown)."""
+        rec = self._records.get(ticker, {})
+        return " / ".join(v for v in (rec.get("sector"), rec.get("industry")) if v) or "n/a"
+
+    def _upsert(self, ticker, values, overwrite=True):
+        rec = dict(self._records.get(ticker, {}))
+        for key, val in values.items():
+            if val is not None and val == val and val != "" and (overwrite or not rec.get(key)):
+                rec[key] = val
+        rec.setdefault("exchange", exchange_for_ticker(ticker))
+        rec.setdefault("currency", "TWD" if rec["exchange"] == TWSE else "USD")
+        self._records[ticker] = rec
+
+    def update_from_universe(self, universe_df, overwrite=True, save=True):
+        """
+        Bulk upsert from a universe table (Ticker, Name, Sector[, Industry]). Returns rows changed.
+        overwrite=False only fills missing fields (hand-made lists like 'TW Dividend >5%' use list
+        labels such as 'High Yield' as their sector).
+        """
+        if universe_df is None or universe_df.empty or 'Ticker' not in universe_df.columns:
+            return 0
+        cols = universe_df.columns
+        changed = 0
+        with self._lock:
+            for row in universe_df.to_dict('records'):
+                ticker = normalize_ticker(row.get('Ticker'))
+                if not ticker:
+                    continue
+                values = {}
+                if 'Name' in cols:
+                    values["name"], values["name_zh"] = split_display_name(row.get('Name'))
+                if 'Sector' in cols:
+                    values["sector"] = row.get('Sector')
+                if 'Industry' in cols:
+                    values["industry"] = row.get('Industry')
+                before = self._records.get(ticker)
+                self._upsert(ticker, values, overwrite)
+                changed += before != self._records[ticker]
+        if changed and save:
+            self.save()
+        return changed
+
+    def _needs_refresh(self, ticker):
+        rec = self._records.get(ticker)
+        if not rec or not rec.get("name") and not rec.get("name_zh"):
+            return True
+        if rec.get("industry") and rec.get("sector"):
+            return False
+        checked = rec.get("yahoo_checked")
+        if not checked:
+            return True
+        return datetime.datetime.now() - datetime.datetime.fromisoformat(checked) > REFRESH_AFTER
+
+    def refresh_async(self, tickers, logger=None):
+        """Completes missing fields from Yahoo in a daemon thread. Returns the thread (or None)."""
+        with self._lock:
+            todo = [t for t in dict.fromkeys(tickers) if t not in self._refreshing and self._needs_refresh(t)]
+            self._refreshing.update(todo)
+        if not todo:
+            return None
+
+        def worker():
+            import yfinance as yf
+            try:
+                for i, ticker in enumerate(todo):
+                    try:
+                        info = yf.Ticker(ticker).info or {}
+                    except Exception as e:
+                        if logger:
+                            logger(f"  [WARNING] Metadata lookup failed for {ticker}: {e}")
+                        info = {}
+                    with self._lock:
+                        self._upsert(ticker, {
+                            "name": info.get("longName") or info.get("shortName"),
+                            "sector": info.get("sector"),
+                            "industry": info.get("industry"),
+                            "currency": info.get("currency"),
+                            "yahoo_checked": datetime.datetime.now().isoformat(timespec="seconds"),
+                        })
+                        self._refreshing.discard(ticker)
+                    if (i + 1) % 25 == 0:
+                        self.save()
+            finally:
+                with self._lock:
+                    self._refreshing.difference_update(todo)
+                self.save()
+
+        thread = threading.Thread(target=worker, name="symbol-metadata-refresh", daemon=True)
+        thread.start()
+        return thread
+
+
+def seed_from_universe_lists(store, scanner):
+    """
+    Bulk-fills the store from every list available without a download: the static ETF / Taiwan
+    lists and the cached Wikipedia snapshots (universe_cache.py). `scanner` is a throwaway
+    CMWilliamsVixFixScanner (its tickers / universe_df get overwritten).
+    """
+    from universe_cache import get_constituent_cache
+    cache = get_constituent_cache()
+    for name in ("sp500", "nasdaq100"):
+        store.update_from_universe(cache.snapshot(name), save=False)
+    for loader in (scanner.get_top_etf_tickers, scanner.get_taiwan_top100_tickers, scanner.get_taiwan_high_yield_tickers):
+        loader()
+        store.update_from_universe(scanner.universe_df, overwrite=False, save=False)
+    store.save()
+    return store
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_symbol_metadata():
+    """Process-wide store (shared by the scanner, dashboard sessions and the updater)."""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = SymbolMetadataStore()
+        return _default_store
@@ -0,0 +1,151 @@
+import argparse
+import datetime
+import os
+import numpy as np
+import pandas as pd
+
+from exchange_store import partition_by_exchange, save_panels
+from trading_calendar import NYSE, TWSE, trading_days
+
+# Deterministic synthetic OHLCV generator for offline benchmarking.
+# Output has the same shape as the local database written by CMWilliamsVixFixScanner.fetch_data:
+# a DataFrame indexed by date with MultiIndex columns (Ticker, [Open, High, Low, Close, Volume]).
+
+FIELDS = ['Open', 'High', 'Low', 'Close', 'Volume']
+
+# Standard benchmark universes (name -> ticker count)
+PRESETS = {
+    "synthetic_500": 500,
+    "synthetic_2000": 2000,
+    "synthetic_10000": 10000,
+}
+
+SECTORS = ['Technology', 'Financials', 'Health Care', 'Industrials', 'Energy',
+           'Materials', 'Consumer Staples', 'Utilities', 'Communication', 'Semiconductors']
+
+
+class SyntheticMarketGenerator:
+    def __init__(self, seed=42, years=20, end_date=None, tw_fraction=0.2,
+                 gap_rate=0.5, halt_rate=0.3, ipo_fraction=0.25):
+        """
+        seed:          RNG seed, same seed + arguments always produce identical data
+        years:         History length
+        end_date:      Last calendar day (defaults to a fixed date so runs are comparable)
+        tw_fraction:   Share of tickers listed on TWSE (.TW) instead of NYSE
+        gap_rate:      Expected number of missing-data holes per ticker (partial Yahoo chunks)
+        halt_rate:     Expected number of trading halts per ticker (flat price, zero volume)
+        ipo_fraction:  Share of tickers that list part-way through the history
+        """
+        self.seed = seed
+        self.years = years
+        self.end_date = pd.Timestamp(end_date or "2025-12-31")
+        self.start_date = self.end_date - pd.DateOffset(years=years)
+        self.tw_fraction = tw_fraction
+        self.gap_rate = gap_rate
+        self.halt_rate = halt_rate
+        self.ipo_fraction = ipo_fraction
+
+    def make_universe(self, n_tickers):
+        """Returns the ticker table (Ticker, Name, Sector) in the same layout as the real universes."""
+        n_tw = int(round(n_tickers * self.tw_fraction))
+        n_us = n_tickers - n_tw
+        rows = []
+        for i in range(n_us):
+            rows.append({'Ticker': f"SYN{i:05d}", 'Name': f"Synthetic US {i}", 'Sector': SECTORS[i % len(SECTORS)]})
+        for i in range(n_tw):
+            rows.append({'Ticker': f"{1000 + i:04d}.TW", 'Name': f"Synthetic TW {i}", 'Sector': SECTORS[i % len(SECTORS)]})
+        return pd.DataFrame(rows)
+
+    def _simulate_exchange(self, rng, tickers, exchange):
+        dates = trading_days(exchange, self.start_date, self.end_date)
+        n_days, n = len(dates), len(tickers)
+        if n == 0 or n_days == 0:
+            return None
+
+        # Market factor with volatility clusters so the WVF actually fires now and then
+        vol_regime = np.where(rng.random(n_days) < 0.03, 3.0, 1.0)
+        vol_regime = pd.Series(vol_regime).rolling(10, min_periods=1).max().to_numpy()
+        market = rng.normal(0.0003, 0.01, n_days) * vol_regime
+        beta = rng.uniform(0.5, 1.5, n)
+        idio_vol = rng.uniform(0.01, 0.03, n)
+
+        log_ret = market[:, None] * beta[None, :] + rng.normal(0.0, 1.0, (n_days, n)) * idio_vol[None, :]
+        start_price = rng.uniform(10, 500, n)
+        close = start_price[None, :] * np.exp(np.cumsum(log_ret, axis=0))
+
+        prev_close = np.vstack([start_price[None, :], close[:-1]])
+        open_ = prev_close * np.exp(rng.normal(0.0, 0.004, (n_days, n)))
+        wick = np.abs(rng.normal(0.0, 0.008, (n_days, n)))
+        high = np.maximum(open_, close) * (1 + wick)
+        low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0.0, 0.008, (n_days, n))))
+        volume = np.round(rng.lognormal(13, 1, n)[None, :] * rng.lognormal(0, 0.3, (n_days, n)))
+
+        # Halts: price frozen at the previous close, no volume
+        n_halts = rng.poisson(self.halt_rate, n)
+        for j in np.nonzero(n_halts)[0]:
+            for _ in range(n_halts[j]):
+                start = rng.integers(1, n_days - 1)
+                end = min(n_days, start + rng.integers(1, 15))
+                frozen = close[start - 1, j]
+                open_[start:end, j] = high[start:end, j] = low[start:end, j] = close[start:end, j] = frozen
+                volume[start:end, j] = 0
+
+        stacked = np.stack([open_, high, low, close, volume], axis=2)
+
+        # Late listings: no rows before the IPO
+        is_ipo = rng.random(n) < self.ipo_fraction
+        for j in np.nonzero(is_ipo)[0]:
+            stacked[:rng.integers(1, n_days // 2), j, :] = np.nan
+
+        # Gaps: holes in the middle of the history (what a failed download chunk leaves behind)
+        n_gaps = rng.poisson(self.gap_rate, n)
+        for j in np.nonzero(n_gaps)[0]:
+            for _ in range(n_gaps[j]):
+                start = rng.integers(0, n_days)
+                stacked[start:start + rng.integers(1, 10), j, :] = np.nan
+
+        columns = pd.MultiIndex.from_product([tickers, FIELDS], names=['Ticker', 'Price'])
+        return pd.DataFrame(stacked.reshape(n_days, n * len(FIELDS)), index=dates, columns=columns)
+
+    def generate(self, n_tickers, universe_df=None):
+        """
+        Returns (universe_df, data). data is indexed by the union of the NYSE and TWSE calendars,
+        like a mixed US/TW watchlist downloaded by fetch_data.
+        """
+        if universe_df is None:
+            universe_df = self.make_universe(n_tickers)
+        rng = np.random.default_rng(self.seed + n_tickers)
+
+        tickers = universe_df['Ticker'].tolist()
+        tw = [t for t in tickers if t.endswith('.TW')]
+        us = [t for t in tickers if not t.endswith('.TW')]
+
+        frames = [f for f in (self._simulate_exchange(rng, us, NYSE), self._simulate_exchange(rng, tw, TWSE)) if f is not None]
+        data = frames[0] if len(frames) == 1 else pd.concat(frames, axis=1).sort_index()
+        data.index.name = 'Date'
+        return universe_df, data
+
+    def write_store(self, n_tickers, csv_path):
+        """
+        Generates a universe and writes it as a local database (one file per exchange, see
+        exchange_store.py). Returns the universe table.
+        """
+        universe_df, data = self.generate(n_tickers)
+        save_panels(partition_by_exchange(data), csv_path)
+        return universe_df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write deterministic synthetic OHLCV databases.")
+    parser.add_argument("--size", type=int, action="append", help="Ticker count (repeatable). Defaults to all presets.")
+    parser.add_argument("--years", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default=os.path.join("bench_data", "data"))
+    args = parser.parse_args()
+
+    generator = SyntheticMarketGenerator(seed=args.seed, years=args.years)
+    for size in args.size or list(PRESETS.values()):
+        path = os.path.join(args.out, f"synthetic_{size}_data.csv")
+        t0 = datetime.datetime.now()
+        generator.write_store(size, path)
+        print(f"[INFO] Wrote {size} tickers to {path} in {(datetime.datetime.now() - t0).total_seconds():.1f}s")
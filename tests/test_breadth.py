@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+
+from breadth import _counts, compute_breadth
+from exchange_store import partition_by_exchange
+
+
+class PanelScanner:
+    """Just what compute_breadth reads from a scanner."""
+
+    def __init__(self, panels, tickers):
+        self.panels = panels
+        self.tickers = tickers
+        self.universe_df = None
+
+    def indicator_params(self):
+        return (22, 20, 2.0, 200)
+
+    def log(self, message):
+        pass
+
+
+def make_panels(tickers, us_days, tw_days, seed=1):
+    rng = np.random.default_rng(seed)
+    frames = {}
+    for ticker in tickers:
+        index = tw_days if ticker.endswith(".TW") else us_days
+        close = 100 + np.cumsum(rng.normal(0, 1, len(index)))
+        frames[ticker] = pd.DataFrame({"Open": close, "High": close + 1, "Low": close - 1,
+                                       "Close": close, "Volume": 1e6}, index=index)
+    return partition_by_exchange(pd.concat(frames, axis=1, sort=True))
+
+
+def test_multi_exchange_breadth_with_disjoint_sectors_and_dates():
+    us = [f"U{i}" for i in range(32)]
+    tw = [f"{i}.TW" for i in range(8)]
+    us_days = pd.bdate_range("2022-01-03", periods=300)
+    # TWSE closes for a few US sessions and trades one day the NYSE does not
+    tw_days = us_days.delete(slice(100, 103)).union(pd.DatetimeIndex(["2022-04-02"]))
+    sectors = pd.Series({**{t: "Energy" if i % 2 else "Health" for i, t in enumerate(us)}, **{t: "Tech" for t in tw}})
+
+    result = compute_breadth(PanelScanner(make_panels(us + tw, us_days, tw_days), us + tw), sectors=sectors)
+
+    members = result["members"]
+    assert members.columns.tolist() == ["All", "Energy", "Health", "Tech"]
+    assert members.index.equals(us_days.union(tw_days))
+    assert members.iloc[-1].tolist() == [40, 16, 16, 8]
+    # US-only and TW-only dates count the other exchange's sectors as 0, not NaN
+    assert members.loc["2022-04-02", "Energy"] == 0
+    assert members.loc[us_days[100], "Tech"] == 0
+    assert result["actionable"]["All"].dtype.kind == "i"
+
+
+def test_counts_follow_run_scan_rules():
+    index = pd.bdate_range("2024-01-01", periods=5)
+    nan = np.nan
+    matrices = {
+        "Close":   pd.DataFrame({"A": [10, 12, 12, nan, 12], "B": [5, 5, 5, 5, 5]}, index=index, dtype=float),
+        "SMA200":  pd.DataFrame({"A": [nan, 11, 11, nan, 11], "B": [6, 6, 6, 6, 6]}, index=index, dtype=float),
+        "WVF":     pd.DataFrame({"A": [3, 3, 1, nan, 1], "B": [3, 3, 3, 3, 3]}, index=index, dtype=float),
+        "UpperBB": pd.DataFrame({"A": [2, 2, 2, nan, 2], "B": [2, 2, 2, 2, 2]}, index=index, dtype=float),
+    }
+    counts = _counts(matrices)
+    # A: no SMA on day 0 (not valid), full signal on day 1, no bar on day 3
+    assert counts["valid"]["A"].tolist() == [False, True, True, False, True]
+    assert counts["above_sma200"]["A"].tolist() == [False, True, True, False, True]
+    assert counts["wvf_signal"]["A"].tolist() == [False, True, False, False, False]
+    # ACTIONABLE the bar after the signal; day 4's previous bar is day 2 (day 3 has no bar)
+    assert counts["actionable"]["A"].tolist() == [False, False, True, False, False]
+    # B: WVF signal below its SMA200 is never actionable
+    assert counts["wvf_signal"]["B"].all()
+    assert not counts["actionable"]["B"].any()
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+
+from chart_pipeline import downsample
+
+
+def frame(n):
+    index = pd.bdate_range("2020-01-01", periods=n)
+    close = np.arange(n, dtype=float)
+    signal = np.zeros(n, dtype=bool)
+    signal[3] = True
+    return pd.DataFrame({"Open": close, "High": close + 5, "Low": close - 5, "Close": close,
+                         "WVF": np.where(np.arange(n) == 7, 99.0, 1.0), "SMA200": close, "Signal": signal}, index=index)
+
+
+def test_short_frames_unchanged():
+    f = frame(10)
+    assert downsample(f, limit=10) is f
+
+
+def test_buckets_keep_extremes_and_end_on_last_bar():
+    f = frame(10)
+    out = downsample(f, limit=4)  # buckets of 3, aligned to the end: [0], [1-3], [4-6], [7-9]
+    assert out.index.equals(f.index[[0, 3, 6, 9]])
+    assert out["Open"].tolist() == [0, 1, 4, 7]
+    assert out["Close"].tolist() == [0, 3, 6, 9]
+    assert out["High"].tolist() == [5, 8, 11, 14]
+    assert out["Low"].tolist() == [-5, -4, -1, 2]
+    assert out["WVF"].tolist() == [1, 1, 1, 99]
+    assert out["Signal"].tolist() == [False, True, False, False]
+    assert out["SMA200"].tolist() == [0, 3, 6, 9]
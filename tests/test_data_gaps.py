@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+from data_gaps import find_gaps, merge_backfill, plan_backfill
+
+
+def panel(tickers, days, drop=()):
+    frames = {}
+    for i, ticker in enumerate(tickers):
+        close = pd.Series(100.0 + i + np.arange(len(days)), index=days)
+        for t, start, end in drop:
+            if t == ticker:
+                close[start:end] = np.nan
+        frames[ticker] = pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close, "Volume": 1e6})
+    return pd.concat(frames, axis=1)
+
+
+DAYS = pd.bdate_range("2024-03-04", "2024-03-29")  # no NYSE holidays (Good Friday is 03-29)
+
+
+def test_finds_interior_holes_only():
+    days = DAYS[:-1]
+    data = panel(["A", "B", "C", "D", "E"], days, drop=[
+        ("A", "2024-03-11", "2024-03-13"),  # hole: 3 sessions
+        ("B", "2024-03-04", "2024-03-06"),  # before its first bar: not a gap
+        ("C", "2024-03-25", "2024-03-28"),  # after its last bar: the updater's job
+    ])
+    gaps = find_gaps(data)
+    assert gaps[["Ticker", "Start", "End", "Sessions"]].values.tolist() == [
+        ["A", pd.Timestamp("2024-03-11"), pd.Timestamp("2024-03-13"), 3]]
+
+
+def test_session_nobody_traded_is_not_a_gap():
+    days = DAYS[:-1]
+    data = panel(["A", "B", "C", "D", "E"], days).drop(index=pd.Timestamp("2024-03-15"))
+    assert find_gaps(data).empty
+
+
+def test_plan_groups_identical_ranges_and_merge_keeps_existing_values():
+    days = DAYS[:-1]
+    holes = [("A", "2024-03-11", "2024-03-12"), ("B", "2024-03-11", "2024-03-12"), ("C", "2024-03-20", "2024-03-20")]
+    data = panel(["A", "B", "C", "D", "E"], days, drop=holes)
+    jobs = plan_backfill(find_gaps(data))
+    assert [(s.date().isoformat(), e.date().isoformat(), t) for s, e, t in jobs] == [
+        ("2024-03-11", "2024-03-12", ["A", "B"]), ("2024-03-20", "2024-03-20", ["C"])]
+
+    fresh = panel(["A", "B", "C", "D", "E"], days) + 1000
+    merged = merge_backfill(data, fresh)
+    assert find_gaps(merged).empty
+    assert merged.loc["2024-03-11", ("A", "Close")] == fresh.loc["2024-03-11", ("A", "Close")]
+    assert merged.loc["2024-03-04", ("A", "Close")] == data.loc["2024-03-04", ("A", "Close")]
@@ -0,0 +1,23 @@
+import pytest
+
+glm = pytest.importorskip("google.ai.generativelanguage")
+pytest.importorskip("google.generativeai")
+
+import ai_reports
+from replay_fixtures import FixtureRecorder
+
+
+def test_recorded_gemini_call_carries_session_key(tmp_path, monkeypatch):
+    served = []
+
+    def generate_content(client, request, **kwargs):
+        served.append(client)
+        return glm.GenerateContentResponse({"candidates": [{"content": {"role": "model", "parts": [{"text": "ok"}]}}]})
+
+    monkeypatch.setattr(glm.GenerativeServiceClient, "generate_content", generate_content)
+    with FixtureRecorder(mode="record", fixture_dir=str(tmp_path)):
+        assert ai_reports.call_gemini("KEY-A", "gemini-test", "prompt", timeout=5) == "ok"
+        assert ai_reports.call_gemini("KEY-B", "gemini-test", "prompt 2", timeout=5) == "ok"
+
+    assert [c._transport._credentials.token for c in served] == ["KEY-A", "KEY-B"]
+    assert list(tmp_path.rglob("*.json"))
@@ -0,0 +1,87 @@
+import pandas as pd
+import pytest
+
+from signal_alerts import ACTIONABLE, WATCH, AlertEngine, MemoryNotifier, Notifier, diff_snapshots
+
+
+def results(*rows):
+    return pd.DataFrame([{"Ticker": t, "Status": s, "Signal Date": d, "WVF": 10.0, "UpperBB": 8.0} for t, s, d in rows])
+
+
+def test_diff_kinds():
+    previous = {
+        "UP": {"status": WATCH, "signal_date": "2024-08-02"},
+        "RE": {"status": ACTIONABLE, "signal_date": "2024-08-01"},
+        "AGAIN": {"status": WATCH, "signal_date": "2024-08-01"},
+        "SAME": {"status": WATCH, "signal_date": "2024-08-02"},
+        "GONE": {"status": ACTIONABLE, "signal_date": "2024-08-01"},
+    }
+    current = {
+        "UP": {"status": ACTIONABLE, "signal_date": "2024-08-02"},
+        "RE": {"status": WATCH, "signal_date": "2024-08-05"},
+        "AGAIN": {"status": WATCH, "signal_date": "2024-08-02"},
+        "SAME": {"status": WATCH, "signal_date": "2024-08-02"},
+        "NEWW": {"status": WATCH, "signal_date": "2024-08-05"},
+        "NEWA": {"status": ACTIONABLE, "signal_date": "2024-08-02"},
+    }
+    changes = diff_snapshots(previous, current)
+    assert [(c["kind"], c["ticker"]) for c in changes] == [
+        ("upgraded", "UP"), ("new_actionable", "NEWA"), ("new_watch", "NEWW"),
+        ("resignal", "RE"), ("renewed", "AGAIN"), ("dropped", "GONE"),
+    ]
+    assert changes[-1]["new_status"] is None
+
+
+def test_notifier_is_abstract():
+    with pytest.raises(TypeError):
+        Notifier()
+
+
+class FlakyNotifier(Notifier):
+    def __init__(self, failures):
+        self.failures = failures
+        self.sent = []
+
+    def send(self, key, as_of, changes):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("webhook down")
+        self.sent.append((key, as_of, changes))
+
+
+def test_process_baseline_then_changes(tmp_path):
+    memory = MemoryNotifier()
+    engine = AlertEngine([memory], snapshot_dir=str(tmp_path), logger=lambda m: None)
+
+    assert engine.process("sp500", results(("AAA", WATCH, "2024-08-02")), "2024-08-02") == []
+    assert memory.sent == []
+    assert engine.load_snapshot("sp500")["as_of"] == "2024-08-02"
+
+    changes = engine.process("sp500", results(("AAA", ACTIONABLE, "2024-08-02"), ("BBB", WATCH, "2024-08-05")), "2024-08-05")
+    assert [(c["kind"], c["ticker"]) for c in changes] == [("upgraded", "AAA"), ("new_watch", "BBB")]
+    assert memory.sent == [("sp500", "2024-08-05", changes)]
+
+
+def test_older_scan_does_not_rewind_snapshot(tmp_path):
+    memory = MemoryNotifier()
+    engine = AlertEngine([memory], snapshot_dir=str(tmp_path), logger=lambda m: None)
+    engine.process("sp500", results(("AAA", WATCH, "2024-08-05")), "2024-08-05")
+
+    assert engine.process("sp500", results(("ZZZ", WATCH, "2024-01-02")), pd.Timestamp("2024-01-02")) == []
+    assert memory.sent == []
+    assert list(engine.load_snapshot("sp500")["signals"]) == ["AAA"]
+
+
+def test_failed_notifier_resends_next_run(tmp_path):
+    flaky = FlakyNotifier(failures=1)
+    engine = AlertEngine([flaky], snapshot_dir=str(tmp_path), logger=lambda m: None)
+    engine.process("sp500", results(), "2024-08-02")
+
+    first = engine.process("sp500", results(("AAA", WATCH, "2024-08-05")), "2024-08-05")
+    assert flaky.sent == []
+    assert engine.load_snapshot("sp500")["as_of"] == "2024-08-02"
+
+    second = engine.process("sp500", results(("AAA", WATCH, "2024-08-05")), "2024-08-05")
+    assert second == first
+    assert flaky.sent == [("sp500", "2024-08-05", second)]
+    assert engine.load_snapshot("sp500")["as_of"] == "2024-08-05"
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+
+from cm_williams_vix_fix import CMWilliamsVixFixScanner
+from exchange_store import partition_by_exchange
+from signal_history import SignalHistory
+
+
+def make_panels(days, seed):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0.0005, 0.02, len(days))))
+    frame = pd.DataFrame({"Open": close, "High": close * 1.01, "Low": close * (1 - rng.uniform(0, 0.06, len(days))),
+                          "Close": close, "Volume": 1e6}, index=days)
+    return partition_by_exchange(pd.concat({"AAA": frame}, axis=1))
+
+
+def scanner_for(panels):
+    scanner = CMWilliamsVixFixScanner(logger_callback=lambda m: None)
+    scanner.data = panels
+    return scanner
+
+
+def rows(history):
+    return history.ticker_history("AAA")[["date", "status", "close"]].reset_index(drop=True)
+
+
+def test_invalidated_history_is_recomputed(tmp_path):
+    days = pd.bdate_range("2020-01-01", periods=700)
+    before, after = make_panels(days, seed=3), make_panels(days, seed=4)
+    fresh = SignalHistory(str(tmp_path / "fresh.sqlite"))
+    fresh.update(scanner_for(after))
+    assert len(rows(fresh)) > 0
+
+    history = SignalHistory(str(tmp_path / "h.sqlite"))
+    history.update(scanner_for(before))
+    # Same last bar, different earlier history (a backfill): coverage alone skips the ticker
+    assert history.update(scanner_for(after)) == 0
+    assert not rows(history).equals(rows(fresh))
+
+    history.invalidate(["AAA"])
+    history.update(scanner_for(after))
+    pd.testing.assert_frame_equal(rows(history), rows(fresh))
+
+
+def test_full_update_replaces_rows(tmp_path):
+    days = pd.bdate_range("2020-01-01", periods=700)
+    history = SignalHistory(str(tmp_path / "h.sqlite"))
+    history.update(scanner_for(make_panels(days, seed=3)))
+    history.update(scanner_for(make_panels(days, seed=4)), full=True)
+    fresh = SignalHistory(str(tmp_path / "fresh.sqlite"))
+    fresh.update(scanner_for(make_panels(days, seed=4)))
+    pd.testing.assert_frame_equal(rows(history), rows(fresh))
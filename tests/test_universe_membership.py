@@ -0,0 +1,34 @@
+import pandas as pd
+
+from universe_membership import MembershipIndex, build_intervals
+
+
+def changes(*rows):
+    return pd.DataFrame([(pd.Timestamp(d), a, r) for d, a, r in rows], columns=['Date', 'Added', 'Removed'])
+
+
+def test_replays_changes_backwards():
+    log = changes(("2020-03-01", "NEW", "OLD"), ("2021-06-01", "BRK.B", "GONE"))
+    intervals = build_intervals(["NEW", "BRK-B", "KEEP"], log)
+    assert intervals["NEW"] == [(pd.Timestamp("2020-03-01"), None)]
+    assert intervals["OLD"] == [(None, pd.Timestamp("2020-03-01"))]
+    assert intervals["BRK-B"] == [(pd.Timestamp("2021-06-01"), None)]
+    assert intervals["KEEP"] == [(None, None)]
+
+    index = MembershipIndex.from_intervals(intervals)
+    assert sorted(index.members_as_of("2020-01-01")) == ["GONE", "KEEP", "OLD"]
+    assert sorted(index.members_as_of("2022-01-01")) == ["BRK-B", "KEEP", "NEW"]
+    assert sorted(index.members_between("2020-01-01", "2020-12-31")) == ["GONE", "KEEP", "NEW", "OLD"]
+
+
+def test_added_ticker_missing_from_current_list_is_closed():
+    # LOST was added, then removed without the log recording it
+    log = changes(("2019-01-02", "LOST", "A"), ("2020-05-01", "B", "C"), ("2020-05-01", "D", "E"))
+    warnings = []
+    intervals = build_intervals(["B", "D"], log, logger=warnings.append)
+    assert intervals["LOST"] == [(pd.Timestamp("2019-01-02"), pd.Timestamp("2020-05-01"))]
+    assert warnings and "LOST" in warnings[0]
+
+    index = MembershipIndex.from_intervals(intervals)
+    assert "LOST" in index.members_as_of("2019-06-01")
+    assert "LOST" not in index.members_as_of("2024-01-01")
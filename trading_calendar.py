@@ -0,0 +1,167 @@
+import datetime
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+# Exchange trading calendars used by the scanner (NYSE for US listings, TWSE for .TW / .TWO).
+# Holidays are rule-based approximations: fixed-date and weekday-rule holidays are exact,
+# Lunar New Year comes from a lookup table, and the remaining lunar holidays (Dragon Boat,
+# Mid-Autumn) are not modelled. Callers that have real data should intersect with the dates
+# actually traded (see data_gaps.py).
+
+NYSE = "NYSE"
+TWSE = "TWSE"
+EXCHANGES = (NYSE, TWSE)
+
+# Local time zone and regular close of each exchange
+TIMEZONES = {NYSE: "America/New_York", TWSE: "Asia/Taipei"}
+CLOSE_TIMES = {NYSE: "16:00", TWSE: "13:30"}
+
+# One-off NYSE closures (weather, national days of mourning, 9/11)
+NYSE_SPECIAL_CLOSURES = [
+    "2001-09-11", "2001-09-12", "2001-09-13", "2001-09-14",
+    "2004-06-11", "2007-01-02", "2012-10-29", "2012-10-30",
+    "2018-12-05", "2025-01-09",
+]
+
+# First day of the Lunar New Year (Taiwan market closes for several days around it)
+LUNAR_NEW_YEAR = {
+    2000: "2000-02-05", 2001: "2001-01-24", 2002: "2002-02-12", 2003: "2003-02-01",
+    2004: "2004-01-22", 2005: "2005-02-09", 2006: "2006-01-29", 2007: "2007-02-18",
+    2008: "2008-02-07", 2009: "2009-01-26", 2010: "2010-02-14", 2011: "2011-02-03",
+    2012: "2012-01-23", 2013: "2013-02-10", 2014: "2014-01-31", 2015: "2015-02-19",
+    2016: "2016-02-08", 2017: "2017-01-28", 2018: "2018-02-16", 2019: "2019-02-05",
+    2020: "2020-01-25", 2021: "2021-02-12", 2022: "2022-02-01", 2023: "2023-01-22",
+    2024: "2024-02-10", 2025: "2025-01-29", 2026: "2026-02-17", 2027: "2027-02-06",
+    2028: "2028-01-26", 2029: "2029-02-13", 2030: "2030-02-03",
+}
+
+
+def exchange_for_ticker(ticker):
+    """Returns the calendar a ticker trades on ('TWSE' for .TW/.TWO listings, else 'NYSE')."""
+    t = str(ticker).upper()
+    if t.endswith(".TW") or t.endswith(".TWO"):
+        return TWSE
+    return NYSE
+
+
+def split_tickers_by_exchange(tickers):
+    groups = {}
+    for t in tickers:
+        groups.setdefault(exchange_for_ticker(t), []).append(t)
+    return groups
+
+
+def _easter(year):
+    # Anonymous Gregorian algorithm
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month = (h + l - 7 * m + 114) // 31
+    day = ((h + l - 7 * m + 114) % 31) + 1
+    return datetime.date(year, month, day)
+
+
+def _nth_weekday(year, month, weekday, n):
+    # n-th (1-based) weekday of a month; n=-1 for the last one
+    if n > 0:
+        d = datetime.date(year, month, 1)
+        d += datetime.timedelta(days=(weekday - d.weekday()) % 7)
+        return d + datetime.timedelta(weeks=n - 1)
+    nxt = datetime.date(year + (month == 12), month % 12 + 1, 1)
+    d = nxt - datetime.timedelta(days=1)
+    return d - datetime.timedelta(days=(d.weekday() - weekday) % 7)
+
+
+def _observed(d):
+    # Saturday holidays are observed on Friday, Sunday holidays on Monday
+    if d.weekday() == 5:
+        return d - datetime.timedelta(days=1)
+    if d.weekday() == 6:
+        return d + datetime.timedelta(days=1)
+    return d
+
+
+def _nyse_holidays(year):
+    days = [
+        _nth_weekday(year, 1, 0, 3),   # MLK Day
+        _nth_weekday(year, 2, 0, 3),   # Presidents Day
+        _easter(year) - datetime.timedelta(days=2),  # Good Friday
+        _nth_weekday(year, 5, 0, -1),  # Memorial Day
+        _observed(datetime.date(year, 7, 4)),
+        _nth_weekday(year, 9, 0, 1),   # Labor Day
+        _nth_weekday(year, 11, 3, 4),  # Thanksgiving
+        _observed(datetime.date(year, 12, 25)),
+    ]
+    # NYSE does not close on Friday Dec 31 when New Year falls on a Saturday
+    new_year = datetime.date(year, 1, 1)
+    if new_year.weekday() != 5:
+        days.append(_observed(new_year))
+    if year >= 2022:
+        days.append(_observed(datetime.date(year, 6, 19)))  # Juneteenth
+    return days
+
+
+def _twse_holidays(year):
+    days = [
+        datetime.date(year, 1, 1),
+        datetime.date(year, 2, 28),   # Peace Memorial Day
+        datetime.date(year, 4, 4),    # Children's Day
+        datetime.date(year, 4, 5),    # Tomb Sweeping Day (approx.)
+        datetime.date(year, 5, 1),    # Labor Day
+        datetime.date(year, 10, 10),  # National Day
+    ]
+    lny = LUNAR_NEW_YEAR.get(year)
+    if lny:
+        # Market closes from two days before New Year's Eve through the fourth day
+        first = pd.Timestamp(lny).date()
+        days.extend(first + datetime.timedelta(days=k) for k in range(-3, 4))
+    return days
+
+
+def holidays(exchange, start_year, end_year):
+    out = set()
+    for year in range(start_year, end_year + 1):
+        if exchange == TWSE:
+            out.update(_twse_holidays(year))
+        else:
+            out.update(_nyse_holidays(year))
+    if exchange == NYSE:
+        out.update(pd.Timestamp(d).date() for d in NYSE_SPECIAL_CLOSURES)
+    return out
+
+
+def trading_days(exchange, start, end):
+    """
+    Returns the expected trading sessions of an exchange between start and end (inclusive)
+    as a DatetimeIndex of midnight timestamps, matching the yfinance daily index.
+    """
+    start = pd.Timestamp(start).normalize()
+    end = pd.Timestamp(end).normalize()
+    if end < start:
+        return pd.DatetimeIndex([])
+    days = pd.bdate_range(start, end)
+    closed = holidays(exchange, start.year, end.year)
+    if not closed:
+        return days
+    mask = ~days.isin(pd.DatetimeIndex(sorted(closed)))
+    return days[mask]
+
+
+def last_closed_session(exchange, now=None):
+    """
+    Date of the exchange's most recent session that has already closed (exchange-local time).
+    yfinance treats `end` as exclusive, so a download that should include it ends the day after.
+    """
+    tz = ZoneInfo(TIMEZONES[exchange])
+    now = (now or datetime.datetime.now(datetime.timezone.utc)).astimezone(tz)
+    hour, minute = (int(x) for x in CLOSE_TIMES[exchange].split(":"))
+    closed = now.date() if (now.hour, now.minute) >= (hour, minute) else now.date() - datetime.timedelta(days=1)
+    sessions = trading_days(exchange, closed - datetime.timedelta(days=14), closed)
+    return sessions[-1].date() if len(sessions) else closed
@@ -0,0 +1,170 @@
+import datetime
+import json
+import os
+import threading
+from io import StringIO
+
+import pandas as pd
+
+# On-disk cache of scraped universe constituents (S&P 500, Nasdaq 100 from Wikipedia).
+# - Fresh snapshots (younger than the TTL) are served from memory / disk without any request.
+# - Stale snapshots are revalidated with ETag / Last-Modified; a 304 just refreshes the timestamp.
+# - If the network or parsing fails, the last good snapshot is used (offline fallback).
+#
+# Files per universe in data/universes/: <name>.csv (parsed table), <name>.html (raw page, used by
+# universe_membership.py) and <name>.meta.json (fetched_at, etag, last_modified, url).
+# TTL: VIXFIX_UNIVERSE_TTL_HOURS (default 24).
+
+CACHE_DIR = os.path.join("data", "universes")
+DEFAULT_TTL_HOURS = 24
+# After a failed refresh, keep serving the snapshot for this long before trying the network again
+RETRY_AFTER = datetime.timedelta(minutes=10)
+
+
+class ConstituentCache:
+    def __init__(self, cache_dir=None, ttl_hours=None):
+        self.cache_dir = cache_dir or CACHE_DIR
+        if ttl_hours is None:
+            ttl_hours = float(os.environ.get("VIXFIX_UNIVERSE_TTL_HOURS", DEFAULT_TTL_HOURS))
+        self.ttl = datetime.timedelta(hours=ttl_hours)
+        self._memory = {}
+        self._failed_at = {}
+        self._lock = threading.Lock()
+        self._name_locks = {}
+
+    def _name_lock(self, name):
+        # One lock per universe: a slow fetch of one page must not hold up cache hits of the
+        # others, while concurrent callers of the same universe wait for its single fetch
+        with self._lock:
+            return self._name_locks.setdefault(name, threading.Lock())
+
+    def _paths(self, name):
+        base = os.path.join(self.cache_dir, name)
+        return base + ".csv", base + ".html", base + ".meta.json"
+
+    def _read_meta(self, name):
+        meta_path = self._paths(name)[2]
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception:
+            return None
+
+    def _write_meta(self, name, meta):
+        meta_path = self._paths(name)[2]
+        tmp = meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(tmp, meta_path)
+
+    def _is_fresh(self, meta):
+        try:
+            fetched = datetime.datetime.fromisoformat(meta["fetched_at"])
+        except (KeyError, TypeError, ValueError):
+            return False
+        return datetime.datetime.now() - fetched < self.ttl
+
+    def snapshot(self, name):
+        """Parsed table of the last good snapshot, read from disk without any request (None if never fetched)."""
+        csv_path = self._paths(name)[0]
+        if not os.path.exists(csv_path):
+            return None
+        return pd.read_csv(csv_path)
+
+    def read_html(self, name):
+        """Raw page of the last good snapshot (None if never fetched)."""
+        html_path = self._paths(name)[1]
+        if not os.path.exists(html_path):
+            return None
+        with open(html_path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def get(self, name, url, parse_fn, headers=None, logger=None, force=False):
+        """
+        Returns the constituents DataFrame for `name`. parse_fn(html) -> DataFrame parses a
+        freshly downloaded page. Raises only if there is neither network nor a snapshot.
+        """
+        log = logger or (lambda msg: None)
+        with self._name_lock(name):
+            meta = self._read_meta(name)
+            if not force and meta and self._is_fresh(meta):
+                cached = self._memory.get(name)
+                if cached is not None and cached[0] == meta.get("fetched_at"):
+                    return cached[1].copy()
+                df = self.snapshot(name)
+                if df is not None:
+                    self._memory[name] = (meta["fetched_at"], df)
+                    log(f"  Using cached {name} constituents (fetched {meta['fetched_at']}).")
+                    return df.copy()
+
+            failed_at = self._failed_at.get(name)
+            if not force and failed_at and datetime.datetime.now() - failed_at < RETRY_AFTER and name in self._memory:
+                return self._memory[name][1].copy()
+
+            if not os.path.exists(self.cache_dir):
+                os.makedirs(self.cache_dir)
+
+            try:
+                import requests
+                req_headers = dict(headers or {})
+                if meta and os.path.exists(self._paths(name)[0]):
+                    if meta.get("etag"):
+                        req_headers["If-None-Match"] = meta["etag"]
+                    if meta.get("last_modified"):
+                        req_headers["If-Modified-Since"] = meta["last_modified"]
+                response = requests.get(url, headers=req_headers, timeout=30)
+
+                now = datetime.datetime.now().isoformat(timespec="seconds")
+                if response.status_code == 304:
+                    df = self.snapshot(name)
+                    meta["fetched_at"] = now
+                    self._write_meta(name, meta)
+                    log(f"  {name} constituents unchanged (304). Cache revalidated.")
+                else:
+                    if response.status_code != 200:
+                        raise RuntimeError(f"HTTP {response.status_code}")
+                    df = parse_fn(response.text)
+                    csv_path, html_path, _ = self._paths(name)
+                    df.to_csv(csv_path, index=False)
+                    with open(html_path, "w", encoding="utf-8") as f:
+                        f.write(response.text)
+                    meta = {
+                        "url": url,
+                        "fetched_at": now,
+                        "etag": response.headers.get("ETag"),
+                        "last_modified": response.headers.get("Last-Modified"),
+                        "rows": int(len(df)),
+                    }
+                    self._write_meta(name, meta)
+                self._memory[name] = (meta["fetched_at"], df)
+                self._failed_at.pop(name, None)
+                return df.copy()
+
+            except Exception as e:
+                df = self.snapshot(name)
+                if df is None:
+                    raise
+                stamp = meta.get("fetched_at") if meta else "unknown"
+                log(f"  [WARNING] Could not refresh {name} constituents ({e}). Using last good snapshot from {stamp}.")
+                self._memory[name] = (stamp, df)
+                self._failed_at[name] = datetime.datetime.now()
+                return df.copy()
+
+
+def read_html_tables(html):
+    return pd.read_html(StringIO(html))
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_constituent_cache():
+    """Process-wide cache instance (shared by all scanners and dashboard sessions)."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ConstituentCache()
+        return _default_cache
@@ -0,0 +1,196 @@
+import os
+from bisect import bisect_right
+
+import numpy as np
+import pandas as pd
+
+from universe_cache import get_constituent_cache, read_html_tables
+
+# Point-in-time index membership for survivorship-free Time Machine scans.
+#
+# Built from the cached Wikipedia page (universe_cache.py, no extra scraping): the current
+# constituents plus the "Selected changes" table are replayed backwards into per-ticker
+# [start, end) membership intervals. The intervals are then compiled into a segment bitmap:
+# `boundaries` holds every date on which membership changed, and row k of the bitmap is the set
+# of members between boundaries[k-1] and boundaries[k]. "Members as of date" is a binary search
+# plus one row unpack.
+#
+# Persisted as data/universes/<name>_membership.npz and rebuilt when the cached page changes.
+
+MEMBERSHIP_SOURCES = {"sp500"}
+# Part of the persisted source stamp: bump when build_intervals changes, so saved indexes rebuild
+INDEX_VERSION = 2
+
+
+def _normalize(ticker):
+    # Same convention as CMWilliamsVixFixScanner (dots -> dashes for yfinance)
+    return str(ticker).strip().replace('.', '-')
+
+
+def parse_sp500_changes(html):
+    """Returns the S&P 500 change log as a DataFrame: Date, Added, Removed (tickers, may be NaN)."""
+    tables = read_html_tables(html)
+    for table in tables[1:]:
+        cols = [" ".join(str(c) for c in col) if isinstance(col, tuple) else str(col) for col in table.columns]
+        if any("Added" in c for c in cols) and any("Removed" in c for c in cols):
+            table.columns = cols
+            date_col = next(c for c in cols if "Date" in c)
+            added_col = next(c for c in cols if "Added" in c and "Ticker" in c)
+            removed_col = next(c for c in cols if "Removed" in c and "Ticker" in c)
+            changes = pd.DataFrame({
+                'Date': pd.to_datetime(table[date_col], errors='coerce'),
+                'Added': table[added_col],
+                'Removed': table[removed_col],
+            })
+            return changes.dropna(subset=['Date'])
+    return pd.DataFrame(columns=['Date', 'Added', 'Removed'])
+
+
+def build_intervals(current, changes, logger=None):
+    """
+    Replays the change log backwards from today's constituents.
+    Returns {ticker: [(start, end), ...]} with None meaning open-ended.
+    """
+    members = {t: None for t in current}  # ticker -> end of its current (latest) interval
+    intervals = {}
+    unmatched = []
+    next_change = seen = None  # earliest change date after the row being replayed
+    for _, row in changes.sort_values('Date', ascending=False).iterrows():
+        date = row['Date']
+        if seen is not None and date < seen:
+            next_change = seen
+        seen = date
+        added, removed = row['Added'], row['Removed']
+        if isinstance(added, str) and added.strip():
+            t = _normalize(added)
+            if t in members:
+                end = members.pop(t)
+            else:
+                # Not a member today and no later removal in the log (missed removal, or the
+                # current list spells it differently): it must have left by the next change,
+                # never stay a member forever
+                end = next_change or date
+                unmatched.append(t)
+            intervals.setdefault(t, []).append((date, end))
+        if isinstance(removed, str) and removed.strip():
+            t = _normalize(removed)
+            # Before this date the removed ticker was a member
+            members[t] = date
+    if unmatched and logger:
+        logger(f"  [WARNING] {len(unmatched)} added tickers are neither current members nor removed later "
+               f"(closed at the next change): {', '.join(unmatched[:20])}")
+    for t, end in members.items():
+        intervals.setdefault(t, []).append((None, end))
+    return {t: sorted(iv, key=lambda x: x[0] or pd.Timestamp.min) for t, iv in intervals.items()}
+
+
+class MembershipIndex:
+    def __init__(self, tickers, boundaries, bitmap, source_stamp=None):
+        """
+        tickers:     array of ticker symbols (bit positions)
+        boundaries:  sorted datetime64[D] array of membership change dates
+        bitmap:      packed uint8 matrix, one row per segment (len(boundaries) + 1 rows)
+        """
+        self.tickers = np.asarray(tickers)
+        self.boundaries = np.asarray(boundaries, dtype='datetime64[D]')
+        self.bitmap = bitmap
+        self.source_stamp = source_stamp
+        self._ticker_pos = {t: i for i, t in enumerate(self.tickers)}
+        self._boundary_list = self.boundaries.tolist()
+
+    @classmethod
+    def from_intervals(cls, intervals, source_stamp=None):
+        tickers = sorted(intervals)
+        dates = sorted({d for ivs in intervals.values() for iv in ivs for d in iv if d is not None})
+        boundaries = np.array(dates, dtype='datetime64[D]')
+        n_seg = len(boundaries) + 1
+        dense = np.zeros((n_seg, len(tickers)), dtype=bool)
+        for j, t in enumerate(tickers):
+            for start, end in intervals[t]:
+                # Segment k covers [boundaries[k-1], boundaries[k])
+                s = 0 if start is None else int(np.searchsorted(boundaries, np.datetime64(start, 'D'), side='right'))
+                e = n_seg if end is None else int(np.searchsorted(boundaries, np.datetime64(end, 'D'), side='right'))
+                dense[s:e, j] = True
+        return cls(tickers, boundaries, np.packbits(dense, axis=1), source_stamp)
+
+    def _segment(self, date):
+        return bisect_right(self._boundary_list, np.datetime64(pd.Timestamp(date), 'D').astype(object))
+
+    def members_as_of(self, date):
+        """Tickers that were index members on `date` (O(log n) segment lookup)."""
+        row = np.unpackbits(self.bitmap[self._segment(date)], count=len(self.tickers)).astype(bool)
+        return self.tickers[row].tolist()
+
+    def members_between(self, start, end):
+        """Every ticker that was a member at any point in [start, end]."""
+        rows = self.bitmap[self._segment(start):self._segment(end) + 1]
+        any_row = np.bitwise_or.reduce(rows, axis=0)
+        return self.tickers[np.unpackbits(any_row, count=len(self.tickers)).astype(bool)].tolist()
+
+    def is_member(self, ticker, dates):
+        """Vectorized membership mask of one ticker over a DatetimeIndex."""
+        pos = self._ticker_pos.get(ticker)
+        if pos is None:
+            return np.zeros(len(dates), dtype=bool)
+        seg = np.searchsorted(self.boundaries, np.asarray(dates, dtype='datetime64[D]'), side='right')
+        byte, bit = divmod(pos, 8)
+        return ((self.bitmap[seg, byte] >> (7 - bit)) & 1).astype(bool)
+
+    def save(self, path):
+        np.savez_compressed(path, tickers=self.tickers.astype(str), boundaries=self.boundaries.astype('int64'),
+                            bitmap=self.bitmap, source_stamp=np.array(self.source_stamp or ""))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as z:
+            return cls(z['tickers'], z['boundaries'].astype('datetime64[D]'), z['bitmap'], str(z['source_stamp']) or None)
+
+
+_indexes = {}
+
+
+def get_membership_index(universe, logger=None):
+    """
+    Returns the MembershipIndex of a universe, or None if no change history is available.
+    Built from the constituent cache and persisted next to it; rebuilt when the snapshot changes.
+    """
+    if universe not in MEMBERSHIP_SOURCES:
+        return None
+    cache = get_constituent_cache()
+    html_path = os.path.join(cache.cache_dir, f"{universe}.html")
+    if not os.path.exists(html_path):
+        return None
+    # The raw page is only rewritten when its content changed (a 304 keeps the file)
+    st = os.stat(html_path)
+    stamp = f"v{INDEX_VERSION}-{st.st_mtime_ns}-{st.st_size}"
+    cached = _indexes.get(universe)
+    if cached is not None and cached.source_stamp == stamp:
+        return cached
+
+    path = os.path.join(cache.cache_dir, f"{universe}_membership.npz")
+    if os.path.exists(path):
+        try:
+            index = MembershipIndex.load(path)
+            if index.source_stamp == stamp:
+                _indexes[universe] = index
+                return index
+        except Exception:
+            pass
+
+    html = cache.read_html(universe)
+    snapshot = cache.snapshot(universe)
+    if html is None or snapshot is None:
+        return None
+    try:
+        changes = parse_sp500_changes(html)
+        current = [_normalize(t) for t in snapshot['Ticker']]
+        index = MembershipIndex.from_intervals(build_intervals(current, changes, logger), source_stamp=stamp)
+        index.save(path)
+        if logger:
+            logger(f"  Built {universe} membership index: {len(index.tickers)} tickers, {len(index.boundaries)} changes.")
+    except Exception as e:
+        if logger:
+            logger(f"  [WARNING] Could not build {universe} membership index: {e}")
+        return None
+    _indexes[universe] = index
+    return index
@@ -1,19 +1,36 @@
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import sys
 import os
 import json
-import google.generativeai as genai
-import yfinance as yf
-import importlib
 import re
-import requests
+import time
+
+# Heavy SDKs are imported where they are used, not here: plotly in chart_pipeline / the universe view,
+# google.generativeai and requests in ai_reports, yfinance in the scanner's download paths.
+# Streamlit re-executes this script on every interaction, so only cheap imports belong at the top.
+# Measure with: python benchmark_startup.py
 
 # Add current directory to path to import the scanner
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 import cm_williams_vix_fix
+import replay_fixtures
+import scheduled_updater
+import ai_batch
+from ai_prompts import build_report_prompt
+from ai_report_store import get_report_store
+from breadth import compute_breadth
+from chart_pipeline import CHART_RANGES, build_chart, build_grid, downsample, grid_frames, prepare_chart_frame
+from data_cache import get_panel_cache
+from data_gaps import find_gaps
+from scan_engine import ScanEngine, ScanRequest
+from signal_history import get_signal_history
+from single_flight import SingleFlight
+from symbol_metadata import get_symbol_metadata, seed_from_universe_lists
+from watchlist_scan import scan_all_watchlists
+
+# Offline record/replay of network calls (VIXFIX_FIXTURES=record|replay|auto)
+replay_fixtures.install_from_env()
 
 # Ensure we are running from the script's directory so we can find watchlist.json
 try:
@@ -21,8 +38,11 @@ try:
 except:
     pass
 
-# Force reload to ensure latest code changes are picked up
-importlib.reload(cm_williams_vix_fix)
+# Dev mode only (VIXFIX_DEV_RELOAD=1): reload the scanner on every rerun to pick up code edits.
+# In production the module is imported once per process.
+if os.environ.get("VIXFIX_DEV_RELOAD", "").lower() in ("1", "true", "yes"):
+    import importlib
+    importlib.reload(cm_williams_vix_fix)
 from cm_williams_vix_fix import CMWilliamsVixFixScanner
 
 st.set_page_config(page_title="CM Williams Vix Fix Scanner", layout="wide")
@@ -80,93 +100,8 @@ default_pplx = st.secrets.get("PERPLEXITY_API_KEY", "")
 
 api_key = st.sidebar.text_input("Gemini API Key", value=default_gemini, type="password", help="Add to .streamlit/secrets.toml for auto-load")
 pplx_api_key = st.sidebar.text_input("Perplexity API Key", value=default_pplx, type="password", help="Optional fallback")
-
-# Helper for Perplexity AI (Fallback)
-def generate_perplexity_report(api_key, system_prompt):
-    url = "https://api.perplexity.ai/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json"
-    }
-    
-    # Try models in order of capability: Reasoning -> Pro -> Basic (Sonar)
-    models_to_try = ["sonar-reasoning", "sonar-pro", "sonar"]
-    last_error = ""
-    
-    for model in models_to_try:
-        payload = {
-            "model": model,
-            "messages": [
-                {
-                    "role": "system",
-                    "content": "You are a helpful financial research assistant."
-                },
-                {
-                    "role": "user", 
-                    "content": system_prompt
-                }
-            ]
-        }
-        
-        try:
-            # st.toast(f"Trying Perplexity model: {model}...")
-            response = requests.post(url, json=payload, headers=headers)
-            if response.status_code == 200:
-                return response.json()['choices'][0]['message']['content'], f"Perplexity ({model})"
-            else:
-                last_error = f"{model} Error {response.status_code}"
-                continue
-        except Exception as e:
-            last_error = f"{model} Exception: {str(e)}"
-            continue
-            
-    return f"Perplexity All Models Failed. Last Error: {last_error}", "Error"
-
-# Helper for AI Generation with Fallback (Gemini Priority)
-def generate_ai_report(gemini_api_key, perplexity_api_key, prompt):
-    # 1. PRIORITY: Combine Gemini Models
-    # We try high-end models first, then faster/cheaper ones
-    gemini_models = [
-        'gemini-2.0-flash', 
-        'gemini-2.0-flash-lite',
-        'gemini-flash-latest',
-        'gemini-pro-latest',
-        'gemini-1.5-pro',
-        'gemini-1.5-flash',
-        'gemini-pro'
-    ]
-    
-    errors = []
-    
-    if gemini_api_key:
-        genai.configure(api_key=gemini_api_key)
-        for model_name in gemini_models:
-            try:
-                # Enabling Google Search Tool for fresh data access
-                # Note: Simply passing 'google_search_retrieval' tool string works in recent SDKs
-                try:
-                    model = genai.GenerativeModel(model_name, tools='google_search_retrieval')
-                except:
-                    # Fallback if tools not supported by model/SDK
-                    model = genai.GenerativeModel(model_name)
-                
-                response = model.generate_content(prompt)
-                if response.text:
-                    return response.text, f"Gemini ({model_name})"
-            except Exception as e:
-                errors.append(f"Gemini {model_name} Error: {str(e)}")
-                continue
-    else:
-        errors.append("Gemini API Key missing.")
-
-    # 2. FALLBACK: Perplexity AI (Deep Research)
-    if perplexity_api_key:
-        # st.toast("Gemini unavailable. Switching to Perplexity...")
-        return generate_perplexity_report(perplexity_api_key, prompt)
-
-    # If we get here, all failed
-    final_error = "\n".join(errors)
-    return f"AI Generation Failed.\n\nErrors:\n{final_error}", "Error"
+ai_pregen = st.sidebar.checkbox("Pre-generate AI reports after scan", value=False, help="Queues reports for the ACTIONABLE candidates in the background (see ai_batch.py)")
+ai_pregen_top_k = st.sidebar.number_input("Reports per scan (most liquid first)", min_value=1, max_value=100, value=10, step=1, disabled=not ai_pregen)
 
 # Initialize Session State for Logs
 if 'scan_logs' not in st.session_state:
@@ -175,29 +110,89 @@ if 'scan_logs' not in st.session_state:
 def log_callback(msg):
     st.session_state['scan_logs'].append(msg)
 
-# Initialize Scanner Logic
+# Shared scan engine (price data + indicator memos are process-wide and read-only)
 @st.cache_resource
-def get_scanner_v14():
-    import cm_williams_vix_fix
-    importlib.reload(cm_williams_vix_fix)
-    from cm_williams_vix_fix import CMWilliamsVixFixScanner
-    return CMWilliamsVixFixScanner(logger_callback=log_callback)
-
-scanner = get_scanner_v14()
-
-# Helper for Taiwan Names
-@st.cache_data
-def get_taiwan_names_map():
-    temp_scanner = CMWilliamsVixFixScanner()
-    # Merge Top 100 and High Yield lists
-    df1 = temp_scanner.get_taiwan_top100_tickers()
-    d1 = dict(zip(df1['Ticker'], df1['Name']))
-    
-    df2 = temp_scanner.get_taiwan_high_yield_tickers()
-    d2 = dict(zip(df2['Ticker'], df2['Name']))
-    
-    # Merge
-    return {**d1, **d2}
+def get_scan_engine():
+    return ScanEngine(max_concurrent=int(os.environ.get("VIXFIX_MAX_CONCURRENT_SCANS", "4")))
+
+engine = get_scan_engine()
+
+# Each session gets its own lightweight scanner (universe list, chart data); sessions never
+# mutate a shared scanner, so analysts can scan in parallel.
+if 'scanner' not in st.session_state:
+    st.session_state['scanner'] = engine.new_scanner(logger=log_callback)
+scanner = st.session_state['scanner']
+
+# Process-wide coordinator so concurrent "Update Database" clicks share one download
+@st.cache_resource
+def get_update_coordinator():
+    return SingleFlight()
+
+# Background AI report jobs (shared so identical requests from several sessions run once)
+@st.cache_resource
+def get_ai_coordinator():
+    return SingleFlight()
+
+# (ticker, Time Machine date, prompt template version) - the model is whichever answered
+ai_report_key = ai_batch.report_key
+
+def get_ai_report(ticker, as_of):
+    """Stored report (shared across sessions, no API call) or this session's last failure."""
+    key = ai_report_key(ticker, as_of)
+    failed = st.session_state.get('ai_cache', {}).get(key)
+    return failed or get_report_store().get(*key)
+
+def delete_ai_report(ticker, as_of):
+    key = ai_report_key(ticker, as_of)
+    st.session_state.get('ai_cache', {}).pop(key, None)
+    get_report_store().delete(*key)
+
+def collect_ai_jobs():
+    """Finished background AI jobs: successes are already in the report store, failures stay in the session."""
+    ai_jobs = st.session_state.get('ai_jobs', {})
+    for key, flight in list(ai_jobs.items()):
+        if not flight.done:
+            continue
+        ai_jobs.pop(key)
+        if flight.error is not None:
+            content, source = f"AI Generation Failed.\n\nErrors:\n{flight.error}", "Error"
+        else:
+            content, source = flight.result
+        if source == "Error":
+            st.session_state.setdefault('ai_cache', {})[key] = {'content': content, 'source': source}
+
+def render_ai_stream(report_key, title, full=False):
+    """Partial report of a running job: the summary once its JSON block is complete, then the text so far."""
+    flight = st.session_state.get('ai_jobs', {}).get(report_key)
+    if flight is None or flight.done:
+        # Finished: full rerun so the stored report replaces the stream
+        collect_ai_jobs()
+        st.rerun()
+    stream = ai_batch.live_stream(report_key)
+    elapsed = (pd.Timestamp.now() - pd.Timestamp(flight.started)).total_seconds()
+    st.info(f"🔍 AI Analyst is researching {title}... {elapsed:.0f}s")
+    if stream is None or not stream.text:
+        st.caption("\n\n".join(flight.messages[-4:]))
+        return
+    st.caption(f"Streaming from {stream.label}")
+    if stream.summary:
+        s = stream.summary
+        st.success(f"**{str(s.get('action', 'N/A')).upper()}** | Fair value: {s.get('fair_value')} | Buy below: {s.get('buy_below')}")
+    if full:
+        st.markdown(stream.text)
+    else:
+        with st.container(height=400):
+            st.markdown(stream.text)
+
+# Streamed text refreshes twice a second where st.fragment exists (no full-page reruns)
+ai_stream_fragments = hasattr(st, "fragment")
+if ai_stream_fragments:
+    render_ai_stream = st.fragment(run_every=0.5)(render_ai_stream)
+
+# Symbol names / sectors (persistent store, seeded once per process from the universe lists)
+@st.cache_resource
+def get_symbol_store():
+    return seed_from_universe_lists(get_symbol_metadata(), CMWilliamsVixFixScanner())
 
 # Scanner Settings
 st.sidebar.header("Scanner Settings")
@@ -246,16 +241,24 @@ try:
         st.sidebar.caption(f"Last Mod: {status.get('last_modified')}")
     else:
         st.sidebar.warning("No Local Data Found")
+    # Background updater (scheduled_updater.py) status
+    auto_status = scheduled_updater.read_status().get(current_univ_key)
+    if auto_status:
+        st.sidebar.caption(f"Auto-Update: {auto_status.get('status')} at {auto_status.get('finished')} (bars: {auto_status.get('scan_as_of', '-')})")
+    cache_stats = get_panel_cache().stats()
+    st.sidebar.caption(f"Memory cache: {cache_stats['stores']} stores, {cache_stats['size_mb']}MB / {cache_stats['max_mb']}MB")
 except:
     pass
 
 update_btn = st.sidebar.button("🔄 Update Database", help="Downloads fresh data from Yahoo Finance. This may take a minute.")
+gap_btn = st.sidebar.button("🩹 Repair Gaps", help="Finds missing date ranges inside the local database and downloads only those.")
 
 st.sidebar.markdown("---")
 st.sidebar.subheader("🚀 Scanner")
 col_btn1, col_btn2 = st.sidebar.columns(2)
 run_btn = col_btn1.button("Run Scan", type="primary", help="Instantly scans local data.")
 watch_scan_btn = col_btn2.button("Scan Watchlist")
+all_wl_btn = st.sidebar.button("Scan All Watchlists", help="One download and one indicator pass over the union of every list; results grouped by list.")
 st.sidebar.markdown("---")
 
 # Specific Ticker Input
@@ -296,6 +299,7 @@ target_tickers = []
 target_tickers_msg = ""
 should_run = False
 target_univ = "sp500" # Default
+scan_top_n = top_n
 
 # ACTION LOGIC
 
@@ -305,10 +309,47 @@ if update_btn:
     if universe == "Choose Universe...":
          st.error("Please choose a Universe to update.")
     else:
+         # Single-flight: sessions updating the same universe/date range share one download
+         coordinator = get_update_coordinator()
+         update_key = ("update", current_univ_key, 1825, pd.Timestamp.now().strftime('%Y-%m-%d'))
+         flight, started_new = coordinator.submit(
+             update_key,
+             lambda log: CMWilliamsVixFixScanner(logger_callback=log).fetch_data(universe=current_univ_key, local_only=False)
+         )
+         if not started_new:
+             st.info(f"An update for {universe} is already running (started {flight.started:%H:%M:%S}). Joining it...")
+         progress_box = st.empty()
          with st.spinner(f"Updating database for {universe} (Chunks of 10)..."):
-             scanner.fetch_data(universe=current_univ_key, local_only=False)
+             while not flight.wait(0.5):
+                 progress_box.text("\n".join(flight.messages[-5:]))
+         progress_box.empty()
+         st.session_state['scan_logs'].extend(flight.messages)
+         if flight.error is not None:
+             st.error(f"Update failed for {universe}: {flight.error}")
+         else:
              st.success(f"Update Complete for {universe}!")
 
+# 1b. Gap Repair Action (targeted backfill instead of a full force_refresh)
+if gap_btn:
+    st.session_state['scan_logs'] = []
+    if universe == "Choose Universe...":
+         st.error("Please choose a Universe to repair.")
+    else:
+         with st.spinner(f"Checking {universe} database for gaps..."):
+             gaps = scanner.backfill_gaps(universe=current_univ_key)
+         if gaps.empty:
+             st.success(f"No gaps found in {universe} database.")
+         else:
+             # Detect again on the merged store: downloads can fail or return nothing for a range
+             remaining = pd.concat([find_gaps(p) for p in scanner.panels.values()], ignore_index=True)
+             filled = max(len(gaps) - len(remaining), 0)
+             if remaining.empty:
+                 st.success(f"Backfilled all {len(gaps)} gaps in {gaps['Ticker'].nunique()} tickers for {universe}.")
+             else:
+                 st.warning(f"Filled {filled} of {len(gaps)} gaps for {universe}; {len(remaining)} remain in "
+                            f"{remaining['Ticker'].nunique()} tickers (no data from Yahoo or failed downloads).")
+                 st.dataframe(remaining, use_container_width=True)
+
 # 2. Run Scan Action
 if run_btn:
     st.session_state['scan_logs'] = [] # Clear logs on run
@@ -319,11 +360,8 @@ if run_btn:
         should_run = True
         target_univ = current_univ_key
     
-    scanner.top_n_volume = top_n
-    
     if ticker_input:
         target_tickers = [t.strip().upper() for t in ticker_input.split(',')]
-        scanner.tickers = target_tickers
         target_tickers_msg = f"{', '.join(target_tickers)}"
         target_univ = "watchlist" # Custom
     else:
@@ -344,7 +382,6 @@ if watch_scan_btn:
             "Taiwan Top 100": "taiwan100"
         }
         target_univ = universe_map.get(universe, "sp500")
-        scanner.top_n_volume = top_n
         target_tickers_msg = f"{universe} (Scan)"
     else:
         # Standard Watchlist Scan
@@ -354,33 +391,87 @@ if watch_scan_btn:
             st.error(f"{selected_wl_name} is empty!")
             should_run = False
         else:
-            scanner.tickers = target_tickers
             target_tickers_msg = f"{selected_wl_name}"
-            scanner.top_n_volume = len(target_tickers) + 10
+            scan_top_n = len(target_tickers) + 10
             target_univ = "watchlist"
 
+def finish_scan(results, scanner, label):
+    st.session_state['scan_results'] = results
+    st.session_state['scan_complete'] = True
+    st.session_state['scan_date'] = scan_date
+    st.session_state['universe_name'] = label
+
+    # Batch AI pre-generation for the actionable names, most liquid first
+    if ai_pregen and (api_key or pplx_api_key):
+        pregen_tickers = ai_batch.select_candidates(results, top_k=int(ai_pregen_top_k))
+        if pregen_tickers:
+            st.session_state['ai_batch'] = ai_batch.AIBatch(
+                scanner, pregen_tickers, scan_date, api_key, pplx_api_key, get_ai_coordinator(),
+                max_workers=int(os.environ.get("VIXFIX_AI_BATCH_WORKERS", "2"))
+            ).start()
+
 if should_run:
     with st.spinner(f"Scanning {target_tickers_msg} (Local Data) as of {scan_date}..."):
-        # Explicitly fetch variables if needed, OR trust scanner.tickers is set.
-        # If target_univ is NOT watchlist, we should ensure fetch logic runs for correct universe
-        if target_univ != "watchlist":
-             # LOCAL ONLY FETCH (For big universes like SP500, we don't auto-download on every scan)
-             scanner.fetch_data(universe=target_univ, local_only=True)
-        else:
-             # WATCHLIST: Always allow download because it's usually small and dynamic
-             scanner.fetch_data(universe="watchlist", local_only=False)
+        # Per-session request; the scan runs on its own scanner over the shared data layer.
+        # LOCAL ONLY for big universes like SP500 (no auto-download on every scan);
+        # WATCHLIST: always allow download because it's usually small and dynamic.
+        scan_request = ScanRequest(target_univ, tickers=target_tickers, scan_date=scan_date,
+                                   top_n=scan_top_n, local_only=(target_univ != "watchlist"))
+        scanner = engine.prepare(scan_request, logger=log_callback)
+        st.session_state['scanner'] = scanner
              
-        # scanner.data = None # No longer needed if we called fetch_data above? 
-        # Actually fetch_data populates self.data.
+        # Today's universe scan may already be precomputed by the background updater,
+        # as long as the database has not been updated since.
+        results = None
+        if target_univ != "watchlist" and scan_date == pd.Timestamp.now().date():
+            precomputed, auto_status = scheduled_updater.load_precomputed_scan(target_univ)
+            store_status = scanner.get_data_status(target_univ)
+            if precomputed is not None and store_status.get("exists") and \
+               os.path.getmtime(auto_status['scan_path']) >= store_status['last_modified'].timestamp():
+                results = precomputed
+                log_callback(f"[INFO] Using precomputed scan from background updater (bars as of {auto_status.get('scan_as_of')}).")
         
-        results = scanner.run_scan(scan_date=pd.to_datetime(scan_date), local_only=True)
-        st.session_state['scan_results'] = results
-        st.session_state['scan_complete'] = True
-        st.session_state['scan_date'] = scan_date
-        st.session_state['universe_name'] = target_tickers_msg
+        if results is None:
+            results = engine.scan(scanner, scan_request)
+        finish_scan(results, scanner, target_tickers_msg)
+
+if all_wl_btn:
+    st.session_state['scan_logs'] = []
+    all_lists = {name: tickers for name, tickers in watchlists.items() if tickers}
+    if not all_lists:
+        st.error("All watchlists are empty!")
+    else:
+        with st.spinner(f"Scanning {len(all_lists)} watchlists as of {scan_date}..."):
+            # Union of all lists: downloads / indicators once per symbol (watchlist_scan.py)
+            results, scanner = scan_all_watchlists(engine, all_lists, scan_date=scan_date, local_only=False, logger=log_callback)
+            st.session_state['scanner'] = scanner
+            finish_scan(results, scanner, f"All Watchlists ({len(all_lists)})")
+
+# Reports finished in the background since the last rerun
+collect_ai_jobs()
+
+def render_ai_batch_progress():
+    batch = st.session_state.get('ai_batch')
+    if batch is None:
+        return
+    p = batch.progress()
+    label = f"AI reports: {p['done'] + p['cached']}/{p['total']} ready, {p['running']} running"
+    if p['failed']:
+        label += f", {p['failed']} failed"
+    st.progress(p['fraction'], text=label)
+    if batch.done:
+        st.caption(f"Batch finished at {batch.finished:%H:%M:%S}")
+
+# Batch progress refreshes itself every 2s where st.fragment exists (no full-page reruns)
+if hasattr(st, "fragment"):
+    render_ai_batch_progress = st.fragment(run_every=2)(render_ai_batch_progress)
+
+with st.sidebar:
+    render_ai_batch_progress()
+
 
 # Layout
-tab_results, tab_universe, tab_ai_details, tab_logs = st.tabs(["📊 Results", "🌍 Universe", "🧠 AI Analysis", "📝 Scan Logs"])
+tab_results, tab_universe, tab_ai_details, tab_history, tab_logs = st.tabs(["📊 Results", "🌍 Universe", "🧠 AI Analysis", "🗓️ Signal History", "📝 Scan Logs"])
 
 with tab_logs:
     st.subheader("Process Logs")
@@ -400,6 +491,7 @@ with tab_universe:
         with col_u1:
             st.markdown("### Sector Distribution")
             if 'Sector' in univ_df.columns:
+                import plotly.graph_objects as go
                 sector_counts = univ_df['Sector'].value_counts()
                 fig_pie = go.Figure(data=[go.Pie(labels=sector_counts.index, values=sector_counts.values, hole=.3)])
                 fig_pie.update_layout(margin=dict(l=0, r=0, t=0, b=0), height=350)
@@ -412,15 +504,51 @@ with tab_universe:
             st.dataframe(univ_df, height=350, use_container_width=True)
             
         st.markdown(f"**Total Securities:** {len(univ_df)}")
-        
+
+        # Market / sector breadth (vectorized over the loaded panels, see breadth.py)
+        st.markdown("### Market Breadth")
+        if scanner.panels:
+            breadth_key = (scanner.current_universe, len(scanner.tickers or []), id(scanner.panels), scanner.indicator_params())
+            if st.session_state.get('breadth_key') != breadth_key:
+                st.session_state['breadth'] = compute_breadth(scanner)
+                st.session_state['breadth_key'] = breadth_key
+            breadth = st.session_state['breadth']
+            if breadth:
+                metrics = {
+                    "% above SMA200": "above_sma200",
+                    "% with WVF > UpperBB": "wvf_signal",
+                    "ACTIONABLE signals per day": "actionable",
+                }
+                bc1, bc2, bc3 = st.columns([1, 2, 1])
+                metric_label = bc1.selectbox("Metric", list(metrics), key="breadth_metric")
+                frame = breadth[metrics[metric_label]]
+                groups = bc2.multiselect("Sectors", list(frame.columns), default=["All"], key="breadth_groups")
+                period = bc3.selectbox("Period", ["1Y", "2Y", "5Y", "All"], index=2, key="breadth_period")
+                if period != "All" and not frame.empty:
+                    frame = frame[frame.index > frame.index[-1] - pd.DateOffset(years=int(period[:-1]))]
+                if groups:
+                    chart = frame[groups] * 100 if metrics[metric_label] != "actionable" else frame[groups]
+                    st.line_chart(chart, height=300)
+                    latest = breadth["above_sma200"].iloc[-1].drop("All", errors="ignore").dropna().sort_values()
+                    if not latest.empty:
+                        st.caption("Latest % above SMA200 by sector: " + ", ".join(f"{s} {v * 100:.0f}%" for s, v in latest.items()))
+            else:
+                st.info("Not enough price history for breadth.")
+        else:
+            st.info("Run a scan to load price data for breadth.")
+
     else:
         st.info("No universe data loaded. Click 'Run Live Scan' to load a universe.")
 
 with tab_ai_details:
     st.subheader("Full AI Valuation Report")
     sel_ticker = st.session_state.get('selected_ticker')
-    if sel_ticker and 'ai_cache' in st.session_state and sel_ticker in st.session_state['ai_cache']:
-        cache_item = st.session_state['ai_cache'][sel_ticker]
+    sel_date = st.session_state.get('scan_date', pd.Timestamp.now().date())
+    cache_item = get_ai_report(sel_ticker, sel_date) if sel_ticker else None
+    sel_key = ai_report_key(sel_ticker, sel_date) if sel_ticker else None
+    if not cache_item and sel_key in st.session_state.get('ai_jobs', {}):
+        render_ai_stream(sel_key, sel_ticker, full=True)
+    elif cache_item:
         if isinstance(cache_item, dict):
             st.markdown(cache_item['content'])
             st.caption(f"Generated by: {cache_item.get('source', 'Unknown')}")
@@ -431,12 +559,59 @@ with tab_ai_details:
     else:
         st.info("Select a ticker in the 'Results' tab to view detailed analysis.")
 
+with tab_history:
+    st.subheader("Signal History")
+    history = get_signal_history()
+    # Fold the loaded bars into the history database (incremental: only bars it has not seen)
+    if scanner.panels:
+        history_key = (id(scanner.panels), scanner.indicator_params())
+        if st.session_state.get('history_key') != history_key:
+            with st.spinner("Updating signal history..."):
+                history.update(scanner)
+            st.session_state['history_key'] = history_key
+    history_params = scanner.indicator_params()
+
+    hc1, hc2, hc3, hc4, hc5 = st.columns([2, 1, 1, 1, 1])
+    history_ticker = hc1.text_input("Ticker (empty = all)", value=st.session_state.get('selected_ticker') or "", key="history_ticker").strip().upper()
+    history_start = hc2.date_input("From", value=pd.Timestamp.now().date() - pd.DateOffset(years=1), key="history_start")
+    history_end = hc3.date_input("To", value=pd.Timestamp.now().date(), key="history_end")
+    history_market = hc4.selectbox("Market", ["All", "Taiwan (.TW / .TWO)", "US"], key="history_market")
+    history_min = hc5.number_input("Min signals", min_value=1, value=1, step=1, key="history_min")
+
+    t_query = time.perf_counter()
+    if history_ticker:
+        events = history.ticker_history(history_ticker, history_start, history_end, params=history_params)
+        last = history.last_signal(history_ticker, params=history_params)
+        if last:
+            st.metric(f"{history_ticker} last signal", f"{last['date']:%Y-%m-%d}", help=f"{last['status']}, Close {last['close']:.2f}")
+        st.dataframe(events, use_container_width=True, hide_index=True)
+    else:
+        market = {"All": None, "Taiwan (.TW / .TWO)": "taiwan", "US": "us"}[history_market]
+        counts = history.signal_counts(history_start, history_end, market=market, min_count=history_min, params=history_params)
+        st.dataframe(counts, use_container_width=True, hide_index=True)
+    stats = history.stats()
+    st.caption(f"{stats['signals']:,} signals of {stats['tickers']:,} tickers ({stats['first']} → {stats['last']}) · "
+               f"query {(time.perf_counter() - t_query) * 1000:.0f} ms · forward returns in % from the signal close")
+
 with tab_results:
     if st.session_state.get('scan_complete', False):
         results = st.session_state['scan_results']
         scan_date_display = st.session_state.get('scan_date', pd.Timestamp.now().date())
         universe_name = st.session_state.get('universe_name', 'Custom List')
         
+        # Small multiples: every candidate at once from the scan's memoized indicators
+        if not results.empty and st.checkbox("Grid view of all candidates", value=False, key="grid_view"):
+            grid_limit = st.number_input("Charts", min_value=1, max_value=200, value=50, step=10, key="grid_limit")
+            grid_tickers = results['Ticker'].drop_duplicates().head(int(grid_limit)).tolist()
+            grid_key = (universe_name, str(scan_date_display), tuple(grid_tickers))
+            if st.session_state.get('grid_key') != grid_key:
+                status = dict(zip(results['Ticker'], results['Status']))
+                frames = grid_frames(scanner, grid_tickers, scan_date_display)
+                labels = {t: f"{t} · {status.get(t, '').split(' ')[0]}" for t in frames}
+                st.session_state['grid_fig'] = build_grid(frames, labels=labels)
+                st.session_state['grid_key'] = grid_key
+            st.plotly_chart(st.session_state['grid_fig'], use_container_width=True)
+        
         col1, col2 = st.columns([1, 2])
         
         selected_ticker = None
@@ -462,7 +637,7 @@ with tab_results:
                         return 'color: red'
                     return ''
 
-                cols = ['Ticker', 'Status', 'Signal Date', 'Action Date', 'Entry Price', '5-Day Return %', 'WVF', 'UpperBB']
+                cols = ['Watchlist', 'Ticker', 'Status', 'Signal Date', 'Action Date', 'Entry Price', '5-Day Return %', 'WVF', 'UpperBB']
                 cols = [c for c in cols if c in results.columns]
                 df_display = results[cols]
                 
@@ -489,60 +664,40 @@ with tab_results:
                 st.info("No stocks matched the criteria.")
 
         with col2:
-            if selected_ticker and scanner.data is not None:
+            if selected_ticker and scanner.panels:
                 # Fetch Full Name
                 col_results = st.container()
                 with col_results:
-                    long_name = selected_ticker
-                    info = {}
-                    
-                    # 1. Try Taiwan Map First (Fast & Accurate for TW)
-                    tw_map = get_taiwan_names_map()
-                    if selected_ticker in tw_map:
-                        long_name = tw_map[selected_ticker]
-                    else:
-                        # 2. Fallback to YFinance
-                        try:
-                            t_info = yf.Ticker(selected_ticker)
-                            info = t_info.info
-                            long_name = info.get('longName', selected_ticker)
-                        except:
-                            pass
-                    
-                    # 3. Double check current scanner universe (Dynamic overrides)
-                    if hasattr(scanner, 'universe_df') and scanner.universe_df is not None:
-                         match = scanner.universe_df[scanner.universe_df['Ticker'] == selected_ticker]
-                         if not match.empty:
-                             long_name = match.iloc[0]['Name']
-                             if 'Sector' in match.columns:
-                                 info['sector'] = match.iloc[0]['Sector']
+                    # Local metadata lookup; unknown symbols are completed from Yahoo in the background
+                    symbol_store = get_symbol_store()
+                    info = symbol_store.get(selected_ticker)
+                    long_name = symbol_store.display_name(selected_ticker)
+                    symbol_store.refresh_async([selected_ticker])
+                    sector_line = symbol_store.sector_line(selected_ticker)
 
                     st.subheader(f"Analysis: {selected_ticker} - {long_name}")
+                    if info.get('sector'):
+                        st.caption(f"{sector_line} · {info.get('exchange', '')} · {info.get('currency', '')}")
                     
                     # Re-calculate indicators
                     try:
-                        if isinstance(scanner.data.columns, pd.MultiIndex):
-                            df_ticker = scanner.data[selected_ticker].dropna()
-                        else:
-                            df_ticker = scanner.data
+                        df_ticker = scanner.get_ticker_data(selected_ticker)
                     
-                        indicators = scanner.calculate_indicators(df_ticker)
-                        target_date = pd.to_datetime(scan_date_display)
-                        history_slice = indicators[indicators.index <= target_date]
+                        indicators = scanner.get_indicators(selected_ticker)
+                        chart_range = st.radio("Chart range", list(CHART_RANGES), index=0, horizontal=True, key="chart_range")
+                        # Bars + indicators joined once, long ranges downsampled OHLC-aware (chart_pipeline.py)
+                        chart_frame = prepare_chart_frame(df_ticker, indicators, scan_date_display, chart_range)
                         
-                        if not history_slice.empty:
-                            plot_data = history_slice.tail(200)
+                        if not chart_frame.empty:
+                            plot_data = downsample(chart_frame)
                             
                             # Initialize Parsed Data to None
                             ai_parsed_data = None
                             
-                            # Check Cache FIRST to see if we have lines to draw
-                            if 'ai_cache' not in st.session_state:
-                                st.session_state['ai_cache'] = {}
-                            
+                            # Check the report store FIRST to see if we have lines to draw
                             report_content = ""
                             source_model = ""
-                            cache_data = st.session_state['ai_cache'].get(selected_ticker)
+                            cache_data = get_ai_report(selected_ticker, scan_date_display)
                             
                             if isinstance(cache_data, dict):
                                 report_content = cache_data.get('content', "")
@@ -558,13 +713,12 @@ with tab_results:
                                  except:
                                      pass
     
-                            # Plot Construction
-                            fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.05, row_heights=[0.6, 0.4], specs=[[{"secondary_y": False}], [{"secondary_y": False}]])
-                            fig.add_trace(go.Candlestick(x=plot_data.index, open=df_ticker.loc[plot_data.index]['Open'], high=df_ticker.loc[plot_data.index]['High'], low=df_ticker.loc[plot_data.index]['Low'], close=plot_data['Close'], name="Price"), row=1, col=1)
+                            # Plot Construction (WebGL line traces)
+                            fig = build_chart(plot_data)
                             
                             # Get Last Price (Price at Date)
-                            last_price = plot_data.iloc[-1]['Close']
-                            last_date_str = plot_data.index[-1].strftime('%Y-%m-%d')
+                            last_price = chart_frame.iloc[-1]['Close']
+                            last_date_str = chart_frame.index[-1].strftime('%Y-%m-%d')
                             
                             # Add Annotations List
                             annotations = []
@@ -602,18 +756,6 @@ with tab_results:
                                         bgcolor="rgba(0,0,0,0.5)"
                                     ))
                             
-                            st_up = plot_data.apply(lambda x: x['Supertrend'] if x['SupertrendTrend'] == 1 else None, axis=1)
-                            st_down = plot_data.apply(lambda x: x['Supertrend'] if x['SupertrendTrend'] == -1 else None, axis=1)
-                            fig.add_trace(go.Scatter(x=plot_data.index, y=st_up, mode='lines', line=dict(color='green', width=2), name='Supertrend (Up)'), row=1, col=1)
-                            fig.add_trace(go.Scatter(x=plot_data.index, y=st_down, mode='lines', line=dict(color='red', width=2), name='Supertrend (Down)'), row=1, col=1)
-                            fig.add_trace(go.Scatter(x=plot_data.index, y=plot_data['SMA200'], mode='lines', line=dict(color='orange', width=2), name='SMA 200'), row=1, col=1)
-                            fig.add_trace(go.Scatter(x=plot_data.index, y=plot_data['WVF'], fill='tozeroy', line=dict(color='cyan', width=1), name="WVF"), row=2, col=1)
-                            fig.add_trace(go.Scatter(x=plot_data.index, y=plot_data['UpperBB'], line=dict(color='gray', dash='dash'), name="Upper BB"), row=2, col=1)
-                            
-                            signals = plot_data[(plot_data['WVF'] > plot_data['UpperBB']) & (plot_data['Close'] > plot_data['SMA200'])]
-                            if not signals.empty:
-                                fig.add_trace(go.Scatter(x=signals.index, y=signals['WVF'], mode='markers', marker=dict(color='red', size=8, symbol='x'), name='Signal'), row=2, col=1)
-                            
                             # Update layout with margins and annotations
                             # Move labels to Title to avoid overlap
                             title_text = f"{selected_ticker} - {scan_date_display} | P: {last_price:.2f}"
@@ -729,463 +871,39 @@ with tab_results:
                                 st.caption("👉 Go to **'AI Analysis'** tab above for the Full Report (Parts A-J).")
                                 
                                 if st.button("Regenerate Report"):
-                                    del st.session_state['ai_cache'][selected_ticker]
+                                    delete_ai_report(selected_ticker, scan_date_display)
                                     st.rerun()
                             else:
-                                # Automatic Generation
+                                # Automatic Generation (background job, polled below)
                                 if api_key:
                                     try:
                                         with st.spinner(f"🔍 AI Analyst is researching {selected_ticker} ({long_name}) as of {scan_date_display}..."):
-                                            # Use HISTORICAL Price Context
-                                            # Ensure we use the price from the scan date, not today
-                                            hist_price = last_price # Calculated above from plot_data tail
-                                            
-                                            # Safe Year Extraction
-                                            scan_dt = pd.to_datetime(scan_date_display)
-                                            scan_year = scan_dt.year
-                                            scan_month = scan_dt.month
-                                            
-                                            # Determine Likely Latest Financial Quarter
-                                            if scan_month in [1, 2, 3]:
-                                                target_q_str = f"Q3 {scan_year-1}" # Q4 usually not out until late March for TW
-                                            elif scan_month in [4, 5, 6]:
-                                                target_q_str = f"Q4 {scan_year-1}"
-                                            elif scan_month in [7, 8, 9]:
-                                                target_q_str = f"Q1 {scan_year}"
-                                            else:
-                                                target_q_str = f"Q2 {scan_year}"
-
-                                            # Construct Context
-                                            market_context = f"""
-                                            **HISTORICAL ANALYST TASK**:
-                                            Target: {selected_ticker} ({long_name})
-                                            As-At Date: {scan_date_display}
-                                            Closing Price: ${hist_price:.2f}
-                                            Target Reporting Period: {target_q_str} or older
-                                            
-                                            **OBJECTIVE**:
-                                            You are an Intelligence Officer retrieving filed reports from the archives.
-                                            You must find the *latest* financial report visible before {scan_date_display}.
-                                            
-                                            **REQUIRED SEARCH OPERATIONS**:
-                                            1. Search: "{long_name} {selected_ticker} {target_q_str} financial report"
-                                            2. Search: "{long_name} {selected_ticker} investor presentation {scan_year}"
-                                            3. Search: "{long_name} {selected_ticker} {target_q_str} earnings news summary"
-                                            4. Search: "TWSE {selected_ticker} financial report site:twse.com.tw"
-                                            5. Search: "{long_name} {selected_ticker} analyst ratings history {scan_year}"
-                                            6. Search: "Taiwan Manufacturing PMI {scan_year} historical data"
-                                            
-                                            **DATA HANDLING RULES**:
-                                            - **RESILIENT EXTRACTION**: If the official PDF is not found, *YOU MUST* extract the key numbers (Revenue, EPS, Margins, Guidance) from news articles, financial news sites (CNBC, Bloomberg, Yahoo Finance), or summaries found in the search results.
-                                            - **SOURCES**: Prioritize TWSE, Investor Relations, and Yahoo Finance.
-                                            - **BEST AVAILABLE DATA**: If {scan_date_display} is in Q1, look for Q4 of previous year. If in Q4, look for Q3.
-                                            - **EXAMPLE**: If today is Feb 2026 and Q4 2025 report is not out, YOU MUST USE THE Q3 2025 REPORT found on the investor relations page.
-                                            - **NO FUTURE KNOWLEDGE**: Do not use data released *after* {scan_date_display}.
-                                            - **ESTIMATION**: If a specific number is not found from the exact quarter, estimate it based on the TTM (Trailing Twelve Months) trend.
-                                            - **CITATION**: Clearly state the source date (e.g., "Using Q3 2025 data as Q4 was not yet released...").
-                                            """
-                                            
-                                            # --- CONDITIONAL VALUATION FRAMEWORK PROMPT ---
-                                            if selected_ticker.endswith(".TW") or selected_ticker.endswith(".TWO"):
-                                                # --- TAIWAN MARKET PROMPT ---
-                                                system_prompt = f"""
-# 📌 Institutional Multi-Factor Stock Valuation Framework  
-## Part 1 (Reality-Based) + Part 2 (Expectation-Based)
-
----
-
-## ROLE
-
-You are an **Institutional Quantitative Strategist**.
-Your goal is to provide a valuation report.
-
-**Override**: If exact financial data is missing, use TTM (Trailing Twelve Months) data found via search.
-
-
-Your task is to perform a **two-part equity valuation** of a specified US-listed stock using **only information that was publicly available _as at a specified date_**.
-
-You must behave as if you are operating **on that date**, with **no knowledge of future events**.
-
----
-
-## GLOBAL CONSTRAINTS (MANDATORY)
-
-1. **No Guessing / No Estimation**
-   - Do NOT estimate missing data.
-   - If data is unavailable as at the date, explicitly state:  
-     > “Data not available as at this date.”
-
-2. **No Future Knowledge**
-   - Do NOT reference:
-     - Earnings released after the as-at date
-     - Price movements after the as-at date
-     - Macro data revisions after the as-at date
-     - Any hindsight-based outcomes
-
-3. **Source Discipline**
-   Allowed sources (as at date only):
-   - Published quarterly / annual financial reports
-   - Official company guidance and press releases
-   - Analyst consensus forecasts published by that date
-   - Macro data released by that date
-
-4. **Strict Separation**
-   - **Part 1** → backward-looking, factual, no forecasts  
-   - **Part 2** → forward-looking, but only expectations visible at the date
-
-5. **Default As-At Date**
-   - Today, unless explicitly specified by the user
-
----
-
-## INPUTS
-
-- **Target Stock Ticker**
-- **As-At Date**
-- **Latest Financial Statements Available as at the Date**
-- **Latest Macro Data Available as at the Date**
-
----
-
-# =========================
-# PART 1 — REALITY-BASED VALUATION (NO FORECAST)
-# =========================
-
-## OBJECTIVE
-
-Determine whether the stock was **Overvalued, Fairly Valued, or Undervalued** using **only historical and trailing data available as at the date**.
-
----
-
-## PHASE 1: MACRO REGIME IDENTIFICATION (INVESTMENT CLOCK)
-
-Using macro data available as at the date (PMI, inflation, growth, policy stance), classify the regime:
-
-### 1. Recovery
-- PMI < 50 but rising
-- Inflation falling  
-**Factor Bias:** Value / Size
-
-### 2. Expansion
-- PMI > 50
-- Growth accelerating  
-**Factor Bias:** Growth / Momentum
-
-### 3. Slowdown / Stagflation
-- PMI falling
-- Inflation high or rising  
-**Factor Bias:** Quality / Low Vol  
-**Adjustment:** Apply valuation multiple compression
-
-### 4. Contraction
-- PMI < 50 and falling
-- Growth negative  
-**Factor Bias:** Balance Sheet / Yield
-
-### Discount Rate Adjustment
-If:
-- Inflation > 3%, OR
-- Rate volatility is high  
-
-→ Increase Cost of Equity (COE) by **+150 bps**  
-→ Penalize long-duration cash flows
-
----
-
-## PHASE 2: STOCK CLASSIFICATION & VALUATION METHOD
-
-Classify the stock using **reported data only**.
-
----
-
-### A. HIGH GROWTH / SAAS
-
-**Criteria**
-- Revenue Growth > 15%
-- Operating or FCF Margin < 10%
-
-**Valuation Method**
-- EV / Sales (P/E NOT allowed)
-- Rule of 40 = Revenue Growth + FCF Margin
-
-**Adjustments**
-- Rule of 40 > 40 → Premium valuation (1.2x)
-- Rule of 40 < 40 → Discount valuation (0.8x)
-- Rule of 40 < 20 → “Broken Growth” classification
-
-**Risk Check**
-- LTM Cash Burn > Cash Balance → Flag as High Risk
-
----
-
-### B. CYCLICAL
-
-**Criteria**
-- Sector: Energy, Materials, Industrials  
-OR
-- Earnings volatility > market
-
-**Valuation Method**
-- Normalized P/E (7–10 year average earnings, if available)
-- Price-to-Tangible Book (P/TBV)
-
-**Trap Detection**
-- Low current P/E + record-high margins → Flag as **Peak Cycle / Value Trap**
-
----
-
-### C. VALUE / MATURE
-
-**Criteria**
-- Profitable
-- Revenue Growth < 10%
-
-**Valuation Method**
-- ROE vs P/TBV regression  
-  Target P/B = (ROE − g) / (COE − g)
-- Dividend Discount Model (if dividends exist)
-
-**Quality Overlay**
-- Piotroski F-Score
-- F-Score < 4 → Apply 20% discount to fair value
-
----
-
-## PHASE 3: RISK & VETO CHECKS
-
-1. **Altman Z-Score**
-   - Z < 1.81 → **DISTRESS WARNING**
-   - Recommendation: **AVOID regardless of valuation**
-
-2. **Beneish M-Score**
-   - M > −1.78 → Flag potential earnings manipulation
-
-3. **Momentum Sanity Check**
-   - 6-month relative strength vs SPY
-   - Negative momentum + value signal → “Falling Knife” risk
-
----
-
-## PART 1 OUTPUT
-
-- Historical Fair Value Range
-- Valuation Status:
-  - Overvalued / Fairly Valued / Undervalued
-- Explicit justification referencing:
-  - Macro regime
-  - Financial strength
-  - Earnings quality
-  - Appropriate valuation multiples
-
----
-
-# =========================
-# PART 2 — EXPECTATION-BASED VALUATION (AS-AT-DATE ONLY)
-# =========================
-
-## OBJECTIVE
-
-Evaluate whether the stock price was **under- or over-valued relative to expectations that were visible at the as-at date**, without using any future information.
-
----
-
-## ALLOWED FORWARD-LOOKING DATA
-
-(Only if available as at the date)
-
-- Management guidance
-- Analyst consensus forecasts
-- Announced capex plans
-- Publicly announced products, contracts, or pipelines
-
----
-
-## FORWARD VALUATION LOGIC
-
-1. **Forecast Profitability Path**
-   - Revenue growth expectations
-   - Margin expansion expectations
-
-2. **Forward Valuation Multiples**
-   - Forward P/E, EV/Sales, PEG  
-   (Only if forecast data existed as at the date)
-
-3. **Market-Implied Expectations**
-   - What growth and margins the market price assumes **as at that date**
-
----
-
-## PART 2 OUTPUT
-
-- Expected Fair Value Range based on contemporaneous expectations
-- Comparison of market price vs expected fundamentals
-- Expectation assessment:
-  - Overly optimistic
-  - Conservative discount
-  - Fairly priced
-
----
-
-# =========================
-# 最終綜合判斷 (FINAL SYNTHESIS)
-# =========================
-
-You MUST start this section with the exact markdown header:
-**## 最終綜合判斷 (FINAL SYNTHESIS)**
-
-Provide **FINAL SUMMARY ONLY**, including:
-
-1. **Part 1 Conclusion**
-   - Historical, no-forecast valuation verdict
-
-2. **Part 2 Conclusion**
-   - Expectation-based valuation verdict
-
-3. **Integrated Judgment**
-   - Cheap but risky
-   - Fair but high quality
-   - Expensive but expectation-justified
-
-4. **Composite Valuation Score (0–100)**
-   - 0–20: Significantly Overvalued
-   - 21–40: Overvalued
-   - 41–60: Fairly Valued
-   - 61–80: Undervalued
-   - 81–100: Deep Value / Strong Conviction
-
-5. **Required Margin of Safety**
-   - Stable compounder: ~20%
-   - Growth / Cyclical: 40%+
-   - Distressed: Avoid
-
----
-
-## OUTPUT STYLE REQUIREMENTS
-
-- **LANGUAGE: STRICTLY TRADITIONAL CHINESE (繁體中文) FOR THE ENTIRE REPORT.**
-- Institutional
-- Evidence-based
-- Concise but rigorous
-- Explicitly state: **“As at [DATE]”**
-- No speculation
-- No hindsight
-
----
-
-**END OF FRAMEWORK**
-
-Context:
-{market_context}
-
-CRITICAL INSTRUCTION:
-At the very end of your response, AFTER the sections, you MUST provide a JSON block summary in this EXACT format for software parsing:
-```json
-{{
-    "action": "BUY" or "HOLD" or "SELL",
-    "company_name_zh": "Traditional Chinese Name of Stock (if applicable)",
-    "fair_value": 150.25, 
-    "buy_below": 140.00,
-    "risk_level": "Medium",
-    "rationale": "One sentence summary (in target language)."
-}}
-```
-"""
-                                            else:
-                                                # --- GLOBAL / US MARKET PROMPT ---
-                                                system_prompt = f"""
-# 📌 Institutional Multi-Factor Stock Valuation Framework
-
-## ROLE & GOVERNANCE
-You are an **Institutional Quantitative Strategist and Equity Valuation Expert**. Your mission is to provide world-class, rigorous equity analysis using a dual-layered methodology (Historical Reality vs. Forward Expectations). 
-
-### 🛑 MANDATORY PROTOCOLS
-1. **Zero-Hindsight Constraint**: You must strictly operate as if the current date is the user-specified **As-At Date**. Referencing any event (earnings, macro shifts, or price action) that occurred after that date is a total breach of institutional protocol.
-2. **Data Integrity**: Do not estimate missing data. If data was unavailable as of the date, explicitly state: "Data not available as at this date."
-3. **Language Protocol**: 
-   - **US Stocks**: Respond in English.
-   - **Taiwan (TW) or Hong Kong (HK) Stocks**: Respond in Traditional Chinese (繁體中文).
-
----
-
-## PART 1: REALITY-BASED VALUATION (THE ANCHOR)
-*Objective: Determine intrinsic value using only hard, historical data available on the date.*
-
-### 1. Macro Regime Identification
-Identify the Investment Clock phase (Recovery, Expansion, Slowdown, or Contraction) using PMI and CPI data. 
-- **Adjustment**: Increase Cost of Equity (COE) by **+150 bps** if Inflation > 3% or Rate Volatility is high to penalize long-duration cash flows.
-
-### 2. Deep-Dive Classification
-- **High Growth/SaaS**: Evaluate via EV/Sales. Calculate **Rule of 40** (Revenue Growth + FCF Margin).
-- **Cyclical**: Use Normalized P/E (7-10 yr average) and Price-to-Tangible Book (P/TBV).
-- **Value/Mature**: Execute ROE vs. P/TBV Regression: $$Target P/B = \\frac{{ROE - g}}{{COE - g}}$$
-
-### 3. Institutional Quality Vetoes
-- **Altman Z-Score**: If Z < 1.81, issue a mandatory **DISTRESS WARNING**.
-- **Beneish M-Score**: If M > −1.78, flag potential earnings manipulation.
-- **Piotroski F-Score**: If Score < 4, apply a 20% haircut to fair value.
-
----
-
-## PART 2: EXPECTATION-BASED VALUATION (THE ALPHA)
-*Objective: Evaluate market-implied sentiment and forward-looking visibility.*
-
-1. **Consensus Dissection**: Analyze analyst EPS/Revenue forecasts and management guidance active **as of the date**.
-2. **Reverse DCF Analysis**: Determine what implied growth rate and margins the market price assumes at that specific moment.
-3. **Forward Multiples**: Calculate Forward P/E, PEG, and EV/EBITDA based on contemporaneous forecasts.
-
----
-
-## FINAL OUTPUT: THE INSTITUTIONAL DIRECTIVE
-Generate the final report using this structure:
-
-### 1. Institutional Research Summary
-| Pillar | Metric / Status | Quantitative Commentary |
-| :--- | :--- | :--- |
-| **Macro Regime** | [Regime Name] | Impact on sector valuation and discount rates. |
-| **Reality (Part 1)** | [Key Trailing Ratios] | Verdict on historical valuation (Over/Under/Fair). |
-| **Expectations (Part 2)** | [Forward Ratios/Guidance] | Assessment of market sentiment and growth visibility. |
-| **Quality/Risk** | [Z/F/M-Scores] | Comprehensive balance sheet and earnings quality review. |
-
-### 2. Scenario Valuation Matrix (12-Month Outlook)
-| Scenario | Target Price | Probability | Critical Trigger |
-| :--- | :--- | :--- | :--- |
-| **Bull Case** | [Price] | [%] | [Specific Catalyst] |
-| **Base Case** | [Price] | [%] | [Expected Outcome] |
-| **Bear Case** | [Price] | [%] | [Specific Risk Event] |
-
-### 3. Final Proposal & Execution
-- **Action**: (Strong Buy / Buy / Hold / Sell / Avoid)
-- **Composite Valuation Score**: 0–100 (81-100: Deep Value; 0-20: Significantly Overvalued)
-- **Execution Zone**: Optimal Buy/Entry Price Range.
-- **Stop-Loss**: Hard exit price for risk management.
-- **Strategic Rationale**: Concise 3-point thesis justifying the verdict.
-
-Context:
-{market_context}
-
-CRITICAL INSTRUCTION:
-At the very end of your response, AFTER the sections, you MUST provide a JSON block summary in this EXACT format for software parsing:
-```json
-{{
-    "action": "BUY" or "HOLD" or "SELL",
-    "company_name_zh": "Traditional Chinese Name of Stock (if applicable)",
-    "fair_value": 150.25, 
-    "buy_below": 140.00,
-    "risk_level": "Medium",
-    "rationale": "One sentence summary (in target language)."
-}}
-```
-"""
-                                            
-                                            # Use Helper with Retry Logic and Perplexity Fallback
-                                            report_content, source_model = generate_ai_report(api_key, pplx_api_key, system_prompt)
+                                            # Prompt templates live in ai_prompts.py; historical close as of the scan date
+                                            system_prompt, _ = build_report_prompt(selected_ticker, long_name, sector_line, scan_date_display, last_price)
                                             
-                                            # Cache results
-                                            st.session_state['ai_cache'][selected_ticker] = {
-                                                'content': report_content,
-                                                'source': source_model
-                                            }
+                                            # Raced Gemini models with Perplexity fallback, in a background thread.
+                                            # Identical requests from other sessions join the running job.
+                                            # Successful reports go straight to the shared report store.
+                                            report_key = ai_report_key(selected_ticker, scan_date_display)
+                                            ai_jobs = st.session_state.setdefault('ai_jobs', {})
+                                            flight = ai_jobs.get(report_key)
+                                            if flight is None:
+                                                # Same key as the batch pre-generation, so a click joins a queued batch job
+                                                flight, _ = get_ai_coordinator().submit(
+                                                    ai_batch.flight_key(report_key, system_prompt),
+                                                    lambda log, k=report_key, p=system_prompt, g=api_key, x=pplx_api_key: ai_batch.generate_and_store(k, p, g, x, log)
+                                                )
+                                                ai_jobs[report_key] = flight
+
+                                        if flight.done:
+                                            collect_ai_jobs()
                                             st.rerun() # Rerun to show the split view appropriately
+                                        else:
+                                            # Tokens render as they arrive; the job keeps running between reruns
+                                            render_ai_stream(report_key, f"{selected_ticker} ({long_name})")
+                                            if not ai_stream_fragments:
+                                                time.sleep(0.5)
+                                                st.rerun()
                                             
                                     except Exception as e:
                                         st.error(f"AI Analysis Failed: {e}")
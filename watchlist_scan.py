@@ -0,0 +1,90 @@
+import json
+import os
+
+import pandas as pd
+
+from scan_engine import ScanRequest
+
+# Scan every watchlist in watchlist.json at once.
+# The lists overlap (the same names appear in several lists and sometimes twice in one), so
+# the scan runs once over the deduplicated union: one store load / incremental download, one
+# indicator computation per symbol. The rows are then fanned out per list, with a Watchlist
+# column, so a ticker on two lists shows up in both groups. Symbols the shared watchlist store
+# does not hold yet get a full-history download first; any still without data are logged.
+
+WATCHLIST_FILE = "watchlist.json"
+
+
+def load_watchlists(path=WATCHLIST_FILE):
+    """{name: [tickers]} from watchlist.json ({} if missing or unreadable; a legacy list becomes 'Default')."""
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {"Default": data} if isinstance(data, list) else data
+
+
+def clean_tickers(tickers):
+    """Stripped, upper-cased, de-duplicated tickers in first-seen order."""
+    return list(dict.fromkeys(str(t).strip().upper() for t in tickers if str(t).strip()))
+
+
+def union_tickers(watchlists):
+    """Deduplicated union of all lists, in list order."""
+    return clean_tickers(t for tickers in watchlists.values() for t in tickers)
+
+
+def group_by_watchlist(results, watchlists):
+    """One copy of each result row per list containing its ticker, with a leading Watchlist column."""
+    columns = ['Watchlist'] + list(results.columns)
+    if results.empty:
+        return pd.DataFrame(columns=columns)
+    groups = []
+    for name, tickers in watchlists.items():
+        rows = results[results['Ticker'].isin(clean_tickers(tickers))]
+        if not rows.empty:
+            groups.append(rows.assign(Watchlist=name)[columns])
+    if not groups:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(groups, ignore_index=True)
+
+
+def prepare_watchlist(engine, tickers, scan_date=None, local_only=False, logger=None, params=None):
+    """
+    (ScanRequest, prepared scanner) for watchlist tickers. Unless local_only, symbols new to the
+    shared watchlist store get their full history first; tickers still without enough history
+    are logged (they drop out of the scan).
+    """
+    request = ScanRequest("watchlist", tickers=tickers, scan_date=scan_date, top_n=len(tickers) + 10,
+                          local_only=local_only, params=params)
+    if not local_only:
+        # The update in prepare() only adds new dates to the stored symbols; symbols new to the
+        # shared watchlist store get their full history first
+        engine.new_scanner(logger, params).download_missing_tickers("watchlist", tickers)
+    scanner = engine.prepare(request, logger=logger)
+    no_data = []
+    for ticker in tickers:
+        bars = scanner.get_ticker_data(ticker)
+        if bars is None or len(bars) < scanner.sma_filter:
+            no_data.append(ticker)
+    if no_data:
+        scanner.log(f"[WARNING] No or too little price history for {len(no_data)} tickers (left out): {', '.join(no_data)}")
+    return request, scanner
+
+
+def scan_all_watchlists(engine, watchlists, scan_date=None, local_only=False, logger=None, params=None):
+    """
+    Scans the union of all non-empty watchlists in one pass.
+    Returns (results grouped by watchlist, scanner holding the union's data).
+    """
+    watchlists = {name: tickers for name, tickers in watchlists.items() if tickers}
+    tickers = union_tickers(watchlists)
+    if logger:
+        total = sum(len(t) for t in watchlists.values())
+        logger(f"[INFO] All watchlists: {len(watchlists)} lists, {total} entries, {len(tickers)} unique tickers.")
+    request, scanner = prepare_watchlist(engine, tickers, scan_date, local_only, logger, params)
+    results = engine.scan(scanner, request)
+    return group_by_watchlist(results, watchlists), scanner